@@ -0,0 +1,415 @@
+"""
+API Server - Local HTTP/JSON front end for ParkingService
+Lets gates, kiosks and the mobile app drive the service without the Tk window.
+Built on the standard library: HTTP/1.1 keep-alive, one thread per connection,
+a /batch endpoint for many calls per round trip, and level status streamed
+as chunked JSON straight from a snapshot.
+
+Endpoints (all bodies and responses are JSON):
+    POST   /levels                          create_parking_lot  {level, regular_spaces, ev_spaces, ...}
+    POST   /levels/<level>/vehicles         park_vehicle        vehicle_data
+    POST   /levels/<level>/vehicles/batch   park_vehicles       [vehicle_data, ...]
+    DELETE /levels/<level>/slots/<slot_id>  remove_vehicle      ?ev=1&regnum=...
+    GET    /levels/<level>/status           get_status (streamed)
+    GET    /vehicles/<regnum>               find_vehicle
+    GET    /plates?q=...&mode=...&limit=..  search_plates
+    GET    /occupancy[?level=...]           get_occupancy
+    POST   /batch                           [{"method", "path", "body"}, ...] -> [{"status", "body"}, ...]
+
+Usage:
+    python ApiServer.py --port 8080                          # serve
+    python ApiServer.py --bench --requests 20000 --clients 4  # loopback benchmark
+"""
+
+import argparse
+import http.client
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from BayAllocator import iter_vehicles
+from LoadGenerator import percentile
+from ParkingService import ParkingService
+
+STREAM_CHUNK_BYTES = 64 * 1024
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+class ApiError(Exception):
+    """Request-level failure (bad path, parameters or body) with its HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f'{name} must be an integer, got {value!r}') from None
+
+
+def _flag(query, name):
+    return query.get(name, ['0'])[0].lower() in ('1', 'true', 'yes')
+
+
+def _object(body):
+    if not isinstance(body, dict):
+        raise ApiError(400, 'Request body must be a JSON object')
+    return body
+
+
+def _create_level(service, params, query, body):
+    body = _object(body)
+    created = service.create_parking_lot(
+        _int(body.get('level'), 'level'), _int(body.get('regular_spaces'), 'regular_spaces'),
+        _int(body.get('ev_spaces'), 'ev_spaces'),
+        **{key: body[key] for key in ('motorcycles_per_bay', 'regular_distances', 'ev_distances') if key in body})
+    if not created:
+        return {'success': False, 'message': 'Invalid parking lot settings'}
+    return {'success': True, 'message': f"Created level {body['level']}"}
+
+
+def _park(service, params, query, body):
+    return service.park_vehicle(_int(params[0], 'level'), _object(body))
+
+
+def _park_batch(service, params, query, body):
+    if not isinstance(body, list) or not all(isinstance(item, dict) for item in body):
+        raise ApiError(400, 'Request body must be a JSON array of vehicle objects')
+    results = service.park_vehicles(_int(params[0], 'level'), body)
+    return {'success': True, 'results': results,
+            'message': f"{sum(result['success'] for result in results)} of {len(results)} vehicle(s) parked"}
+
+
+def _remove(service, params, query, body):
+    regnum = query.get('regnum', [None])[0]
+    return service.remove_vehicle(_int(params[0], 'level'), _int(params[1], 'slot_id'), _flag(query, 'ev'), regnum)
+
+
+def _find(service, params, query, body):
+    return service.find_vehicle(params[0])
+
+
+def _search(service, params, query, body):
+    if 'q' not in query:
+        raise ApiError(400, 'Missing query parameter q')
+    limit = query.get('limit', [None])[0]
+    return service.search_plates(query['q'][0], query.get('mode', ['prefix'])[0],
+                                 _int(limit, 'limit') if limit is not None else None)
+
+
+def _occupancy(service, params, query, body):
+    level = query.get('level', [None])[0]
+    return service.get_occupancy(_int(level, 'level') if level is not None else None)
+
+
+def _status(service, params, query, body):
+    """
+    Stream get_status as JSON text pieces, vehicle by vehicle
+
+    Serialises from a snapshot, so a 100k-vehicle level is never held as one
+    list of dicts or one string, and parking is not blocked while it is sent.
+    Returns a plain dict (sent normally) if the level does not exist.
+    """
+    level = _int(params[0], 'level')
+    snapshot = service.snapshot(level).get(level)
+    if snapshot is None:
+        return {'success': False, 'message': f'Parking lot level {level} does not exist'}
+
+    def pieces():
+        yield '{"success":true'
+        for key, slots in (('regular_vehicles', snapshot.regular_slots), ('ev_vehicles', snapshot.ev_slots)):
+            yield f',"{key}":['
+            separator = ''
+            for slot_index, vehicle in iter_vehicles(slots):
+                yield separator + _encode(dict(vehicle, slot_id=slot_index + 1))
+                separator = ','
+            yield ']'
+        yield f',"message":{_encode(f"Status retrieved for level {level}")}}}'
+    return pieces()
+
+
+ROUTES = [
+    ('POST', re.compile(r'/levels'), _create_level),
+    ('POST', re.compile(r'/levels/(-?\d+)/vehicles'), _park),
+    ('POST', re.compile(r'/levels/(-?\d+)/vehicles/batch'), _park_batch),
+    ('DELETE', re.compile(r'/levels/(-?\d+)/slots/(\d+)'), _remove),
+    ('GET', re.compile(r'/levels/(-?\d+)/status'), _status),
+    ('GET', re.compile(r'/vehicles/([^/]+)'), _find),
+    ('GET', re.compile(r'/plates'), _search),
+    ('GET', re.compile(r'/occupancy'), _occupancy),
+]
+
+
+def dispatch(service, method, target, body=None):
+    """
+    Route one request to the service
+
+    Returns:
+        tuple: (HTTP status, dict or iterator of JSON text pieces)
+    """
+    url = urlsplit(target)
+    path = url.path.rstrip('/') or '/'
+    query = parse_qs(url.query)
+    try:
+        if method == 'POST' and path == '/batch':
+            return 200, _batch(service, body)
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            allowed = True
+            if route_method == method:
+                params = [unquote(group) for group in match.groups()]
+                result = handler(service, params, query, body)
+                if isinstance(result, dict):
+                    return (200 if result.get('success') else 422), result
+                return 200, result
+        if allowed:
+            raise ApiError(405, f'{method} is not allowed on {path}')
+        raise ApiError(404, f'No endpoint {path}')
+    except ApiError as e:
+        return e.status, {'success': False, 'message': str(e)}
+
+
+def _batch(service, body):
+    """Run sub-requests in order and collect their responses (streams are materialised)"""
+    if not isinstance(body, list):
+        raise ApiError(400, 'Batch body must be a JSON array of {"method", "path", "body"} objects')
+    responses = []
+    for item in body:
+        if not isinstance(item, dict) or 'path' not in item or item.get('path') == '/batch':
+            responses.append({'status': 400, 'body': {'success': False, 'message': 'Invalid batch item'}})
+            continue
+        status, result = dispatch(service, item.get('method', 'GET').upper(), item['path'], item.get('body'))
+        if not isinstance(result, dict):
+            result = json.loads(''.join(result))
+        responses.append({'status': status, 'body': result})
+    return responses
+
+
+class ParkingApiHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 handler: connections stay open until the client closes them"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ParkingApi/1.0'
+    # Buffer wfile so a response's header block and body leave in one send, when
+    # handle_one_request flushes after the handler returns
+    wbufsize = -1
+
+    def setup(self):
+        super().setup()
+        # Responses are small and written in one piece; don't let Nagle hold them back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    def _handle(self):
+        body = None
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError as e:
+                self._send(400, {'success': False, 'message': f'Invalid JSON body: {e}'})
+                return
+        try:
+            status, result = dispatch(self.server.service, self.command, self.path, body)
+        except Exception as e:
+            status, result = 500, {'success': False, 'message': f'Internal error: {e}'}
+        if isinstance(result, (dict, list)):
+            self._send(status, result)
+        else:
+            self._stream(status, result)
+
+    def _send(self, status, result):
+        payload = _encode(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, status, pieces):
+        """Send text pieces with chunked transfer encoding, ~STREAM_CHUNK_BYTES per chunk"""
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.flush_headers()
+        buffer, size = [], 0
+        try:
+            for piece in pieces:
+                buffer.append(piece)
+                size += len(piece)
+                if size >= STREAM_CHUNK_BYTES:
+                    self._write_chunk(''.join(buffer).encode('utf-8'))
+                    buffer, size = [], 0
+        except Exception:
+            # The status is already sent; leave the body unterminated so the client sees the failure
+            self.close_connection = True
+            return
+        if buffer:
+            self._write_chunk(''.join(buffer).encode('utf-8'))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ParkingApiServer(ThreadingHTTPServer):
+    """Threaded HTTP server bound to one ParkingService (its lock makes the calls safe)"""
+
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 8080), service=None, verbose=False):
+        super().__init__(address, ParkingApiHandler)
+        self.service = service if service is not None else ParkingService()
+        self.verbose = verbose
+
+
+# =============================================================================
+# LOOPBACK BENCHMARK CLIENT
+# =============================================================================
+
+class ApiClient:
+    """Minimal keep-alive JSON client over one http.client connection"""
+
+    def __init__(self, host, port, timeout=10):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, body=None):
+        """Return (status, decoded JSON body)"""
+        payload = _encode(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        self.connection.request(method, path, payload, headers)
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def close(self):
+        self.connection.close()
+
+
+def benchmark(host, port, requests=10000, clients=4, batch=1, level=1):
+    """
+    Drive a running server with park / lookup / remove cycles on keep-alive connections
+
+    Each client owns its own plates, so the clients never interfere. With
+    batch > 1 the parks of a cycle go through /levels/<level>/vehicles/batch.
+
+    Returns:
+        dict: {'requests', 'errors', 'elapsed', 'requests_per_sec', 'latency_ms': {p50, p95, p99, max}}
+    """
+    setup = ApiClient(host, port)
+    setup.request('POST', '/levels', {'level': level, 'regular_spaces': max(1000, clients * batch * 2),
+                                      'ev_spaces': 0})
+    setup.close()
+
+    per_client = max(1, requests // clients)
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+
+    def run(worker):
+        client = ApiClient(host, port)
+        timings = latencies[worker]
+        sent, cycle = 0, 0
+        try:
+            while sent < per_client:
+                plates = [f'B{worker}X{cycle}N{i}' for i in range(batch)]
+                vehicles = [{'regnum': plate, 'make': 'Bench', 'model': 'Mark', 'color': 'grey', 'ev': 0,
+                             'motor': 0} for plate in plates]
+                calls = [('POST', f'/levels/{level}/vehicles/batch', vehicles) if batch > 1
+                         else ('POST', f'/levels/{level}/vehicles', vehicles[0])]
+                started = time.perf_counter()
+                status, result = client.request(*calls[0])
+                timings.append(time.perf_counter() - started)
+                slots = ([item.get('slot_id') for item in result['results']] if batch > 1
+                         else [result.get('slot_id')])
+                errors[worker] += status != 200
+                for plate, slot_id in zip(plates, slots):
+                    for method, path in (('GET', f'/vehicles/{plate}'),
+                                         ('DELETE', f'/levels/{level}/slots/{slot_id}?regnum={plate}')):
+                        started = time.perf_counter()
+                        status, _ = client.request(method, path)
+                        timings.append(time.perf_counter() - started)
+                        errors[worker] += status != 200
+                sent += 1 + 2 * batch
+                cycle += 1
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=run, args=(worker,)) for worker in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = sorted(sample * 1000 for timings in latencies for sample in timings)
+    return {
+        'requests': len(samples),
+        'errors': sum(errors),
+        'elapsed': elapsed,
+        'requests_per_sec': len(samples) / elapsed if elapsed else 0.0,
+        'latency_ms': {name: percentile(samples, fraction) for name, fraction in
+                       (('p50', 0.50), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTTP/JSON API for ParkingService')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    parser.add_argument('--bench', action='store_true', help='run a loopback benchmark against an in-process server')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=4, help='concurrent keep-alive connections')
+    parser.add_argument('--batch', type=int, default=1, help='vehicles per park request')
+    args = parser.parse_args(argv)
+
+    server = ParkingApiServer((args.host, 0 if args.bench else args.port), verbose=args.verbose)
+    if not args.bench:
+        print(f'Serving the parking API on http://{args.host}:{server.server_address[1]}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        report = benchmark(args.host, server.server_address[1], args.requests, args.clients, args.batch)
+    finally:
+        server.shutdown()
+        server.server_close()
+    latency = report['latency_ms']
+    print(f"{report['requests']} requests in {report['elapsed']:.2f}s over {args.clients} connection(s): "
+          f"{report['requests_per_sec']:.0f} req/s, {report['errors']} error(s)")
+    print(f"latency ms: p50 {latency['p50']:.3f}  p95 {latency['p95']:.3f}  "
+          f"p99 {latency['p99']:.3f}  max {latency['max']:.3f}")
+
+
+if __name__ == '__main__':
+    main()
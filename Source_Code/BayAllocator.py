@@ -0,0 +1,339 @@
+"""
+Bay Allocator Layer - Size-aware free-space bookkeeping for one row of bays
+A segment tree over free bays finds the first run of k free bays in O(log n),
+and motorcycle bays that still have room are bucketed so several motorcycles
+can share one car bay.  Levels created with per-bay distances hand out the
+nearest free bay instead, from a lazily pruned min-heap
+"""
+
+import heapq
+
+# Bays taken by each vehicle kind; motorcycles share bays instead
+BAYS_PER_VEHICLE = {'car': 1, 'truck': 2, 'bus': 3}
+VEHICLE_KINDS = ('car', 'motorcycle', 'truck', 'bus')
+MOTORCYCLES_PER_BAY = 3
+
+
+class SharedBay(tuple):
+    """
+    Motorcycles parked together in one bay (a tuple of vehicle dicts)
+
+    Immutable like every other slot value, so copy-on-write snapshots keep
+    seeing the bay as it was; parking or removing a motorcycle stores a new
+    SharedBay in the slot.
+    """
+
+    __slots__ = ()
+
+
+def iter_vehicles(slots):
+    """
+    Yield (slot_index, vehicle) once per parked vehicle in a slot row
+
+    Motorcycles sharing a bay are yielded one by one with the bay's index;
+    a vehicle covering several bays is yielded once, at its first bay.
+    """
+    previous = None
+    for slot_index, occupant in enumerate(slots):
+        if occupant is None:
+            previous = None
+            continue
+        if isinstance(occupant, SharedBay):
+            for vehicle in occupant:
+                yield slot_index, vehicle
+        elif occupant is not previous:
+            yield slot_index, occupant
+        previous = occupant
+
+
+def vehicle_bays(vehicle):
+    """Number of consecutive bays a (non-shared) vehicle occupies"""
+    return vehicle.get('bays', 1)
+
+
+class FreeRunTree:
+    """
+    Segment tree answering "leftmost run of k free bays" in O(log n)
+
+    Every node stores the free run length at its left edge (prefix), at its
+    right edge (suffix) and the longest run inside it.  Capacity is kept at
+    a power of two with headroom, so growing within it is O(delta log n).
+    """
+
+    def __init__(self, size):
+        self._build(size)
+
+    def _build(self, size):
+        """Build an all-free tree level by level with list arithmetic - O(n) in C, not O(n log n)"""
+        capacity = 1
+        while capacity < max(size, 1):
+            capacity *= 2
+        self.capacity = capacity
+        self.size = size
+        self.free = size
+        prefix, suffix = [0], [0]  # node 0 is unused
+        length = capacity
+        while length:
+            # Nodes covering `length` bays; free bays are exactly [0, size)
+            count = capacity // length
+            full, partial = divmod(size, length)
+            full = min(full, count)
+            tail = count - full
+            partial_nodes = 1 if partial and tail else 0
+            prefix += [length] * full + [partial] * partial_nodes + [0] * (tail - partial_nodes)
+            suffix += [length] * full + [0] * tail
+            length //= 2
+        self._prefix = prefix
+        self._suffix = suffix
+        # Within an all-free prefix the longest run equals the left-edge run
+        self._best = list(prefix)
+
+    def resize(self, size):
+        """Bays at or past size become unavailable; new bays start free"""
+        if size > self.capacity:
+            taken = [i for i in range(self.size) if not self.is_free(i)]
+            self._build(size)
+            for i in taken:
+                self.set(i, False)
+            return
+        old_size = self.size
+        self.size = size
+        for i in range(min(old_size, size), max(old_size, size)):
+            self.set(i, i < size)
+
+    def is_free(self, index):
+        return self._best[self.capacity + index] == 1
+
+    def set(self, index, free):
+        """Mark one bay free or taken and update its ancestors"""
+        node = self.capacity + index
+        value = 1 if free else 0
+        prefix, suffix, best = self._prefix, self._suffix, self._best
+        self.free += value - best[node]
+        prefix[node] = suffix[node] = best[node] = value
+        half = 1
+        node //= 2
+        while node:
+            left, right = 2 * node, 2 * node + 1
+            prefix[node] = prefix[left] if prefix[left] < half else half + prefix[right]
+            suffix[node] = suffix[right] if suffix[right] < half else half + suffix[left]
+            best[node] = max(best[left], best[right], suffix[left] + prefix[right])
+            half *= 2
+            node //= 2
+
+    def find_run(self, length):
+        """Return the first index of the leftmost run of `length` free bays, or -1"""
+        if length < 1 or self._best[1] < length:
+            return -1
+        prefix, suffix, best = self._prefix, self._suffix, self._best
+        node, start, half = 1, 0, self.capacity // 2
+        while node < self.capacity:
+            left, right = 2 * node, 2 * node + 1
+            if best[left] >= length:
+                node = left
+            elif suffix[left] + prefix[right] >= length:
+                return start + half - suffix[left]
+            else:
+                node = right
+                start += half
+            half //= 2
+        return start
+
+    def free_count(self):
+        """Number of free bays"""
+        return self.free
+
+
+class BayAllocator:
+    """
+    Free-space authority for one row of bays (a level's regular or EV slots)
+
+    Whole bays come from a FreeRunTree (first fit, O(log n)).  Motorcycles
+    go best-fit into the fullest shared bay that still has room, tracked in
+    per-room-count buckets, and only open a fresh bay when none has.
+    The allocator only does bookkeeping; ParkingService stores the vehicles.
+
+    With `distances` (one weight per bay, e.g. metres to the lift) the
+    policy is nearest-first: free bays sit in a min-heap of (distance, bay)
+    and entries made stale by occupy() or set_distance() are skipped when
+    they surface, so park, remove and weight updates all stay O(log n).
+    """
+
+    def __init__(self, size, motorcycles_per_bay=MOTORCYCLES_PER_BAY, distances=None):
+        self.tree = FreeRunTree(size)
+        self.motorcycles_per_bay = max(1, motorcycles_per_bay)
+        # _room[n] = shared bays with exactly n motorcycle places left (1..motorcycles_per_bay-1)
+        self._room = [set() for _ in range(self.motorcycles_per_bay)]
+        self._room_of = {}  # shared bay index -> places left
+        self.distances = None
+        self._heap = []
+        if distances is not None:
+            if len(distances) != size:
+                raise ValueError(f'Expected {size} bay distances, got {len(distances)}')
+            self.distances = list(distances)
+            self._rebuild_heap()
+
+    def __len__(self):
+        return self.tree.size
+
+    def free_count(self):
+        """Whole bays currently free (O(1))"""
+        return self.tree.free
+
+    @property
+    def policy(self):
+        return 'first_fit' if self.distances is None else 'nearest'
+
+    def allocate(self, bays=1, first_fit=False):
+        """
+        Take a run of `bays` free bays and return its first index, or -1
+
+        The leftmost run under the first-fit policy (or when first_fit is
+        set), otherwise the run starting at the nearest free bay.
+        """
+        if first_fit or self.distances is None:
+            start = self.tree.find_run(bays)
+        else:
+            start = self._nearest_run(bays)
+        if start != -1:
+            self.occupy(start, bays)
+        return start
+
+    def set_distance(self, bay, distance):
+        """
+        Re-weight one bay in O(log n); the first call switches a first-fit
+        allocator to nearest-first, seeding the other bays with their index
+        """
+        if not 0 <= bay < self.tree.size:
+            raise IndexError(f'Bay {bay} is out of range')
+        if self.distances is None:
+            self.distances = list(range(self.tree.size))
+            self.distances[bay] = distance
+            self._rebuild_heap()
+            return
+        self.distances[bay] = distance
+        if self.tree.is_free(bay):
+            self._push(bay)
+
+    def _push(self, bay):
+        heap = self._heap
+        heapq.heappush(heap, (self.distances[bay], bay))
+        # Stale entries pile up on busy levels; compact once they dominate
+        if len(heap) > 2 * self.tree.size + 64:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        """O(n) heapify of the currently free bays"""
+        tree, distances = self.tree, self.distances
+        self._heap = [(distances[bay], bay) for bay in range(tree.size) if tree.is_free(bay)]
+        heapq.heapify(self._heap)
+
+    def _is_current(self, entry):
+        distance, bay = entry
+        return bay < self.tree.size and self.tree.is_free(bay) and self.distances[bay] == distance
+
+    def _nearest_run(self, bays):
+        """
+        First bay of the run of `bays` free bays starting nearest the entrance
+
+        Single bays pop straight off the heap.  Longer runs examine free bays
+        in distance order until one starts a long enough run, so trucks and
+        buses can cost more than O(log n) on a fragmented level.
+        """
+        if self.tree.find_run(bays) == -1:
+            return -1
+        heap, tree = self._heap, self.tree
+        skipped = []
+        start = -1
+        while heap:
+            entry = heapq.heappop(heap)
+            if not self._is_current(entry):
+                continue
+            bay = entry[1]
+            if bay + bays <= tree.size and all(tree.is_free(i) for i in range(bay + 1, bay + bays)):
+                start = bay
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return start
+
+    def occupy(self, start, bays=1):
+        """Mark an explicit run as taken (bulk restores); False if any bay is not free"""
+        if start < 0 or start + bays > self.tree.size:
+            return False
+        if not all(self.tree.is_free(i) for i in range(start, start + bays)):
+            return False
+        for i in range(start, start + bays):
+            self.tree.set(i, False)
+        return True
+
+    def release(self, start, bays=1):
+        for i in range(start, start + bays):
+            self.tree.set(i, True)
+            if self.distances is not None:
+                self._push(i)
+
+    def allocate_motorcycle(self):
+        """Return the bay index for one more motorcycle, or -1 if nothing fits"""
+        for room in range(1, self.motorcycles_per_bay):
+            bucket = self._room[room]
+            if bucket:
+                bay = next(iter(bucket))
+                self._set_room(bay, room - 1)
+                return bay
+        bay = self.allocate(1)
+        if bay != -1:
+            self._set_room(bay, self.motorcycles_per_bay - 1)
+        return bay
+
+    def occupy_motorcycle(self, bay):
+        """Place a motorcycle in an explicit bay; False if it has no room"""
+        room = self._room_of.get(bay)
+        if room is None:
+            if not self.occupy(bay, 1):
+                return False
+            room = self.motorcycles_per_bay
+        if room == 0:
+            return False
+        self._set_room(bay, room - 1)
+        return True
+
+    def release_motorcycle(self, bay):
+        room = self._room_of.get(bay, self.motorcycles_per_bay - 1) + 1
+        if room >= self.motorcycles_per_bay:
+            self._set_room(bay, None)
+            self.release(bay, 1)
+        else:
+            self._set_room(bay, room)
+
+    def resize(self, size):
+        """Grow or shrink; callers must have emptied bays at or past size"""
+        for bay in [bay for bay in self._room_of if bay >= size]:
+            self._set_room(bay, None)
+        old_size = self.tree.size
+        self.tree.resize(size)
+        if self.distances is not None:
+            # New bays rank behind every existing one until they are re-weighted
+            farthest = max(self.distances, default=0)
+            del self.distances[size:]
+            self.distances.extend([farthest] * (size - old_size))
+            for bay in range(old_size, size):
+                self._push(bay)
+
+    def move_shared_bay(self, source, target):
+        """Carry a shared bay's room count over when its motorcycles are relocated"""
+        room = self._room_of.get(source)
+        self._set_room(source, None)
+        if room is not None:
+            self._set_room(target, room)
+
+    def _set_room(self, bay, room):
+        old = self._room_of.pop(bay, None)
+        if old:
+            self._room[old].discard(bay)
+        if room is None:
+            return
+        self._room_of[bay] = room
+        if room:
+            self._room[room].add(bay)
@@ -0,0 +1,227 @@
+"""
+Capacity Simulator - Monte Carlo capacity planning over many lot scenarios
+Runs every layout x arrival model x policy combination for several seeded
+replications, each on its own in-process ParkingService, spread over a
+process pool. Reports turn-away rate, peak occupancy and EV charge
+satisfaction per scenario. A run's seed is derived from the base seed and
+the scenario name, so results do not depend on the worker count or order.
+
+Usage:
+    python CapacitySimulator.py --days 30 --replications 8
+    python CapacitySimulator.py --days 7 --workers 1     # single process, for profiling
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import random
+import statistics
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from BayAllocator import MOTORCYCLES_PER_BAY
+from LoadGenerator import ArrivalProfile, generate_trace
+from ParkingService import ParkingService
+
+Layout = namedtuple('Layout', ['name', 'levels', 'regular_spaces', 'ev_spaces'])
+# profile is 'poisson' or 'rush'; rate is base arrivals per hour, None to size it from the layout
+ArrivalModel = namedtuple('ArrivalModel', ['name', 'profile', 'rate', 'mean_stay_hours', 'ev_share',
+                                           'motorcycle_share'])
+# ev_overflow lets EVs take a regular slot (without charging) when the EV slots are full
+Policy = namedtuple('Policy', ['name', 'ev_overflow', 'motorcycles_per_bay'])
+Scenario = namedtuple('Scenario', ['layout', 'arrival', 'policy'])
+
+# EV charge model: arrive with 10-60%, charge at CHARGE_RATE percent per hour in an EV slot,
+# and count as satisfied if they leave with at least TARGET_CHARGE percent
+CHARGE_RATE = 25.0
+TARGET_CHARGE = 80
+INITIAL_CHARGE = (10, 60)
+
+DEFAULT_LAYOUTS = [Layout('current', 3, 500, 100), Layout('more_ev', 3, 470, 130), Layout('extra_level', 4, 500, 100)]
+DEFAULT_ARRIVALS = [ArrivalModel('weekday', 'rush', 300.0, 2.0, 0.2, 0.1),
+                    ArrivalModel('ev_growth', 'rush', 300.0, 2.0, 0.35, 0.1)]
+DEFAULT_POLICIES = [Policy('strict', False, MOTORCYCLES_PER_BAY), Policy('ev_overflow', True, MOTORCYCLES_PER_BAY)]
+
+
+def scenario_name(scenario):
+    return f'{scenario.layout.name}/{scenario.arrival.name}/{scenario.policy.name}'
+
+
+def scenario_grid(layouts=DEFAULT_LAYOUTS, arrivals=DEFAULT_ARRIVALS, policies=DEFAULT_POLICIES):
+    """Every layout x arrival model x policy combination"""
+    return [Scenario(*combination) for combination in itertools.product(layouts, arrivals, policies)]
+
+
+def run_seed(base_seed, scenario, replication):
+    """Stable 64-bit seed for one run (string hashing is randomized per process, so use sha256)"""
+    key = f'{base_seed}:{scenario_name(scenario)}:{replication}'.encode('utf-8')
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], 'big')
+
+
+def simulate(task):
+    """
+    Run one replication of one scenario on a fresh ParkingService
+
+    Args:
+        task (tuple): (scenario, replication, base_seed, days)
+
+    Returns:
+        dict: {'scenario', 'replication', 'arrivals', 'turned_away', 'peak_occupancy',
+               'ev_arrivals', 'ev_satisfied', 'ops', 'elapsed'}
+    """
+    scenario, replication, base_seed, days = task
+    layout, arrival, policy = scenario
+    seed = run_seed(base_seed, scenario, replication)
+    rate = arrival.rate if arrival.rate is not None else (
+        layout.regular_spaces * layout.levels / (arrival.mean_stay_hours * 6))
+    profile = ArrivalProfile.poisson(rate) if arrival.profile == 'poisson' else ArrivalProfile.rush_hour(rate)
+    events = generate_trace(layout.levels, layout.regular_spaces, layout.ev_spaces, days * 24.0, profile,
+                            arrival.mean_stay_hours, arrival.ev_share, arrival.motorcycle_share, seed)
+    charges = random.Random(seed ^ 0x5EED)
+
+    started = time.perf_counter()
+    service = ParkingService(cache_entries=0)
+    capacity = layout.levels * (layout.regular_spaces + layout.ev_spaces)
+    occupied = {}   # level -> bays in use
+    parked = {}     # regnum -> (level, slot_id, is_ev_slot, arrival hour, initial charge or None)
+    arrivals = turned_away = ev_arrivals = ev_satisfied = ops = 0
+    peak = 0
+
+    def recount(level):
+        counts = service.get_occupancy(level)['levels'][level]
+        occupied[level] = counts['regular_bays_used'] + counts['ev_bays_used']
+        return sum(occupied.values())
+
+    for event in events:
+        ops += 1
+        if event.op == 'create':
+            service.create_parking_lot(event.level, event.regular_spaces, event.ev_spaces,
+                                       motorcycles_per_bay=policy.motorcycles_per_bay)
+            occupied[event.level] = 0
+        elif event.op == 'park':
+            arrivals += 1
+            data = {'regnum': event.regnum, 'make': event.make, 'model': event.model,
+                    'color': event.color, 'ev': event.ev, 'motor': event.motor}
+            initial = charges.randint(*INITIAL_CHARGE) if event.ev else None
+            ev_arrivals += bool(event.ev)
+            result = service.park_vehicle(event.level, data)
+            is_ev_slot = bool(event.ev)
+            if not result['success'] and event.ev and policy.ev_overflow:
+                ops += 1
+                result = service.park_vehicle(event.level, dict(data, ev=0))
+                is_ev_slot = False
+            if not result['success']:
+                turned_away += 1
+                continue
+            parked[event.regnum] = (event.level, result['slot_id'], is_ev_slot, event.time, initial)
+            peak = max(peak, recount(event.level))
+        elif event.op == 'remove':
+            entry = parked.pop(event.regnum, None)
+            if entry is None:
+                continue  # turned away on arrival
+            level, slot_id, is_ev_slot, arrived, initial = entry
+            if is_ev_slot:
+                charge = min(100, int(initial + CHARGE_RATE * (event.time - arrived)))
+                service.update_charge(level, slot_id, charge, regnum=event.regnum)
+                ev_satisfied += charge >= TARGET_CHARGE
+                ops += 1
+            service.remove_vehicle(level, slot_id, is_ev_slot, regnum=event.regnum)
+            recount(level)
+
+    return {
+        'scenario': scenario_name(scenario),
+        'replication': replication,
+        'arrivals': arrivals,
+        'turned_away': turned_away,
+        'peak_occupancy': peak / capacity if capacity else 0.0,
+        'ev_arrivals': ev_arrivals,
+        'ev_satisfied': ev_satisfied,
+        'ops': ops,
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+def _mean_and_spread(values):
+    """Mean and 95% confidence half-width (normal approximation)"""
+    mean = statistics.fmean(values) if hasattr(statistics, 'fmean') else statistics.mean(values)
+    spread = 1.96 * statistics.stdev(values) / len(values) ** 0.5 if len(values) > 1 else 0.0
+    return mean, spread
+
+
+def aggregate(runs):
+    """
+    Combine replication results per scenario, in first-seen order
+
+    Returns:
+        list: {'scenario', 'replications', 'turn_away_rate', 'turn_away_ci', 'peak_occupancy',
+               'peak_occupancy_max', 'ev_satisfaction', 'ev_satisfaction_ci'} dicts
+    """
+    grouped = {}
+    for run in runs:
+        grouped.setdefault(run['scenario'], []).append(run)
+    summaries = []
+    for name, group in grouped.items():
+        turn_away, turn_away_ci = _mean_and_spread([run['turned_away'] / max(run['arrivals'], 1) for run in group])
+        satisfaction, satisfaction_ci = _mean_and_spread(
+            [run['ev_satisfied'] / max(run['ev_arrivals'], 1) for run in group])
+        summaries.append({
+            'scenario': name,
+            'replications': len(group),
+            'turn_away_rate': turn_away,
+            'turn_away_ci': turn_away_ci,
+            'peak_occupancy': statistics.mean(run['peak_occupancy'] for run in group),
+            'peak_occupancy_max': max(run['peak_occupancy'] for run in group),
+            'ev_satisfaction': satisfaction,
+            'ev_satisfaction_ci': satisfaction_ci,
+        })
+    return summaries
+
+
+def run_simulation(scenarios, replications=4, days=30, seed=0, workers=None):
+    """
+    Run every scenario `replications` times, in a process pool unless workers == 1
+
+    Runs are independent and CPU-bound, so throughput grows with the
+    number of cores; results come back in task order either way.
+
+    Returns:
+        dict: {'runs': [simulate() results], 'summary': aggregate() result, 'elapsed', 'workers'}
+    """
+    tasks = [(scenario, replication, seed, days) for scenario in scenarios for replication in range(replications)]
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    if workers == 1:
+        runs = [simulate(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(simulate, tasks))
+    return {'runs': runs, 'summary': aggregate(runs), 'elapsed': time.perf_counter() - started, 'workers': workers}
+
+
+def format_summary(result):
+    """Render run_simulation() output as a console table"""
+    lines = [f"{'scenario':<34} {'turn-away':>16} {'peak occ.':>10} {'EV charged':>16}"]
+    for row in result['summary']:
+        lines.append(f"{row['scenario']:<34} {row['turn_away_rate']:>8.2%} ±{row['turn_away_ci']:>6.2%} "
+                     f"{row['peak_occupancy']:>10.1%} "
+                     f"{row['ev_satisfaction']:>8.1%} ±{row['ev_satisfaction_ci']:>5.1%}")
+    ops = sum(run['ops'] for run in result['runs'])
+    lines.append(f"{len(result['runs'])} runs, {ops} service ops in {result['elapsed']:.1f}s "
+                 f"on {result['workers']} worker(s) ({ops / result['elapsed']:.0f} ops/s)")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo capacity planning for parking layouts')
+    parser.add_argument('--days', type=float, default=30.0, help='simulated days per run')
+    parser.add_argument('--replications', type=int, default=4, help='seeded runs per scenario')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per core)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(format_summary(run_simulation(scenario_grid(), args.replications, args.days, args.seed, args.workers)))
+
+
+if __name__ == '__main__':
+    main()
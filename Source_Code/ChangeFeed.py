@@ -0,0 +1,187 @@
+"""
+Change Feed - Publish/subscribe stream of ParkingService changes
+Every change gets a sequence number; subscribers receive events synchronously
+or through a bounded queue, and can catch up by replaying from a sequence number
+"""
+
+import logging
+import threading
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Event kinds
+LEVEL_CREATED = 'level_created'
+LEVEL_RESIZED = 'level_resized'
+VEHICLE_PARKED = 'parked'
+VEHICLE_REMOVED = 'removed'
+VEHICLE_EDITED = 'edited'
+CHARGE_UPDATED = 'charge_updated'
+EVENT_KINDS = (LEVEL_CREATED, LEVEL_RESIZED, VEHICLE_PARKED, VEHICLE_REMOVED, VEHICLE_EDITED, CHARGE_UPDATED)
+
+# details holds the kind-specific fields:
+#   level_created / level_resized: regular_spaces, ev_spaces
+#   parked / edited: slot_id, is_ev_slot, vehicle, bays
+#   removed: slot_id, is_ev_slot, bays, remaining (motorcycles still in a shared bay)
+#   charge_updated: slot_id, is_ev_slot, charge, bays
+# slot_id is the first bay; trucks and buses cover `bays` consecutive slots
+ChangeEvent = namedtuple('ChangeEvent', ['sequence', 'kind', 'level', 'details'])
+
+
+class ReplayGapError(Exception):
+    """Raised when a replay asks for events older than the retained history"""
+
+
+class Subscription:
+    """
+    One consumer of a ChangeFeed
+
+    With a callback, events are delivered synchronously on the publishing
+    thread.  Without one they are buffered (at most `buffer` events, oldest
+    dropped first) until the consumer calls get() or drain().  `dropped`
+    counts events lost to overflow; a consumer that sees it grow can
+    replay from its last seen sequence number or re-snapshot.  `errors`
+    counts events whose callback raised - the exception is logged and the
+    event skipped, never passed back to the publisher.
+    """
+
+    def __init__(self, feed, callback=None, kinds=None, levels=None, buffer=1000):
+        self.feed = feed
+        self.callback = callback
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self.levels = frozenset(levels) if levels is not None else None
+        self.dropped = 0
+        self.errors = 0
+        self.last_sequence = 0
+        self.closed = False
+        self._queue = deque(maxlen=buffer)
+        self._ready = threading.Condition()
+
+    def wants(self, event):
+        return ((self.kinds is None or event.kind in self.kinds)
+                and (self.levels is None or event.level in self.levels))
+
+    def deliver(self, event):
+        if self.callback is not None:
+            try:
+                self.callback(event)
+            except Exception:
+                # The change has already happened; a faulty consumer must not make it look failed
+                self.errors += 1
+                logger.exception('Change feed subscriber failed on event %d (%s)', event.sequence, event.kind)
+            self.last_sequence = event.sequence
+            return
+        with self._ready:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(event)
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """Return the next queued event, or None after timeout (queued subscriptions)"""
+        with self._ready:
+            if not self._queue and not self.closed:
+                self._ready.wait(timeout)
+            if not self._queue:
+                return None
+            event = self._queue.popleft()
+            self.last_sequence = event.sequence
+            return event
+
+    def drain(self, limit=None):
+        """Return all queued events (up to limit) without blocking"""
+        with self._ready:
+            count = len(self._queue) if limit is None else min(limit, len(self._queue))
+            events = [self._queue.popleft() for _ in range(count)]
+        if events:
+            self.last_sequence = events[-1].sequence
+        return events
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+    def __len__(self):
+        return len(self._queue)
+
+
+class ChangeFeed:
+    """
+    Sequenced event bus with a bounded replay history
+
+    publish() is called by ParkingService under its writer lock, after the
+    change is complete and the level's version bumped, so events are
+    numbered and delivered in exactly the order the changes happened.
+    Synchronous callbacks must therefore be quick and must not call back
+    into the service; an exception from one is logged and swallowed.
+    """
+
+    def __init__(self, history=10000):
+        self._history = deque(maxlen=history)
+        self._subscriptions = []
+        self._sequence = 0
+        self._lock = threading.RLock()
+
+    @property
+    def last_sequence(self):
+        return self._sequence
+
+    def publish(self, kind, level, **details):
+        """Number, record and deliver one event"""
+        with self._lock:
+            self._sequence += 1
+            event = ChangeEvent(self._sequence, kind, level, details)
+            self._history.append(event)
+            for subscription in self._subscriptions:
+                if subscription.wants(event):
+                    subscription.deliver(event)
+            return event
+
+    def subscribe(self, callback=None, kinds=None, levels=None, buffer=1000, since=None):
+        """
+        Add a subscriber
+
+        Args:
+            callback (callable): callback(event) for synchronous delivery, None to queue
+            kinds (iterable): Event kinds to receive, None for all
+            levels (iterable): Levels to receive, None for all
+            buffer (int): Queue bound for queued subscriptions
+            since (int): Replay retained events with sequence > since before live ones
+
+        Returns:
+            Subscription
+
+        Raises:
+            ReplayGapError: If events after `since` are no longer retained
+        """
+        subscription = Subscription(self, callback, kinds, levels, buffer)
+        with self._lock:
+            if since is None:
+                subscription.last_sequence = self._sequence
+            else:
+                subscription.last_sequence = since
+                for event in self.replay(since):
+                    if subscription.wants(event):
+                        subscription.deliver(event)
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        with subscription._ready:
+            subscription.closed = True
+            subscription._ready.notify_all()
+
+    def replay(self, since):
+        """
+        Return retained events with sequence > since, oldest first
+
+        Raises:
+            ReplayGapError: If some of those events have already been discarded
+        """
+        with self._lock:
+            oldest = self._history[0].sequence if self._history else self._sequence + 1
+            if since + 1 < oldest and since < self._sequence:
+                raise ReplayGapError(f'Events after {since} are no longer retained (oldest is {oldest})')
+            return [event for event in self._history if event.sequence > since]
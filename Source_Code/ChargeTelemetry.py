@@ -0,0 +1,301 @@
+"""
+Charge Telemetry - Coalesced ingestion of high-rate EV charge readings
+Chargers report state of charge every few seconds per vehicle. Readings are
+buffered per plate or per bay, with only the latest kept, and a flusher
+applies them to ParkingService in bulk once per flush window. Ingest never
+touches the service's writer lock, and a flush takes it once per batch, so
+park and remove keep running between batches.
+
+Usage:
+    python ChargeTelemetry.py --bench
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from LoadGenerator import percentile
+from PlateIndex import normalize_plate
+
+
+class ChargeTelemetry:
+    """
+    Per-key latest-value buffer in front of ParkingService.apply_charges
+
+    A reading is keyed by normalized plate, or by (level, slot_id, regnum)
+    for bay-keyed chargers.  Buffered keys keep the order of their latest
+    reading, so when a plate and a bay reading hit the same vehicle in one
+    window the later one wins.
+    """
+
+    def __init__(self, service, flush_interval=0.5, batch_size=100):
+        """
+        Args:
+            service (ParkingService): Service whose charge store readings are applied to
+            flush_interval (float): Seconds between background flushes (start())
+            batch_size (int): Readings applied per acquisition of the service's writer lock
+        """
+        self.service = service
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = {}  # key -> (level, slot_id, regnum, charge)
+        self._lock = threading.Lock()
+        # Serializes flushes so a manual flush() and the background flusher never interleave
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.applied = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def report_plate(self, regnum, charge):
+        """
+        Buffer a reading for the EV with this plate, wherever it is parked
+
+        Returns:
+            bool: False if the charge is out of range (the reading is dropped)
+        """
+        return self._buffer(normalize_plate(regnum), (None, None, regnum, charge))
+
+    def report_bay(self, level, slot_id, charge, regnum=None):
+        """
+        Buffer a reading for whatever EV occupies an EV slot
+
+        regnum is needed only for a bay shared by several motorcycles.
+
+        Returns:
+            bool: False if the charge is out of range (the reading is dropped)
+        """
+        return self._buffer((level, slot_id, regnum), (level, slot_id, regnum, charge))
+
+    def report_many(self, readings):
+        """
+        Buffer a burst of readings under one lock acquisition
+
+        Args:
+            readings (iterable): (regnum, charge) or (level, slot_id, charge) tuples
+
+        Returns:
+            int: Readings accepted
+        """
+        accepted = 0
+        with self._lock:
+            pending = self._pending
+            for reading in readings:
+                if len(reading) == 2:
+                    regnum, charge = reading
+                    key, update = normalize_plate(regnum), (None, None, regnum, charge)
+                else:
+                    level, slot_id, charge = reading
+                    key, update = (level, slot_id, None), (level, slot_id, None, charge)
+                self.received += 1
+                if not 0 <= charge <= 100:
+                    self.rejected += 1
+                    continue
+                # Re-insert so the key moves to the end - pending stays in latest-reading order
+                if pending.pop(key, None) is not None:
+                    self.coalesced += 1
+                pending[key] = update
+                accepted += 1
+        return accepted
+
+    def _buffer(self, key, update):
+        with self._lock:
+            self.received += 1
+            if not 0 <= update[3] <= 100:
+                self.rejected += 1
+                return False
+            if self._pending.pop(key, None) is not None:
+                self.coalesced += 1
+            self._pending[key] = update
+        return True
+
+    def flush(self):
+        """
+        Apply everything buffered so far, batch_size readings per writer-lock hold
+
+        Readings that arrive during a flush go into the next window.
+
+        Returns:
+            dict: {'applied': int, 'unchanged': int, 'skipped': int, 'seconds': float}
+        """
+        with self._flush_lock:
+            started = time.perf_counter()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            updates = list(pending.values())
+            totals = {'applied': 0, 'unchanged': 0, 'skipped': 0}
+            for offset in range(0, len(updates), self.batch_size):
+                result = self.service.apply_charges(updates[offset:offset + self.batch_size])
+                if not result['success']:
+                    totals['skipped'] += min(self.batch_size, len(updates) - offset)
+                    continue
+                for name in totals:
+                    totals[name] += result[name]
+            elapsed = time.perf_counter() - started
+            self.applied += totals['applied']
+            self.unchanged += totals['unchanged']
+            self.skipped += totals['skipped']
+            self.flushes += 1
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            return dict(totals, seconds=elapsed)
+
+    def start(self):
+        """Flush every flush_interval seconds on a daemon thread until stop()"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='charge-telemetry', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background flusher and apply whatever is still buffered"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def stats(self):
+        """Counters since creation"""
+        with self._lock:
+            return {'received': self.received, 'rejected': self.rejected, 'coalesced': self.coalesced,
+                    'pending': len(self._pending), 'applied': self.applied, 'unchanged': self.unchanged,
+                    'skipped': self.skipped, 'flushes': self.flushes,
+                    'last_flush_seconds': self.last_flush_seconds, 'max_flush_seconds': self.max_flush_seconds}
+
+
+def benchmark(rate=50000, seconds=2.0, vehicles=2000, flush_interval=0.25, seed=0):
+    """
+    Feed charge readings at `rate` per second while this thread parks and removes vehicles
+
+    A feeder thread pushes plate- and bay-keyed readings for `vehicles`
+    parked EVs in bursts of 250, paced to `rate`, with the background
+    flusher running; meanwhile this thread times park/remove cycles on a
+    second level until the feeder is done.
+
+    Returns:
+        dict: {'updates', 'target_per_sec', 'achieved_per_sec', 'max_ingest_per_sec', 'applied',
+               'coalesced', 'flushes', 'max_flush_ms', 'park_remove_ms': {p50, p99, max},
+               'baseline_ms': {p50, p99, max}}
+               baseline is the same park/remove cycle with no telemetry running, and
+               max_ingest_per_sec is unpaced buffering with no flusher
+    """
+    from ParkingService import ParkingService
+
+    service = ParkingService()
+    service.create_parking_lot(1, 0, vehicles)
+    service.create_parking_lot(2, 10, 0)
+    plates = [f'EV{i:05d}' for i in range(vehicles)]
+    for plate in plates:
+        service.park_vehicle(1, {'regnum': plate, 'make': 'Nissan', 'model': 'Leaf', 'color': 'white',
+                                 'ev': 1, 'motor': 0})
+
+    def cycle(samples, i):
+        began = time.perf_counter()
+        result = service.park_vehicle(2, {'regnum': f'W{i}', 'make': 'Ford', 'model': 'Focus',
+                                          'color': 'red', 'ev': 0, 'motor': 0})
+        service.remove_vehicle(2, result['slot_id'], regnum=f'W{i}')
+        samples.append((time.perf_counter() - began) * 1000)
+
+    def summary(samples):
+        samples.sort()
+        return {name: percentile(samples, fraction) for name, fraction in
+                (('p50', 0.50), ('p99', 0.99), ('max', 1.0))}
+
+    baseline = []
+    for i in range(2000):
+        cycle(baseline, i)
+
+    rng = random.Random(seed)
+    total = int(rate * seconds)
+    readings = [(plates[i], rng.randint(0, 100)) if i % 2 else (1, i + 1, rng.randint(0, 100))
+                for i in (rng.randrange(vehicles) for _ in range(total))]
+    bursts = [readings[offset:offset + 250] for offset in range(0, total, 250)]
+
+    began = time.perf_counter()
+    unpaced = ChargeTelemetry(service)
+    for burst in bursts:
+        unpaced.report_many(burst)
+    max_ingest = total / (time.perf_counter() - began)
+
+    telemetry = ChargeTelemetry(service, flush_interval)
+    fed = {}
+
+    def feed():
+        started = time.perf_counter()
+        for number, burst in enumerate(bursts):
+            delay = started + number * 250 / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            telemetry.report_many(burst)
+        fed['elapsed'] = time.perf_counter() - started
+
+    contended = []
+    with telemetry:
+        feeder = threading.Thread(target=feed)
+        feeder.start()
+        i = 0
+        while feeder.is_alive():
+            cycle(contended, i)
+            i += 1
+        feeder.join()
+    stats = telemetry.stats()
+    return {
+        'updates': total,
+        'target_per_sec': rate,
+        'achieved_per_sec': total / fed['elapsed'] if fed['elapsed'] else 0.0,
+        'max_ingest_per_sec': max_ingest,
+        'applied': stats['applied'],
+        'coalesced': stats['coalesced'],
+        'flushes': stats['flushes'],
+        'max_flush_ms': telemetry.max_flush_seconds * 1000,
+        'park_remove_ms': summary(contended),
+        'baseline_ms': summary(baseline),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Coalesced EV charge telemetry ingestion')
+    parser.add_argument('--bench', action='store_true', help='ingest readings while parking and removing')
+    parser.add_argument('--rate', type=int, default=50000, help='readings per second to feed')
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--vehicles', type=int, default=2000)
+    args = parser.parse_args(argv)
+    if args.bench:
+        report = benchmark(args.rate, args.seconds, args.vehicles)
+        print(f"ingest: {report['achieved_per_sec']:.0f} of {report['target_per_sec']} readings/s sustained "
+              f"(unpaced ceiling {report['max_ingest_per_sec']:.0f}/s); {report['coalesced']} coalesced, "
+              f"{report['applied']} applied in {report['flushes']} flushes, "
+              f"slowest flush {report['max_flush_ms']:.1f} ms")
+        for name in ('baseline_ms', 'park_remove_ms'):
+            latency = report[name]
+            print(f"{name:<15} p50 {latency['p50']:.3f} ms  p99 {latency['p99']:.3f} ms  max {latency['max']:.3f} ms")
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
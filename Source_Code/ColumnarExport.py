@@ -0,0 +1,146 @@
+"""
+Columnar Export - Parked vehicles as typed column arrays for analytics
+Builds one C-typed column per field in a single pass over a snapshot, with
+make/model/color dictionary-encoded, and hands them to NumPy without copying.
+NumPy is optional: only to_numpy(), save_npz() and load_npz() need it.
+"""
+
+import itertools
+from array import array
+
+from BayAllocator import iter_vehicles
+
+# Vehicle type codes used in the 'type_code' column
+TYPE_CODES = {'car': 0, 'motorcycle': 1, 'electric_car': 2, 'electric_motorcycle': 3,
+              'truck': 4, 'bus': 5, 'electric_truck': 6, 'electric_bus': 7}
+NO_CHARGE = -1  # 'charge' value for vehicles without a battery reading
+
+# Column name -> array typecode ('i' is a 32-bit int on every supported platform; charge is a
+# 32-bit float because update_charge accepts fractional percentages)
+COLUMN_TYPES = {
+    'level': 'i',
+    'slot_id': 'i',
+    'type_code': 'b',
+    'is_ev_slot': 'B',
+    'charge': 'f',
+    'make': 'i',
+    'model': 'i',
+    'color': 'i',
+}
+ENCODED_COLUMNS = ('make', 'model', 'color')
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('Columnar NumPy export needs numpy - install it with "pip install numpy"') from None
+    return numpy
+
+
+def build_columns(snapshots):
+    """
+    Encode occupied slots of LevelSnapshots into typed arrays
+
+    Each row appends one machine integer per column; no per-row tuple or
+    dict is kept, so a 1M-slot site costs ~17 bytes per parked vehicle.
+
+    Args:
+        snapshots (dict): {level: LevelSnapshot}, as returned by ParkingService.snapshot()
+
+    Returns:
+        dict: {'columns': {name: array.array}, 'dictionaries': {'make'|'model'|'color': [str]}}
+              one row per vehicle (at its first bay), ordered by level, then
+              regular before EV slots, then slot id
+    """
+    columns = {name: array(typecode) for name, typecode in COLUMN_TYPES.items()}
+    codes = {name: {} for name in ENCODED_COLUMNS}
+    append = {name: column.append for name, column in columns.items()}
+    make_codes, model_codes, color_codes = codes['make'], codes['model'], codes['color']
+
+    for level in sorted(snapshots):
+        snapshot = snapshots[level]
+        for is_ev_slot, slots in ((0, snapshot.regular_slots), (1, snapshot.ev_slots)):
+            for slot_index, vehicle in iter_vehicles(slots):
+                append['level'](level)
+                append['slot_id'](slot_index + 1)
+                append['type_code'](TYPE_CODES.get(vehicle['type'], -1))
+                append['is_ev_slot'](is_ev_slot)
+                charge = vehicle.get('charge')
+                append['charge'](NO_CHARGE if charge is None else charge)
+                append['make'](make_codes.setdefault(vehicle['make'], len(make_codes)))
+                append['model'](model_codes.setdefault(vehicle['model'], len(model_codes)))
+                append['color'](color_codes.setdefault(vehicle['color'], len(color_codes)))
+
+    # dicts keep insertion order, which is exactly code order
+    return {'columns': columns, 'dictionaries': {name: list(codes[name]) for name in ENCODED_COLUMNS}}
+
+
+def merge_columns(parts):
+    """
+    Combine build_columns() outputs for disjoint sets of levels into one
+
+    Rows are re-ordered by level (within a level they keep their order) and
+    make/model/color codes are re-mapped onto one shared set of dictionaries.
+
+    Args:
+        parts (list): build_columns() results, e.g. one per shard
+
+    Returns:
+        dict: Same layout as build_columns()
+    """
+    columns = {name: array(typecode) for name, typecode in COLUMN_TYPES.items()}
+    codes = {name: {} for name in ENCODED_COLUMNS}
+    translations = []
+    runs = []  # (level, part number, first row, end row)
+    for number, part in enumerate(parts):
+        translations.append({name: [codes[name].setdefault(value, len(codes[name]))
+                                    for value in part['dictionaries'][name]] for name in ENCODED_COLUMNS})
+        start = 0
+        for level, rows in itertools.groupby(part['columns']['level']):
+            end = start + sum(1 for _ in rows)
+            runs.append((level, number, start, end))
+            start = end
+
+    for level, number, start, end in sorted(runs):
+        part = parts[number]['columns']
+        for name, column in columns.items():
+            if name in ENCODED_COLUMNS:
+                translate = translations[number][name]
+                column.extend(translate[code] for code in part[name][start:end])
+            else:
+                column.extend(part[name][start:end])
+    return {'columns': columns, 'dictionaries': {name: list(codes[name]) for name in ENCODED_COLUMNS}}
+
+
+def to_numpy(encoded):
+    """
+    Wrap build_columns() output as NumPy arrays (zero-copy via the buffer protocol)
+
+    Returns:
+        dict: {'columns': {name: ndarray}, 'dictionaries': {name: ndarray of str}}
+    """
+    numpy = _require_numpy()
+    columns = {name: numpy.frombuffer(column, dtype=column.typecode) if len(column)
+               else numpy.zeros(0, dtype=column.typecode)
+               for name, column in encoded['columns'].items()}
+    dictionaries = {name: numpy.array(values, dtype=str) for name, values in encoded['dictionaries'].items()}
+    return {'columns': columns, 'dictionaries': dictionaries}
+
+
+def save_npz(path, exported):
+    """Write to_numpy() output to an .npz file (dictionaries stored as '<name>_values')"""
+    numpy = _require_numpy()
+    arrays = dict(exported['columns'])
+    for name, values in exported['dictionaries'].items():
+        arrays[f'{name}_values'] = values
+    numpy.savez(path, **arrays)
+
+
+def load_npz(path):
+    """Read a file written by save_npz back into the to_numpy() layout"""
+    numpy = _require_numpy()
+    with numpy.load(path, allow_pickle=False) as data:
+        columns = {name: data[name] for name in COLUMN_TYPES}
+        dictionaries = {name: data[f'{name}_values'] for name in ENCODED_COLUMNS}
+    return {'columns': columns, 'dictionaries': dictionaries}
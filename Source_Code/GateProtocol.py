@@ -0,0 +1,390 @@
+"""
+Gate Protocol - Compact binary request/response frames for gate controllers
+Fixed fields are packed with precompiled struct layouts and strings carry a
+one-byte length, so a park request is ~45 bytes against ~90 of JSON body
+(plus HTTP headers) and decoding is a handful of unpack_from calls. Every frame carries a request id,
+so clients can pipeline many requests on one connection and match replies.
+
+Frame:      length u32 (bytes that follow) | opcode u8 | request_id u32 | payload
+Requests:   PARK       level i32 | ev u8 | kind u8 | regnum, make, model, color (u8 length + UTF-8)
+            REMOVE     level i32 | slot_id u32 | ev u8 | regnum (empty = any)
+            LOOKUP     regnum
+            OCCUPANCY  level i32 | all_levels u8
+Responses:  opcode | 0x80, same request id, then status u8 and
+            PARK       level i32 | slot_id u32 | ev u8 | message   (the existing location on DUPLICATE)
+            REMOVE     message
+            LOOKUP     count u16 | count x (level i32 | slot_id u32 | ev u8)
+            OCCUPANCY  regular_capacity, regular_occupied, ev_capacity, ev_occupied (u32 each, occupied in bays)
+Messages use a u16 length and are empty on success. A BAD_REQUEST reply to
+any opcode is just status | message.
+
+Usage:
+    python GateProtocol.py --port 9090                          # serve
+    python GateProtocol.py --bench --requests 20000 --pipeline 32  # binary vs JSON on loopback
+"""
+
+import argparse
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from BayAllocator import VEHICLE_KINDS
+from LoadGenerator import percentile
+from ParkingService import ParkingService
+
+# Opcodes
+PARK = 1
+REMOVE = 2
+LOOKUP = 3
+OCCUPANCY = 4
+RESPONSE = 0x80
+
+# Response status codes
+OK = 0
+FAILED = 1
+DUPLICATE = 2
+BAD_REQUEST = 3
+
+MAX_FRAME = 64 * 1024
+
+LENGTH = struct.Struct('!I')
+HEADER = struct.Struct('!IBI')       # length, opcode, request id
+PARK_FIELDS = struct.Struct('!iBB')
+REMOVE_FIELDS = struct.Struct('!iIB')
+OCCUPANCY_FIELDS = struct.Struct('!iB')
+STATUS = struct.Struct('!B')
+PARK_RESULT = struct.Struct('!BiIB')
+LOCATION = struct.Struct('!iIB')
+COUNT = struct.Struct('!BH')          # status, match count
+COUNTS = struct.Struct('!BIIII')
+MESSAGE_LENGTH = struct.Struct('!H')
+KIND_CODES = {kind: code for code, kind in enumerate(VEHICLE_KINDS)}
+
+
+class ProtocolError(ValueError):
+    """Raised for a malformed or oversized frame"""
+
+
+def _string(text):
+    data = text.encode('utf-8')
+    if len(data) > 255:
+        raise ProtocolError(f'Field too long for the gate protocol: {text[:20]!r}...')
+    return bytes((len(data),)) + data
+
+
+def _read_string(frame, offset):
+    length = frame[offset]
+    end = offset + 1 + length
+    if end > len(frame):
+        raise ProtocolError('Truncated string field')
+    return frame[offset + 1:end].decode('utf-8'), end
+
+
+def _frame(opcode, request_id, payload):
+    return HEADER.pack(len(payload) + 5, opcode, request_id) + payload
+
+
+def _message(text):
+    data = text.encode('utf-8')[:0xFFFF]
+    return MESSAGE_LENGTH.pack(len(data)) + data
+
+
+# =============================================================================
+# REQUEST ENCODERS (client side)
+# =============================================================================
+
+def encode_park(request_id, level, regnum, make, model, color, ev=False, kind='car'):
+    return _frame(PARK, request_id, PARK_FIELDS.pack(level, 1 if ev else 0, KIND_CODES[kind]) + _string(regnum)
+                  + _string(make) + _string(model) + _string(color))
+
+
+def encode_remove(request_id, level, slot_id, ev=False, regnum=None):
+    return _frame(REMOVE, request_id, REMOVE_FIELDS.pack(level, slot_id, 1 if ev else 0) + _string(regnum or ''))
+
+
+def encode_lookup(request_id, regnum):
+    return _frame(LOOKUP, request_id, _string(regnum))
+
+
+def encode_occupancy(request_id, level=None):
+    return _frame(OCCUPANCY, request_id, OCCUPANCY_FIELDS.pack(level or 0, 1 if level is None else 0))
+
+
+def decode_response(frame):
+    """
+    Decode one response frame body (everything after the length prefix)
+
+    Returns:
+        tuple: (opcode, request_id, status, result) where result is
+               PARK (level, slot_id, ev, message), REMOVE message,
+               LOOKUP [(level, slot_id, ev)], OCCUPANCY (reg_cap, reg_occ, ev_cap, ev_occ);
+               a BAD_REQUEST result is its message
+    """
+    opcode, request_id = frame[0] & ~RESPONSE, LENGTH.unpack_from(frame, 1)[0]
+    offset = 5
+    if frame[offset] == BAD_REQUEST or opcode == REMOVE:
+        (length,) = MESSAGE_LENGTH.unpack_from(frame, offset + 1)
+        return opcode, request_id, frame[offset], frame[offset + 3:offset + 3 + length].decode('utf-8')
+    if opcode == PARK:
+        status, level, slot_id, ev = PARK_RESULT.unpack_from(frame, offset)
+        offset += PARK_RESULT.size
+        (length,) = MESSAGE_LENGTH.unpack_from(frame, offset)
+        message = frame[offset + 2:offset + 2 + length].decode('utf-8')
+        return opcode, request_id, status, (level, slot_id, bool(ev), message)
+    if opcode == LOOKUP:
+        status, count = COUNT.unpack_from(frame, offset)
+        offset += COUNT.size
+        matches = [LOCATION.unpack_from(frame, offset + i * LOCATION.size) for i in range(count)]
+        return opcode, request_id, status, [(level, slot_id, bool(ev)) for level, slot_id, ev in matches]
+    status, *counts = COUNTS.unpack_from(frame, offset)
+    return opcode, request_id, status, tuple(counts)
+
+
+# =============================================================================
+# SERVER SIDE
+# =============================================================================
+
+def handle_frame(service, frame):
+    """
+    Decode one request frame body, call the service and return the encoded response
+
+    Fields are unpacked straight into the service call's arguments; the
+    only dict built is the vehicle_data that park_vehicle takes.
+    """
+    opcode, request_id = frame[0], LENGTH.unpack_from(frame, 1)[0]
+    reply = opcode | RESPONSE
+    try:
+        if opcode == PARK:
+            level, ev, kind_code = PARK_FIELDS.unpack_from(frame, 5)
+            offset = 5 + PARK_FIELDS.size
+            regnum, offset = _read_string(frame, offset)
+            make, offset = _read_string(frame, offset)
+            model, offset = _read_string(frame, offset)
+            color, offset = _read_string(frame, offset)
+            result = service.park_vehicle(level, {'regnum': regnum, 'make': make, 'model': model,
+                                                  'color': color, 'ev': ev, 'kind': VEHICLE_KINDS[kind_code]})
+            if result['success']:
+                payload = PARK_RESULT.pack(OK, level, result['slot_id'], ev) + b'\0\0'
+            elif 'duplicate' in result:
+                existing = result['duplicate']
+                payload = (PARK_RESULT.pack(DUPLICATE, existing['level'], existing['slot_id'], existing['is_ev_slot'])
+                           + _message(result['message']))
+            else:
+                payload = PARK_RESULT.pack(FAILED, level, 0, ev) + _message(result['message'])
+        elif opcode == REMOVE:
+            level, slot_id, ev = REMOVE_FIELDS.unpack_from(frame, 5)
+            regnum, _ = _read_string(frame, 5 + REMOVE_FIELDS.size)
+            result = service.remove_vehicle(level, slot_id, bool(ev), regnum or None)
+            if result['success']:
+                payload = STATUS.pack(OK) + b'\0\0'
+            else:
+                payload = STATUS.pack(FAILED) + _message(result['message'])
+        elif opcode == LOOKUP:
+            regnum, _ = _read_string(frame, 5)
+            matches = service.find_vehicle(regnum)['matches'][:0xFFFF]
+            payload = COUNT.pack(OK if matches else FAILED, len(matches)) + b''.join(
+                LOCATION.pack(match['level'], match['slot_id'], match['is_ev_slot']) for match in matches)
+        elif opcode == OCCUPANCY:
+            level, all_levels = OCCUPANCY_FIELDS.unpack_from(frame, 5)
+            result = service.get_occupancy(None if all_levels else level)
+            if result['success']:
+                totals = result['totals']
+                # Bays, not vehicles, so a gate can show capacity - occupied as free spaces
+                payload = COUNTS.pack(OK, totals['regular_capacity'], totals['regular_bays_used'],
+                                      totals['ev_capacity'], totals['ev_bays_used'])
+            else:
+                payload = COUNTS.pack(FAILED, 0, 0, 0, 0)
+        else:
+            return _frame(reply, request_id, STATUS.pack(BAD_REQUEST) + _message(f'Unknown opcode {opcode}'))
+    except (struct.error, ProtocolError, IndexError, UnicodeDecodeError) as e:
+        return _frame(reply, request_id, STATUS.pack(BAD_REQUEST) + _message(f'Malformed request: {e}'))
+    return _frame(reply, request_id, payload)
+
+
+class GateRequestHandler(socketserver.BaseRequestHandler):
+    """
+    Serve one gate connection
+
+    Reads whatever has arrived, answers every complete frame in it and
+    sends all the replies with one sendall, so pipelined requests cost one
+    system call per burst rather than per request.
+    """
+
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        service = self.server.service
+        buffer = bytearray()
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            buffer += data
+            replies = []
+            offset = 0
+            while len(buffer) - offset >= 4:
+                (length,) = LENGTH.unpack_from(buffer, offset)
+                if length < 5 or length > MAX_FRAME:
+                    return  # not a gate client - drop the connection
+                if len(buffer) - offset - 4 < length:
+                    break
+                replies.append(handle_frame(service, bytes(buffer[offset + 4:offset + 4 + length])))
+                offset += 4 + length
+            del buffer[:offset]
+            if replies:
+                sock.sendall(b''.join(replies))
+
+
+class GateServer(socketserver.ThreadingTCPServer):
+    """Threaded TCP server speaking the gate protocol for one ParkingService"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 9090), service=None):
+        super().__init__(address, GateRequestHandler)
+        self.service = service if service is not None else ParkingService()
+
+
+class GateClient:
+    """Blocking gate-protocol client; send() many frames, then read their replies in order"""
+
+    def __init__(self, host, port, timeout=10):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer = bytearray()
+        self._next_id = 0
+
+    def next_id(self):
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        return self._next_id
+
+    def send(self, *frames):
+        self.sock.sendall(b''.join(frames))
+
+    def receive(self):
+        """Read and decode the next response frame"""
+        while True:
+            if len(self._buffer) >= 4:
+                (length,) = LENGTH.unpack_from(self._buffer)
+                if len(self._buffer) >= 4 + length:
+                    frame = bytes(self._buffer[4:4 + length])
+                    del self._buffer[:4 + length]
+                    return decode_response(frame)
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError('Gate server closed the connection')
+            self._buffer += data
+
+    def call(self, encoder, *args, **kwargs):
+        """Send one request built by an encode_* function and wait for its reply"""
+        self.send(encoder(self.next_id(), *args, **kwargs))
+        return self.receive()
+
+    def close(self):
+        self.sock.close()
+
+
+# =============================================================================
+# LOOPBACK BENCHMARK: BINARY VS JSON
+# =============================================================================
+
+def benchmark(server, requests=10000, pipeline=1, level=1):
+    """
+    Park / lookup / remove cycles over one connection, `pipeline` cycles per round trip
+
+    The protocol has no create-level request, so the level is created on
+    the running GateServer's service directly.
+
+    Returns:
+        dict: {'requests', 'errors', 'elapsed', 'requests_per_sec', 'latency_ms': {p50, p95, p99, max}}
+              latency is per round trip (a whole pipelined burst)
+    """
+    server.service.create_parking_lot(level, max(1000, pipeline * 2), 0)
+    client = GateClient(*server.server_address[:2])
+    round_trips = []
+    errors = sent = cycle = 0
+    started = time.perf_counter()
+    try:
+        while sent < requests:
+            plates = [f'G{cycle}N{i}' for i in range(pipeline)]
+            cycle += 1
+            began = time.perf_counter()
+            client.send(*(encode_park(client.next_id(), level, plate, 'Bench', 'Mark', 'grey') for plate in plates))
+            parked = [client.receive() for _ in plates]
+            round_trips.append(time.perf_counter() - began)
+
+            began = time.perf_counter()
+            frames = []
+            for plate, (_, _, status, (_, slot_id, ev, _)) in zip(plates, parked):
+                errors += status != OK
+                frames.append(encode_lookup(client.next_id(), plate))
+                frames.append(encode_remove(client.next_id(), level, slot_id, ev, plate))
+            client.send(*frames)
+            errors += sum(client.receive()[2] != OK for _ in frames)
+            round_trips.append(time.perf_counter() - began)
+            sent += 3 * pipeline
+    finally:
+        client.close()
+    elapsed = time.perf_counter() - started
+
+    samples = sorted(sample * 1000 for sample in round_trips)
+    return {
+        'requests': sent,
+        'errors': errors,
+        'elapsed': elapsed,
+        'requests_per_sec': sent / elapsed if elapsed else 0.0,
+        'latency_ms': {name: percentile(samples, fraction) for name, fraction in
+                       (('p50', 0.50), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))},
+    }
+
+
+def _format(name, report):
+    latency = report['latency_ms']
+    return (f"{name:<22} {report['requests_per_sec']:>9.0f} req/s  p50 {latency['p50']:.3f} ms  "
+            f"p99 {latency['p99']:.3f} ms  ({report['requests']} requests, {report['errors']} errors)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Binary gate protocol server for ParkingService')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--bench', action='store_true', help='compare binary and JSON APIs on loopback')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--pipeline', type=int, default=32, help='park/lookup/remove cycles per round trip')
+    args = parser.parse_args(argv)
+
+    if not args.bench:
+        server = GateServer((args.host, args.port))
+        print(f'Serving the gate protocol on {args.host}:{server.server_address[1]}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    from ApiServer import ParkingApiServer, benchmark as json_benchmark
+
+    gate = GateServer((args.host, 0))
+    api = ParkingApiServer((args.host, 0))
+    for server in (gate, api):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        print(_format('binary', benchmark(gate, args.requests, 1, level=1)))
+        print(_format(f'binary, pipeline {args.pipeline}', benchmark(gate, args.requests, args.pipeline, level=2)))
+        print(_format('JSON over HTTP', json_benchmark(args.host, api.server_address[1], args.requests, clients=1)))
+    finally:
+        for server in (gate, api):
+            server.shutdown()
+            server.server_close()
+    park = encode_park(1, 1, 'AB123CD', 'Toyota', 'Corolla', 'silver')
+    json_park = (b'{"regnum":"AB123CD","make":"Toyota","model":"Corolla","color":"silver","ev":0,"motor":0}')
+    print(f'park request size: {len(park)} bytes binary vs {len(json_park)} bytes JSON body (plus HTTP headers)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Load Generator - Synthetic gate traffic for ParkingService
+Generates arrival/departure traces (Poisson or rush-hour profiles), records and
+replays them deterministically, and reports sustained ops/sec and latency
+percentiles. Runs fully offline as a stand-in for real gate hardware.
+
+Usage:
+    python LoadGenerator.py --levels 3 --regular 500 --ev 100 --hours 24 --profile rush
+    python LoadGenerator.py --record trace.jsonl --hours 8
+    python LoadGenerator.py --replay trace.jsonl
+"""
+
+import argparse
+import heapq
+import json
+import math
+import random
+import string
+import time
+from collections import namedtuple
+
+from ParkingService import ParkingService
+
+# One gate event: op is 'create', 'park' or 'remove'; time is in simulated hours
+TraceEvent = namedtuple('TraceEvent', ['time', 'op', 'level', 'regnum', 'make', 'model', 'color',
+                                       'ev', 'motor', 'regular_spaces', 'ev_spaces'])
+TraceEvent.__new__.__defaults__ = (None,) * 9
+
+MAKES = {
+    'Toyota': ['Corolla', 'Camry', 'Prius'],
+    'Ford': ['Focus', 'Fiesta', 'Transit'],
+    'Honda': ['Civic', 'Accord', 'CB500'],
+    'Tesla': ['Model 3', 'Model Y'],
+    'Nissan': ['Leaf', 'Micra'],
+}
+COLORS = ['white', 'black', 'silver', 'grey', 'blue', 'red', 'green']
+
+
+class ArrivalProfile:
+    """
+    Arrival rate over the day, in vehicles per simulated hour
+
+    A flat profile gives a homogeneous Poisson process; peaks add Gaussian
+    bumps (e.g. morning and evening rush) on top of the base rate.
+    """
+
+    def __init__(self, base_rate, peaks=()):
+        """
+        Args:
+            base_rate (float): Arrivals per hour outside the peaks
+            peaks (iterable): (hour of day, extra arrivals per hour, width in hours) tuples
+        """
+        self.base_rate = base_rate
+        self.peaks = list(peaks)
+
+    @classmethod
+    def poisson(cls, rate):
+        """Constant-rate profile"""
+        return cls(rate)
+
+    @classmethod
+    def rush_hour(cls, base_rate, peak_rate=None):
+        """Morning (08:00) and evening (17:30) rush on top of base_rate"""
+        extra = (peak_rate if peak_rate is not None else base_rate * 4) - base_rate
+        return cls(base_rate, [(8.0, extra, 1.0), (17.5, extra, 1.25)])
+
+    def rate_at(self, hour):
+        """Arrival rate at a simulated time in hours"""
+        hour_of_day = hour % 24
+        rate = self.base_rate
+        for center, extra, width in self.peaks:
+            rate += extra * math.exp(-0.5 * ((hour_of_day - center) / width) ** 2)
+        return rate
+
+    def max_rate(self):
+        """Upper bound of rate_at, used for thinning"""
+        return self.base_rate + sum(max(extra, 0) for center, extra, width in self.peaks)
+
+
+def generate_trace(levels=1, regular_spaces=200, ev_spaces=50, hours=24.0, profile=None,
+                   mean_stay_hours=2.0, ev_share=0.2, motorcycle_share=0.1, seed=0):
+    """
+    Generate a deterministic gate trace
+
+    Arrivals follow a (non-homogeneous) Poisson process drawn by thinning;
+    each arriving vehicle picks a random level and leaves after an
+    exponentially distributed stay.
+
+    Args:
+        levels (int): Number of levels, numbered from 1
+        regular_spaces (int): Regular slots per level
+        ev_spaces (int): EV slots per level
+        hours (float): Simulated duration
+        profile (ArrivalProfile): Arrival rate profile, defaults to a rush-hour day
+        mean_stay_hours (float): Mean parking duration
+        ev_share (float): Fraction of arrivals that are electric
+        motorcycle_share (float): Fraction of arrivals that are motorcycles
+        seed (int): Random seed - the same arguments always give the same trace
+
+    Returns:
+        list: TraceEvent items ordered by time, starting with level creation
+    """
+    rng = random.Random(seed)
+    if profile is None:
+        profile = ArrivalProfile.rush_hour(regular_spaces * levels / (mean_stay_hours * 6))
+    events = [TraceEvent(0.0, 'create', level, regular_spaces=regular_spaces, ev_spaces=ev_spaces)
+              for level in range(1, levels + 1)]
+
+    departures = []  # heap of (time, sequence, regnum)
+    max_rate = profile.max_rate()
+    now = 0.0
+    sequence = 0
+    while max_rate > 0:
+        now += rng.expovariate(max_rate)
+        if now >= hours:
+            break
+        while departures and departures[0][0] <= now:
+            depart_time, _, regnum = heapq.heappop(departures)
+            events.append(TraceEvent(depart_time, 'remove', regnum=regnum))
+        # Thinning: keep the candidate arrival with probability rate(t) / max_rate
+        if rng.random() * max_rate > profile.rate_at(now):
+            continue
+        sequence += 1
+        make = rng.choice(sorted(MAKES))
+        regnum = ''.join(rng.choice(string.ascii_uppercase) for _ in range(2)) + '%05d' % sequence
+        events.append(TraceEvent(now, 'park', rng.randint(1, levels), regnum, make,
+                                 rng.choice(MAKES[make]), rng.choice(COLORS),
+                                 int(rng.random() < ev_share), int(rng.random() < motorcycle_share)))
+        heapq.heappush(departures, (now + rng.expovariate(1.0 / mean_stay_hours), sequence, regnum))
+
+    while departures and departures[0][0] < hours:
+        depart_time, _, regnum = heapq.heappop(departures)
+        events.append(TraceEvent(depart_time, 'remove', regnum=regnum))
+    return events
+
+
+def save_trace(events, path):
+    """Write a trace as JSON lines, one event per line"""
+    with open(path, 'w', encoding='utf-8') as handle:
+        for event in events:
+            record = {key: value for key, value in event._asdict().items() if value is not None}
+            handle.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def load_trace(path):
+    """Read a trace written by save_trace"""
+    with open(path, encoding='utf-8') as handle:
+        return [TraceEvent(**json.loads(line)) for line in handle if line.strip()]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, int(math.ceil(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def replay(events, service=None):
+    """
+    Drive a ParkingService with a trace as fast as possible
+
+    Departures are resolved to the slot the vehicle was given at park
+    time, so a replay against a fresh service is fully deterministic.
+
+    Args:
+        events (iterable): TraceEvent items
+        service (ParkingService): Target service, a new one if None
+
+    Returns:
+        dict: {'ops', 'elapsed', 'ops_per_sec', 'turned_away', 'skipped', 'latency_ms': {op: stats}}
+    """
+    service = service if service is not None else ParkingService()
+    parked = {}  # regnum -> (level, slot_id, is_ev_slot)
+    latencies = {'create': [], 'park': [], 'remove': []}
+    turned_away = skipped = 0
+    clock = time.perf_counter
+
+    started = clock()
+    for event in events:
+        if event.op == 'park':
+            data = {'regnum': event.regnum, 'make': event.make, 'model': event.model,
+                    'color': event.color, 'ev': event.ev, 'motor': event.motor}
+            op_start = clock()
+            result = service.park_vehicle(event.level, data)
+            latencies['park'].append(clock() - op_start)
+            if result['success']:
+                parked[event.regnum] = (event.level, result['slot_id'], event.ev == 1)
+            else:
+                turned_away += 1
+        elif event.op == 'remove':
+            location = parked.pop(event.regnum, None)
+            if location is None:
+                # Vehicle was turned away at arrival - nothing to remove
+                skipped += 1
+                continue
+            op_start = clock()
+            # The plate picks the right motorcycle when several share a bay
+            service.remove_vehicle(*location, regnum=event.regnum)
+            latencies['remove'].append(clock() - op_start)
+        elif event.op == 'create':
+            op_start = clock()
+            service.create_parking_lot(event.level, event.regular_spaces, event.ev_spaces)
+            latencies['create'].append(clock() - op_start)
+    elapsed = clock() - started
+
+    ops = sum(len(values) for values in latencies.values())
+    report = {
+        'ops': ops,
+        'elapsed': elapsed,
+        'ops_per_sec': ops / elapsed if elapsed > 0 else 0.0,
+        'turned_away': turned_away,
+        'skipped': skipped,
+        'latency_ms': {}
+    }
+    for op, values in latencies.items():
+        if not values:
+            continue
+        values.sort()
+        report['latency_ms'][op] = {
+            'count': len(values),
+            'p50': percentile(values, 0.50) * 1000,
+            'p90': percentile(values, 0.90) * 1000,
+            'p99': percentile(values, 0.99) * 1000,
+            'max': values[-1] * 1000
+        }
+    return report
+
+
+def format_report(report):
+    """Render a replay report as console text"""
+    lines = [
+        f"Operations: {report['ops']} in {report['elapsed']:.3f}s "
+        f"({report['ops_per_sec']:.0f} ops/sec)",
+        f"Turned away: {report['turned_away']}   Departures skipped: {report['skipped']}",
+        "Op\tCount\tp50 ms\tp90 ms\tp99 ms\tmax ms"
+    ]
+    for op, stats in report['latency_ms'].items():
+        lines.append(f"{op}\t{stats['count']}\t{stats['p50']:.4f}\t{stats['p90']:.4f}\t"
+                     f"{stats['p99']:.4f}\t{stats['max']:.4f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Synthetic gate traffic for ParkingService')
+    parser.add_argument('--levels', type=int, default=3)
+    parser.add_argument('--regular', type=int, default=500, help='regular slots per level')
+    parser.add_argument('--ev', type=int, default=100, help='EV slots per level')
+    parser.add_argument('--hours', type=float, default=24.0, help='simulated duration')
+    parser.add_argument('--profile', choices=['poisson', 'rush'], default='rush')
+    parser.add_argument('--rate', type=float, default=None, help='base arrivals per hour')
+    parser.add_argument('--stay', type=float, default=2.0, help='mean stay in hours')
+    parser.add_argument('--ev-share', type=float, default=0.2)
+    parser.add_argument('--motorcycle-share', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--record', metavar='PATH', help='save the generated trace as JSONL')
+    parser.add_argument('--replay', metavar='PATH', help='replay a recorded trace instead of generating one')
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        events = load_trace(args.replay)
+    else:
+        rate = args.rate if args.rate is not None else args.regular * args.levels / (args.stay * 6)
+        profile = ArrivalProfile.poisson(rate) if args.profile == 'poisson' else ArrivalProfile.rush_hour(rate)
+        events = generate_trace(args.levels, args.regular, args.ev, args.hours, profile,
+                                args.stay, args.ev_share, args.motorcycle_share, args.seed)
+        if args.record:
+            save_trace(events, args.record)
+            print(f'Recorded {len(events)} events to {args.record}')
+    print(format_report(replay(events)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Lot Transfer - Streaming CSV/JSONL import and export of lot state
+Rows are parsed and written one at a time through generators, so memory stays
+flat however large the file; imports go through ParkingService.park_vehicles
+in batches and collect per-row errors instead of stopping at the first one.
+
+Row layout (CSV header / JSONL keys):
+    record            'level' or 'vehicle'
+    level             level number
+    regular_spaces    level rows: regular capacity
+    ev_spaces         level rows: EV capacity
+    slot_id           vehicle rows: 1-based slot, blank for first free slot
+    ev, motor         vehicle rows: 1/0 flags as accepted by park_vehicle
+    kind              vehicle rows: car, motorcycle, truck or bus (overrides motor)
+    regnum, make, model, color, charge
+
+Usage:
+    python LotTransfer.py lot.csv                       # validate and time an import
+    python LotTransfer.py lot.csv --export lot.jsonl    # convert between formats
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+from BayAllocator import iter_vehicles
+from ParkingService import ParkingService
+from SlotIndex import base_vehicle_type
+
+FIELDS = ['record', 'level', 'regular_spaces', 'ev_spaces', 'slot_id', 'ev', 'motor', 'kind',
+          'regnum', 'make', 'model', 'color', 'charge']
+INT_FIELDS = ('level', 'regular_spaces', 'ev_spaces', 'slot_id', 'ev', 'motor', 'charge')
+REQUIRED_VEHICLE_FIELDS = ('regnum', 'make', 'model', 'color')
+
+
+def detect_format(path, fmt=None):
+    """Return 'csv' or 'jsonl' from an explicit format or the file extension"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt == 'json':
+        fmt = 'jsonl'
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f'Unsupported lot file format: {fmt!r} (use csv or jsonl)')
+    return fmt
+
+
+def read_rows(handle, fmt):
+    """
+    Yield (line number, raw row dict) from an open text file
+
+    Malformed JSON lines are yielded as (line number, ValueError) so the
+    caller can record them and carry on.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError('expected a JSON object')
+            except ValueError as e:
+                yield line_number, ValueError(f'invalid JSON: {e}')
+                continue
+            yield line_number, row
+
+
+def parse_row(row):
+    """
+    Normalize a raw row: blank CSV cells become None, numeric fields become ints
+
+    Raises:
+        ValueError: If the row is not a valid level or vehicle record
+    """
+    parsed = {}
+    for key in FIELDS:
+        value = row.get(key)
+        parsed[key] = None if value == '' else value
+    for key in INT_FIELDS:
+        value = parsed[key]
+        if value is None or type(value) is int:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f'{key} must be an integer, got {value!r}')
+        try:
+            parsed[key] = int(value)
+        except ValueError:
+            raise ValueError(f'{key} must be an integer, got {value!r}') from None
+
+    record = parsed['record']
+    if parsed['level'] is None:
+        raise ValueError('level is required')
+    if record == 'level':
+        if parsed['regular_spaces'] is None or parsed['ev_spaces'] is None:
+            raise ValueError('level rows need regular_spaces and ev_spaces')
+        if parsed['regular_spaces'] < 0 or parsed['ev_spaces'] < 0:
+            raise ValueError('capacities cannot be negative')
+    elif record == 'vehicle':
+        missing = [key for key in REQUIRED_VEHICLE_FIELDS if not parsed[key]]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+    else:
+        raise ValueError(f'unknown record type {record!r}')
+    return parsed
+
+
+def import_lot(service, path, fmt=None, batch_size=5000, max_errors=1000):
+    """
+    Stream a lot file into a ParkingService
+
+    Level rows (re)create their level; vehicle rows are queued and parked
+    through park_vehicles in batches of batch_size. Rows keep file order:
+    pending vehicles are flushed before any level row is applied. A level
+    row the service rejects is reported, and that level's vehicle rows fail
+    until a later level row creates it.
+
+    Args:
+        service (ParkingService): Target service
+        path (str): CSV or JSONL file
+        fmt (str): 'csv' or 'jsonl', inferred from the extension if None
+        batch_size (int): Vehicles per park_vehicles call
+        max_errors (int): Per-row errors kept in the report (all are counted)
+
+    Returns:
+        dict: {'rows', 'levels', 'parked', 'failed', 'errors': [(line, message)], 'elapsed'}
+    """
+    fmt = detect_format(path, fmt)
+    report = {'rows': 0, 'levels': 0, 'parked': 0, 'failed': 0, 'errors': [], 'elapsed': 0.0}
+    pending_level = None
+    pending = []  # (line number, vehicle_data) for pending_level
+    skipped_levels = set()  # levels whose level row could not be applied
+
+    def fail(line_number, message):
+        report['failed'] += 1
+        if len(report['errors']) < max_errors:
+            report['errors'].append((line_number, message))
+
+    def flush():
+        if not pending:
+            return
+        results = service.park_vehicles(pending_level, [vehicle for _, vehicle in pending])
+        for (line_number, _), result in zip(pending, results):
+            if result['success']:
+                report['parked'] += 1
+            else:
+                fail(line_number, result['message'])
+        pending.clear()
+
+    started = time.perf_counter()
+    with open(path, newline='', encoding='utf-8') as handle:
+        for line_number, row in read_rows(handle, fmt):
+            report['rows'] += 1
+            if isinstance(row, Exception):
+                fail(line_number, str(row))
+                continue
+            try:
+                row = parse_row(row)
+            except ValueError as e:
+                fail(line_number, str(e))
+                continue
+
+            if row['record'] == 'level':
+                flush()
+                if not service.create_parking_lot(row['level'], row['regular_spaces'], row['ev_spaces']):
+                    skipped_levels.add(row['level'])
+                    fail(line_number, f"Could not create level {row['level']}")
+                    continue
+                skipped_levels.discard(row['level'])
+                report['levels'] += 1
+                continue
+            if row['level'] in skipped_levels:
+                fail(line_number, f"Level {row['level']} was not created")
+                continue
+
+            if row['level'] != pending_level or len(pending) >= batch_size:
+                flush()
+                pending_level = row['level']
+            pending.append((line_number, {
+                'regnum': row['regnum'], 'make': row['make'], 'model': row['model'],
+                'color': row['color'], 'ev': row['ev'] or 0, 'motor': row['motor'] or 0,
+                'kind': row['kind'], 'slot_id': row['slot_id'], 'charge': row['charge']
+            }))
+        flush()
+    # Batch failures surface at flush time, after later parse errors
+    report['errors'].sort()
+    report['elapsed'] = time.perf_counter() - started
+    return report
+
+
+def iter_lot_rows(service, levels=None):
+    """
+    Yield export rows (dicts keyed by FIELDS) for the given levels
+
+    Reads from a snapshot, so the export is consistent and parks/removes
+    are not blocked while the file is being written.
+    """
+    for level, snapshot in sorted(service.snapshot(levels).items()):
+        yield {'record': 'level', 'level': level, 'regular_spaces': snapshot.regular_spaces,
+               'ev_spaces': snapshot.ev_spaces}
+        for is_ev_slot, slots in ((False, snapshot.regular_slots), (True, snapshot.ev_slots)):
+            for slot_index, vehicle in iter_vehicles(slots):
+                kind = base_vehicle_type(vehicle['type'])
+                row = {'record': 'vehicle', 'level': level, 'slot_id': slot_index + 1,
+                       'ev': int(is_ev_slot), 'motor': int(kind == 'motorcycle'), 'kind': kind,
+                       'regnum': vehicle['regnum'], 'make': vehicle['make'],
+                       'model': vehicle['model'], 'color': vehicle['color']}
+                if is_ev_slot:
+                    row['charge'] = vehicle.get('charge')
+                yield row
+
+
+def export_lot(service, path, fmt=None, levels=None):
+    """
+    Stream levels and parked vehicles to a CSV or JSONL file
+
+    Returns:
+        int: Number of rows written
+    """
+    fmt = detect_format(path, fmt)
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            writer = csv.DictWriter(handle, FIELDS)
+            writer.writeheader()
+            for row in iter_lot_rows(service, levels):
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in iter_lot_rows(service, levels):
+                handle.write(json.dumps(row, separators=(',', ':')) + '\n')
+                count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import (and optionally re-export) parking lot state')
+    parser.add_argument('path', help='CSV or JSONL lot file to import')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--export', metavar='PATH', help='write the imported state to PATH')
+    parser.add_argument('--export-format', choices=['csv', 'jsonl'], default=None)
+    args = parser.parse_args(argv)
+
+    service = ParkingService()
+    report = import_lot(service, args.path, args.format, args.batch_size)
+    print(f"Imported {report['rows']} rows in {report['elapsed']:.2f}s: {report['levels']} level(s), "
+          f"{report['parked']} vehicle(s) parked, {report['failed']} row error(s)")
+    for line_number, message in report['errors'][:20]:
+        print(f'  line {line_number}: {message}')
+    if args.export:
+        print(f'Wrote {export_lot(service, args.export, args.export_format)} rows to {args.export}')
+
+
+if __name__ == '__main__':
+    main()
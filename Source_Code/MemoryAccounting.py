@@ -0,0 +1,160 @@
+"""
+Memory Accounting - Sampled size estimates for the service's per-level structures
+sys.getsizeof walks that measure at most `sample` members of any container
+and scale up, so sizing a million-slot level costs about as much as sizing
+a small one. tracemalloc, when tracing, supplies the process-wide figure
+that budgets are checked against.
+"""
+
+import random
+import sys
+import tracemalloc
+import types
+from collections import deque
+
+from BayAllocator import SharedBay, vehicle_bays
+
+# Members measured in depth per container before extrapolating
+SAMPLE_SIZE = 64
+# Containers up to this many members still get every member's own size measured, and only
+# what lies beyond the members is extrapolated - posting sets of very different sizes would
+# otherwise make the estimate swing
+SHALLOW_LIMIT = 16384
+
+# Leaves whose size is just getsizeof
+_ATOMS = (str, bytes, int, float, complex, bool, type(None))
+# Referenced code, not data held by the service
+_OPAQUE = (type, types.FunctionType, types.MethodType, types.BuiltinFunctionType, types.ModuleType)
+_SEQUENCES = (list, tuple, set, frozenset, deque)
+
+
+def sampled_size(obj, sample=SAMPLE_SIZE, rng=None, seen=None):
+    """
+    Estimated bytes held by obj and everything it references
+
+    Containers with more than `sample` members contribute their own size
+    plus the mean size of `sample` random members times their length (up to
+    SHALLOW_LIMIT members, only the part below the members is extrapolated).
+    Objects already in `seen` (ids) count zero, so a walk shared across
+    structures counts shared objects once. Strings inside sets, lists and
+    tuples are taken to be owned elsewhere (plates in posting sets, regnums
+    in PlateMatch entries) and count zero. Classes, functions and modules
+    count their reference only.
+    """
+    rng = rng or random.Random(0)
+    seen = set() if seen is None else seen
+
+    def size_of(item, borrowed=False):
+        if borrowed and isinstance(item, str) or id(item) in seen:
+            return 0
+        seen.add(id(item))
+        size = sys.getsizeof(item)
+        if isinstance(item, _ATOMS + _OPAQUE):
+            return size
+        borrowed = isinstance(item, _SEQUENCES)
+        if isinstance(item, dict):
+            members = list(item.keys()) + list(item.values())
+        elif borrowed:
+            members = list(item)
+        elif hasattr(item, '__dict__'):
+            members = [vars(item)]
+        else:
+            return size
+        if len(members) <= sample:
+            return size + sum(size_of(member, borrowed) for member in members)
+        picked = rng.sample(members, sample)
+        if len(members) > SHALLOW_LIMIT:
+            return size + int(sum(size_of(member, borrowed) for member in picked) * len(members) / sample)
+        counted = [member for member in members
+                   if not (borrowed and isinstance(member, str)) and id(member) not in seen]
+        size += sum(map(sys.getsizeof, counted))
+        counted_ids = set(map(id, counted))
+        below = sum(size_of(member, borrowed) - (sys.getsizeof(member) if id(member) in counted_ids else 0)
+                    for member in picked)
+        return size + int(below * len(members) / sample)
+
+    return size_of(obj)
+
+
+def record_size(vehicle):
+    """Bytes of one vehicle record: the dict and its values (keys are shared literals)"""
+    return sys.getsizeof(vehicle) + sum(sys.getsizeof(value) for value in vehicle.values())
+
+
+def slot_storage_size(slots, sample=SAMPLE_SIZE, rng=None):
+    """
+    Bytes of a SlotArray's own storage: pages, epochs and shared-bay tuples
+
+    Vehicle records are not included - see vehicle_records_size.
+    """
+    rng = rng or random.Random(0)
+    pages = slots._pages
+    size = (sys.getsizeof(slots) + sys.getsizeof(vars(slots)) + sys.getsizeof(pages) +
+            sum(sys.getsizeof(page) for page in pages) + sys.getsizeof(slots._page_epochs))
+    positions = _sample_positions(len(slots), sample, rng)
+    if positions:
+        shared = sum(sys.getsizeof(slots[i]) for i in positions if isinstance(slots[i], SharedBay))
+        size += int(shared * len(slots) / len(positions))
+    return size
+
+
+def vehicle_records_size(slots, sample=SAMPLE_SIZE, rng=None):
+    """
+    Estimated bytes of the vehicle records parked in a slot row
+
+    Samples slot positions; a vehicle spanning several bays is charged a
+    share per bay, so it counts once overall.
+
+    Returns:
+        tuple: (bytes, mean bytes per record sampled or None if none was)
+    """
+    rng = rng or random.Random(0)
+    positions = _sample_positions(len(slots), sample, rng)
+    total = records = 0.0
+    for i in positions:
+        occupant = slots[i]
+        if occupant is None:
+            continue
+        if isinstance(occupant, SharedBay):
+            sizes = [record_size(vehicle) for vehicle in occupant]
+            total += sum(sizes)
+            records += len(sizes)
+        else:
+            bays = vehicle_bays(occupant)
+            total += record_size(occupant) / bays
+            records += 1 / bays
+    if not positions:
+        return 0, None
+    return int(total * len(slots) / len(positions)), (total / records if records else None)
+
+
+def change_history_size(history, sample=SAMPLE_SIZE, rng=None):
+    """
+    Estimated bytes of a change-feed history: the deque, events and their detail dicts
+
+    Vehicle records referenced by events are counted with their level
+    while parked, so they count here only as references.
+    """
+    rng = rng or random.Random(0)
+    positions = _sample_positions(len(history), sample, rng)
+    if not positions:
+        return sys.getsizeof(history)
+    events = 0
+    for i in positions:
+        event = history[i]
+        events += sys.getsizeof(event) + sys.getsizeof(event.kind) + sys.getsizeof(event.details)
+        events += sum(sys.getsizeof(value) for value in event.details.values() if not isinstance(value, dict))
+    return sys.getsizeof(history) + int(events * len(history) / len(positions))
+
+
+def traced_memory():
+    """Current bytes traced by tracemalloc, or None when it is not tracing"""
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _sample_positions(length, sample, rng):
+    if length <= sample:
+        return range(length)
+    return rng.sample(range(length), sample)
@@ -0,0 +1,113 @@
+"""
+Output Console - Bounded, batched sink for the GUI text console
+Buffers messages from any thread, flushes them to the Text widget in one
+insert per frame and trims the oldest lines so scrollback stays capped
+"""
+
+import threading
+import tkinter as tk
+from collections import deque
+
+
+class ConsoleSink:
+    """
+    Thread-safe message sink in front of a tk.Text widget
+
+    write() only appends to an in-memory buffer.  With a Tk root the buffer
+    is flushed once per frame (flush_ms) as a single insert plus a single
+    see(); without one every write flushes immediately.  After each flush
+    the widget is trimmed back to max_lines, so memory and redraw cost stay
+    flat however long the session runs.
+    """
+
+    def __init__(self, text_widget, root=None, max_lines=2000, flush_ms=16):
+        self.text = text_widget
+        self.root = root
+        self.max_lines = max_lines
+        self.flush_ms = flush_ms
+        # Pending messages are a ring buffer too: a burst larger than the
+        # scrollback only keeps its newest max_lines messages
+        self._pending = deque(maxlen=max_lines)
+        self._dropped = 0
+        self._clear_requested = False
+        self._lock = threading.Lock()
+        self._line_count = 0
+        if root is not None:
+            root.after(self.flush_ms, self._tick)
+
+    def write(self, message):
+        """Queue a message (include the trailing newline) from any thread"""
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped += 1
+            self._pending.append(message)
+        if self.root is None:
+            self.flush()
+
+    def clear(self):
+        """Empty the console; messages written afterwards still appear"""
+        with self._lock:
+            self._pending.clear()
+            self._dropped = 0
+            self._clear_requested = True
+        if self.root is None:
+            self.flush()
+
+    def replace(self, text):
+        """
+        Replace the console contents with a finished report
+
+        A report longer than max_lines keeps its head - the title and
+        column headers - and ends in a "… N more lines" marker instead of
+        losing its top to the scrollback trim.
+        """
+        lines = text.splitlines(keepends=True)
+        if len(lines) > self.max_lines:
+            kept = max(self.max_lines - 1, 0)
+            text = ''.join(lines[:kept]) + f"… {len(lines) - kept} more lines\n"
+        with self._lock:
+            self._pending.clear()
+            self._dropped = 0
+            self._clear_requested = True
+            self._pending.append(text)
+        if self.root is None:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered to the widget - must run on the Tk thread"""
+        with self._lock:
+            if not self._pending and not self._clear_requested:
+                return
+            messages = list(self._pending)
+            self._pending.clear()
+            dropped, self._dropped = self._dropped, 0
+            clear, self._clear_requested = self._clear_requested, False
+
+        if clear:
+            self.text.delete('1.0', tk.END)
+            self._line_count = 0
+        if dropped:
+            messages.insert(0, f"… {dropped} older message(s) skipped\n")
+        chunk = ''.join(messages)
+        if chunk:
+            self.text.insert(tk.END, chunk)
+            self._line_count += chunk.count('\n')
+        self._trim()
+        self.text.see(tk.END)
+
+    @property
+    def line_count(self):
+        return self._line_count
+
+    def _trim(self):
+        excess = self._line_count - self.max_lines
+        if excess > 0:
+            # Line numbers are 1-based; this removes the first `excess` lines
+            self.text.delete('1.0', f'{excess + 1}.0')
+            self._line_count -= excess
+
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self.root.after(self.flush_ms, self._tick)
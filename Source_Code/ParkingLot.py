@@ -13,8 +13,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models import ElectricVehicle, Vehicle
 
 from ParkingService import ParkingService
+from TaskRunner import InlineTaskRunner
+from OutputConsole import ConsoleSink
+from SlotMap import SlotMapWidget
 
 class ParkingLot:
+    # Slots scanned between progress updates / cancellation checks in long reports
+    PROGRESS_EVERY = 1000
+
     def __init__(self, tk_vars):
         # Parking lot capacity tracking
         self.capacity = 0
@@ -33,6 +39,12 @@ class ParkingLot:
         self.tk_vars = tk_vars
         self.tfield = tk_vars['tfield']
         
+        # Worker-thread runner from main.py; runs inline when there is no Tk root
+        self.tasks = tk_vars.get('task_runner') or InlineTaskRunner()
+        
+        # Batched, line-capped console sink; writes straight through when there is no Tk root
+        self.console = tk_vars.get('console') or ConsoleSink(self.tfield)
+        
         # Initialize ParkingService for business logic delegation
         self.parking_service = ParkingService()
 
@@ -44,7 +56,8 @@ class ParkingLot:
         """Initialize parking lot with specified capacities"""
         try:
             # Delegate to ParkingService
-            success = self.parking_service.create_parking_lot(level, capacity, evcapacity)
+            # One vehicle per bay: the GUI's local slot arrays mirror the service slot for slot
+            success = self.parking_service.create_parking_lot(level, capacity, evcapacity, motorcycles_per_bay=1)
             
             if success:
                 # Update current level
@@ -57,8 +70,7 @@ class ParkingLot:
                 
                 # Show success message in console
                 output = f'✅ Created a parking lot with {capacity} regular slots and {evcapacity} EV slots on level: {level}\n'
-                self.tfield.insert(tk.END, output)
-                self.tfield.see(tk.END)  # Scroll to bottom
+                self._write(output)
                 
                 return self.level
             else:
@@ -75,13 +87,32 @@ class ParkingLot:
             
             # Show fallback success message
             output = f'✅ Created a parking lot with {capacity} regular slots and {evcapacity} EV slots on level: {level} (Fallback Mode)\n'
-            self.tfield.insert(tk.END, output)
-            self.tfield.see(tk.END)  # Scroll to bottom
+            self._write(output)
             
             return self.level
 
+    def resizeParkingLot(self, capacity, evcapacity):
+        """Resize the current level in place - DELEGATES to ParkingService.resize_parking_lot()"""
+        result = self.parking_service.resize_parking_lot(self.level, capacity, evcapacity)
+        if result['success']:
+            # Keep the local arrays in step without discarding parked vehicles
+            for move in result['moved']:
+                mirror = self.evSlots if move['is_ev_slot'] else self.slots
+                mirror[move['to_slot']-1] = mirror[move['from_slot']-1]
+                mirror[move['from_slot']-1] = -1
+            self.slots = (self.slots + [-1] * capacity)[:capacity]
+            self.evSlots = (self.evSlots + [-1] * evcapacity)[:evcapacity]
+            self.capacity = capacity
+            self.evCapacity = evcapacity
+        return result
+
     def park(self, regnum, make, model, color, ev, motor):
-        """Park a vehicle - DELEGATES to ParkingService.park_vehicle()"""
+        """
+        Park a vehicle - DELEGATES to ParkingService.park_vehicle()
+        
+        Returns:
+            dict: The service result, {'success': bool, 'slot_id': int, 'message': str}
+        """
         try:
             # Prepare vehicle data for service layer
             vehicle_data = {
@@ -117,15 +148,15 @@ class ParkingLot:
                         vehicle.motorcycle = False
                     self.slots[slot_id-1] = vehicle
                     self.numOfOccupiedSlots += 1
-                
-                return slot_id
-            else:
-                print(f"ParkingService message: {result['message']}")
-                return -1
+            
+            return result
                 
         except Exception as e:
             print(f"Service error in park(), using fallback: {e}")
-            return self._fallback_park(regnum, make, model, color, ev, motor)
+            slot_id = self._fallback_park(regnum, make, model, color, ev, motor)
+            if slot_id == -1:
+                return {'success': False, 'message': 'Sorry, parking lot is full'}
+            return {'success': True, 'slot_id': slot_id, 'message': f'Allocated slot: {slot_id}'}
 
     def leave(self, slotid, ev):
         """Remove vehicle from specified slot - DELEGATES to ParkingService"""
@@ -161,37 +192,51 @@ class ParkingLot:
             regular_spaces = int(self.tk_vars['num_value'].get())
             ev_spaces = int(self.tk_vars['ev_value'].get())
             
-            res = self.createParkingLot(regular_spaces, ev_spaces, level)
+            self._submit('create lot', lambda token, progress: self.createParkingLot(regular_spaces, ev_spaces, level))
+            
+        except ValueError as e:
+            self._write("❌ Error: Please enter valid numbers for all fields\n")
+
+    def resizeLot(self):
+        """Resize current level without removing parked vehicles (UI handler)"""
+        try:
+            regular_spaces = int(self.tk_vars['num_value'].get())
+            ev_spaces = int(self.tk_vars['ev_value'].get())
+            
+            def show(result):
+                if result['success']:
+                    self._write(f"✅ {result['message']}\n")
+                else:
+                    self._write(f"❌ {result['message']}\n")
+            
+            self._submit('resize lot', lambda token, progress: self.resizeParkingLot(regular_spaces, ev_spaces), show)
             
         except ValueError as e:
-            self.tfield.insert(tk.END, "❌ Error: Please enter valid numbers for all fields\n")
-            self.tfield.see(tk.END)
+            self._write("❌ Error: Please enter valid numbers for all fields\n")
 
     def parkCar(self):  
         """Park vehicle (UI handler)"""
-        try:
-            res = self.park(
-                self.tk_vars['reg_value'].get(), 
-                self.tk_vars['make_value'].get(), 
-                self.tk_vars['model_value'].get(), 
-                self.tk_vars['color_value'].get(), 
-                self.tk_vars['ev_car_value'].get(), 
-                self.tk_vars['ev_motor_value'].get()
-            )
-            if res == -1:
-                self.tfield.insert(tk.END, "❌ Sorry, parking lot is full\n")
+        # Read Tk variables here on the main thread; only the parking runs on the worker
+        regnum = self.tk_vars['reg_value'].get()
+        make = self.tk_vars['make_value'].get()
+        model = self.tk_vars['model_value'].get()
+        color = self.tk_vars['color_value'].get()
+        ev = self.tk_vars['ev_car_value'].get()
+        motor = self.tk_vars['ev_motor_value'].get()
+        
+        def show(res):
+            if not res['success']:
+                self._write(f"❌ {res['message']}\n")
             else:
-                vehicle_type = "EV " if self.tk_vars['ev_car_value'].get() == 1 else ""
-                if self.tk_vars['ev_motor_value'].get() == 1:
+                vehicle_type = "EV " if ev == 1 else ""
+                if motor == 1:
                     vehicle_type += "Motorcycle"
                 else:
                     vehicle_type += "Car"
-                output = f'✅ {vehicle_type} Parked Successfully. Allocated slot: {res}\n'
-                self.tfield.insert(tk.END, output)
-            self.tfield.see(tk.END)
-        except Exception as e:
-            self.tfield.insert(tk.END, f"❌ Error parking vehicle: {str(e)}\n")
-            self.tfield.see(tk.END)
+                self._write(f"✅ {vehicle_type} Parked Successfully. Allocated slot: {res['slot_id']}\n")
+        
+        self._submit('park', lambda token, progress: self.park(regnum, make, model, color, ev, motor), show,
+                     error_prefix="Error parking vehicle")
 
     def removeCar(self):
         """Remove vehicle (UI handler)"""
@@ -199,59 +244,55 @@ class ParkingLot:
             slot_id = int(self.tk_vars['slot_value'].get())
             is_ev = self.tk_vars['ev_car2_value'].get() == 1
             
-            status = self.leave(slot_id, is_ev)
-            if status:
-                output = f'✅ Vehicle removed from slot {slot_id}\n'
-                self.tfield.insert(tk.END, output)
-            else:
-                output = f'❌ Unable to remove vehicle from slot {slot_id}. Slot may be empty or invalid.\n'
-                self.tfield.insert(tk.END, output)
-            self.tfield.see(tk.END)
+            def show(status):
+                if status:
+                    self._write(f'✅ Vehicle removed from slot {slot_id}\n')
+                else:
+                    self._write(f'❌ Unable to remove vehicle from slot {slot_id}. Slot may be empty or invalid.\n')
+            
+            self._submit('remove', lambda token, progress: self.leave(slot_id, is_ev), show)
+            
         except ValueError:
-            self.tfield.insert(tk.END, "❌ Error: Please enter a valid slot number\n")
-            self.tfield.see(tk.END)
+            self._write("❌ Error: Please enter a valid slot number\n")
 
     def status(self):
         """Display current status of all parked vehicles"""
-        try:
-            self.tfield.delete(1.0, tk.END)
-            
-            # Display regular vehicles
-            output = "🅿️  Regular Vehicles (Cars & Motorcycles)\nSlot\tFloor\tReg No.\t\tColor \t\tMake \t\tModel\t\tType\n"
-            self.tfield.insert(tk.END, output)
-            
-            regular_vehicles_found = False
-            for i in range(len(self.slots)):
-                if self.slots[i] != -1:
-                    vehicle = self.slots[i]
-                    vehicle_type = "Motorcycle" if hasattr(vehicle, 'motorcycle') and vehicle.motorcycle else "Car"
-                    output = f"{i+1}\t{self.level}\t{vehicle.regnum}\t\t{vehicle.color}\t\t{vehicle.make}\t\t{vehicle.model}\t\t{vehicle_type}\n"
-                    self.tfield.insert(tk.END, output)
-                    regular_vehicles_found = True
-            
-            if not regular_vehicles_found:
-                self.tfield.insert(tk.END, "No regular vehicles parked\n")
-                
-            # Display electric vehicles
-            output = "\n⚡ Electric Vehicles\nSlot\tFloor\tReg No.\t\tColor \t\tMake \t\tModel\t\tType\n"
-            self.tfield.insert(tk.END, output)
-            
-            ev_vehicles_found = False
-            for i in range(len(self.evSlots)):
-                if self.evSlots[i] != -1:
-                    vehicle = self.evSlots[i]
-                    vehicle_type = "EV Motorcycle" if hasattr(vehicle, 'motorcycle') and vehicle.motorcycle else "EV Car"
-                    output = f"{i+1}\t{self.level}\t{vehicle.regnum}\t\t{vehicle.color}\t\t{vehicle.make}\t\t{vehicle.model}\t\t{vehicle_type}\n"
-                    self.tfield.insert(tk.END, output)
-                    ev_vehicles_found = True
+        self._submit('status', self._build_status, self._replace_console, error_prefix="Error displaying status")
+
+    def _build_status(self, token, progress):
+        """Render the status report on the worker thread, reporting progress per slot batch"""
+        lines = ["🅿️  Regular Vehicles (Cars & Motorcycles)\nSlot\tFloor\tReg No.\t\tColor \t\tMake \t\tModel\t\tType\n"]
+        total = len(self.slots) + len(self.evSlots)
+        
+        regular_vehicles_found = False
+        for i in range(len(self.slots)):
+            if i % self.PROGRESS_EVERY == 0:
+                progress(i, total)
+            if self.slots[i] != -1:
+                vehicle = self.slots[i]
+                vehicle_type = "Motorcycle" if hasattr(vehicle, 'motorcycle') and vehicle.motorcycle else "Car"
+                lines.append(f"{i+1}\t{self.level}\t{vehicle.regnum}\t\t{vehicle.color}\t\t{vehicle.make}\t\t{vehicle.model}\t\t{vehicle_type}\n")
+                regular_vehicles_found = True
+        
+        if not regular_vehicles_found:
+            lines.append("No regular vehicles parked\n")
             
-            if not ev_vehicles_found:
-                self.tfield.insert(tk.END, "No electric vehicles parked\n")
-                    
-        except Exception as e:
-            self.tfield.insert(tk.END, f"❌ Error displaying status: {str(e)}\n")
-        finally:
-            self.tfield.see(tk.END)
+        # Display electric vehicles
+        lines.append("\n⚡ Electric Vehicles\nSlot\tFloor\tReg No.\t\tColor \t\tMake \t\tModel\t\tType\n")
+        
+        ev_vehicles_found = False
+        for i in range(len(self.evSlots)):
+            if i % self.PROGRESS_EVERY == 0:
+                progress(len(self.slots) + i, total)
+            if self.evSlots[i] != -1:
+                vehicle = self.evSlots[i]
+                vehicle_type = "EV Motorcycle" if hasattr(vehicle, 'motorcycle') and vehicle.motorcycle else "EV Car"
+                lines.append(f"{i+1}\t{self.level}\t{vehicle.regnum}\t\t{vehicle.color}\t\t{vehicle.make}\t\t{vehicle.model}\t\t{vehicle_type}\n")
+                ev_vehicles_found = True
+        
+        if not ev_vehicles_found:
+            lines.append("No electric vehicles parked\n")
+        return ''.join(lines)
 
     def clearInputs(self):
         """Clear all input fields"""
@@ -272,30 +313,85 @@ class ParkingLot:
             self.tk_vars['ev_motor_value'].set(0)
             self.tk_vars['motor_remove_value'].set(0)
             
-            self.tfield.insert(tk.END, "📝 Input fields cleared\n")
-            self.tfield.see(tk.END)
+            self._write("📝 Input fields cleared\n")
             
         except Exception as e:
-            self.tfield.insert(tk.END, f"❌ Error clearing inputs: {str(e)}\n")
-            self.tfield.see(tk.END)
+            self._write(f"❌ Error clearing inputs: {str(e)}\n")
 
     def clearConsole(self):
         """Clear only the output console"""
-        self.tfield.delete(1.0, tk.END)
-        self.tfield.insert(tk.END, "🧹 Console cleared\n")
-        self.tfield.see(tk.END)
+        self.console.replace("🧹 Console cleared\n")
 
     def chargeStatus(self):
         """Display charge levels for all electric vehicles"""
-        self.tfield.delete(1.0, tk.END)
-        output = "⚡ Electric Vehicle Charge Levels\nSlot\tFloor\tReg No.\t\tCharge %\n"
-        self.tfield.insert(tk.END, output)
-        
+        self._submit('charge status', self._build_charge_status, self._replace_console)
+
+    def _build_charge_status(self, token, progress):
+        """Render the charge report on the worker thread"""
+        lines = ["⚡ Electric Vehicle Charge Levels\nSlot\tFloor\tReg No.\t\tCharge %\n"]
         for i in range(len(self.evSlots)):
+            if i % self.PROGRESS_EVERY == 0:
+                progress(i, len(self.evSlots))
             if self.evSlots[i] != -1:
-                output = str(i+1) + "\t" + str(self.level) + "\t" + str(self.evSlots[i].regnum) + "\t\t" + str(self.evSlots[i].charge) + "\n"                    
-                self.tfield.insert(tk.END, output)
-        self.tfield.see(tk.END)
+                lines.append(str(i+1) + "\t" + str(self.level) + "\t" + str(self.evSlots[i].regnum) + "\t\t" + str(self.evSlots[i].charge) + "\n")
+        return ''.join(lines)
+
+    def showSlotMap(self):
+        """Open a live slot map of the current level (UI handler)"""
+        window = tk.Toplevel()
+        window.title(f'Slot Map - Level {self.level}')
+        window.geometry('640x480')
+        SlotMapWidget(window, self.parking_service, self.level).pack(fill=tk.BOTH, expand=True)
+
+    def cancelTask(self):
+        """Cancel the running background operation and anything queued (UI handler)"""
+        if self.tasks.busy:
+            self.tasks.cancel_current()
+        else:
+            self._write("ℹ️ Nothing to cancel\n")
+
+    # =============================================================================
+    # BACKGROUND TASK HELPERS
+    # =============================================================================
+
+    def _submit(self, name, work, on_done=None, error_prefix=None):
+        """Run work(token, progress) on the task runner and route its outcome to the console"""
+        def on_error(e):
+            self._write(f"❌ {error_prefix or 'Error during ' + name}: {str(e)}\n")
+            self._set_progress("")
+        
+        def on_finished(result):
+            self._set_progress("")
+            if on_done is not None:
+                on_done(result)
+        
+        self._set_progress(f"⏳ {name}...")
+        return self.tasks.submit(work, on_finished, on_error, self._show_progress, self._show_cancelled, name)
+
+    def _show_progress(self, name, done, total):
+        percent = int(done * 100 / total) if total else 0
+        self._set_progress(f"⏳ {name}... {percent}%")
+
+    def _show_cancelled(self, name):
+        self._set_progress("")
+        self._write(f"🛑 {name} cancelled\n")
+
+    def _set_progress(self, text):
+        progress_value = self.tk_vars.get('progress_value')
+        if progress_value is not None:
+            progress_value.set(text)
+
+    def _replace_console(self, text):
+        """Swap the console contents for a finished report (runs on the Tk thread)"""
+        self.console.replace(text)
+
+    def _write(self, output):
+        """Append a message to the console from any thread"""
+        if self.console.root is None and not self.tasks.on_ui_thread():
+            # An unscheduled sink writes straight to the widget - hop to the Tk thread first
+            self.tasks.call_soon(self._write, output)
+            return
+        self.console.write(output)
 
     # =============================================================================
     # SEARCH AND QUERY METHODS
@@ -304,37 +400,44 @@ class ParkingLot:
     def slotNumByReg(self):
         """Find slot number by registration number (UI handler)"""
         slot_val = self.tk_vars['slot1_value'].get()
-        slotnum = self.getSlotNumFromRegNum(slot_val)
-        slotnum2 = self.getSlotNumFromRegNumEv(slot_val)
-        output = ""
-        if slotnum >= 0:
-            output = "✅ Identified slot: " + str(slotnum) + "\n"
-        elif slotnum2 >= 0:
-            output = "✅ Identified slot (EV): " + str(slotnum2) + "\n"
-        else:
-            output = "❌ Not found\n"
-        self.tfield.insert(tk.END, output)
-        self.tfield.see(tk.END)
+        
+        def search(token, progress):
+            slotnum = self.getSlotNumFromRegNum(slot_val)
+            token.raise_if_cancelled()
+            slotnum2 = self.getSlotNumFromRegNumEv(slot_val)
+            if slotnum >= 0:
+                return "✅ Identified slot: " + str(slotnum) + "\n"
+            elif slotnum2 >= 0:
+                return "✅ Identified slot (EV): " + str(slotnum2) + "\n"
+            return "❌ Not found\n"
+        
+        self._submit('search by registration', search, self._write)
 
     def slotNumByColor(self):
         """Find slot numbers by color (UI handler)"""
-        slotnums = self.getSlotNumFromColor(self.tk_vars['slot2_value'].get())
-        slotnums2 = self.getSlotNumFromColorEv(self.tk_vars['slot2_value'].get())
-        output = "✅ Identified slots: " + ', '.join(slotnums) + "\n"
-        self.tfield.insert(tk.END, output)
-        output = "✅ Identified slots (EV): " + ', '.join(slotnums2) + "\n"
-        self.tfield.insert(tk.END, output)
-        self.tfield.see(tk.END)
+        color = self.tk_vars['slot2_value'].get()
+        
+        def search(token, progress):
+            slotnums = self.getSlotNumFromColor(color)
+            token.raise_if_cancelled()
+            slotnums2 = self.getSlotNumFromColorEv(color)
+            return ("✅ Identified slots: " + ', '.join(slotnums) + "\n" +
+                    "✅ Identified slots (EV): " + ', '.join(slotnums2) + "\n")
+        
+        self._submit('search by color', search, self._write)
 
     def regNumByColor(self):
         """Find registration numbers by color (UI handler)"""
-        regnums = self.getRegNumFromColor(self.tk_vars['reg1_value'].get())
-        regnums2 = self.getRegNumFromColorEv(self.tk_vars['reg1_value'].get())
-        output = "✅ Registration Numbers: "+ ', '.join(regnums) + "\n"        
-        self.tfield.insert(tk.END, output)
-        output = "✅ Registration Numbers (EV): "+ ', '.join(regnums2) + "\n"        
-        self.tfield.insert(tk.END, output)
-        self.tfield.see(tk.END)
+        color = self.tk_vars['reg1_value'].get()
+        
+        def search(token, progress):
+            regnums = self.getRegNumFromColor(color)
+            token.raise_if_cancelled()
+            regnums2 = self.getRegNumFromColorEv(color)
+            return ("✅ Registration Numbers: " + ', '.join(regnums) + "\n" +
+                    "✅ Registration Numbers (EV): " + ', '.join(regnums2) + "\n")
+        
+        self._submit('registrations by color', search, self._write)
 
     # =============================================================================
     # SEARCH METHODS - Multiple similar methods for different vehicle types
@@ -512,6 +615,10 @@ class ParkingLot:
 
     def edit(self, slotid, regnum, make, model, color, ev):
         """Edit vehicle details in specified slot"""
+        result = self.parking_service.edit_vehicle(self.level, slotid + 1, ev == 1, regnum, make, model, color)
+        if not result['success']:
+            print(f"ParkingService message: {result['message']}")
+            return False
         if (ev == 1):
             self.evSlots[slotid] = ElectricVehicle.ElectricCar(regnum, make, model, color)
             return True
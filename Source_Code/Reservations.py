@@ -0,0 +1,181 @@
+"""
+Reservation Layer - Time-window bay bookings for one row of bays
+Each bay keeps its bookings as a sorted list of disjoint intervals, and a
+sparse segment tree over time holds how many bookings cover each second,
+so "how many bays are free from 14:00 to 18:00" is capacity minus the peak
+load in the window - O(log T), however many bookings exist
+"""
+
+import heapq
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+# bay is the 0-based bay index for a specific-bay booking, None for "any bay"
+Reservation = namedtuple('Reservation', ['reservation_id', 'bay', 'start', 'end'])
+
+# Bookings are stored at whole-second resolution on [0, TIME_SPAN) - epoch seconds until 2514
+TIME_SPAN = 1 << 34
+
+
+class LoadTree:
+    """
+    Sparse segment tree over integer time: range add, range max
+
+    Nodes are created only along the edges of the ranges touched, so memory
+    is O(bookings * log T).  A node's max includes its own pending add, which
+    is never pushed down - queries add it back on the way up instead.
+    """
+
+    def __init__(self, span=TIME_SPAN):
+        self.span = span
+        self._max = {}
+        self._add = {}
+
+    def add(self, start, end, delta):
+        """Add delta to every second in [start, end)"""
+        self._update(1, 0, self.span, max(start, 0), min(end, self.span), delta)
+
+    def peak(self, start, end):
+        """Highest load at any second in [start, end)"""
+        start, end = max(start, 0), min(end, self.span)
+        if start >= end:
+            return 0
+        return self._query(1, 0, self.span, start, end)
+
+    def _update(self, node, low, high, start, end, delta):
+        if end <= low or high <= start:
+            return
+        if start <= low and high <= end:
+            self._add[node] = self._add.get(node, 0) + delta
+            self._max[node] = self._max.get(node, 0) + delta
+            return
+        middle = (low + high) // 2
+        self._update(2 * node, low, middle, start, end, delta)
+        self._update(2 * node + 1, middle, high, start, end, delta)
+        self._max[node] = self._add.get(node, 0) + max(self._max.get(2 * node, 0),
+                                                       self._max.get(2 * node + 1, 0))
+
+    def _query(self, node, low, high, start, end):
+        if start <= low and high <= end or node not in self._max:
+            # An untouched subtree has no load anywhere
+            return self._max.get(node, 0)
+        middle = (low + high) // 2
+        best = 0
+        if start < middle:
+            best = self._query(2 * node, low, middle, start, end)
+        if end > middle:
+            best = max(best, self._query(2 * node + 1, middle, high, start, end))
+        return self._add.get(node, 0) + best
+
+
+class ReservationBook:
+    """
+    Bookings for one row of bays (a level's regular or EV slots)
+
+    A booking holds either a specific bay or "any bay" of the row for
+    [start, end).  Both kinds count towards the row's load, and a new booking
+    is accepted only while the load stays below capacity at every moment of
+    its window, so "any bay" bookings can always be honoured on arrival.
+    Bookings whose window has ended are dropped by expire(now), which the
+    service calls before consulting the book.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.reservations = {}  # reservation_id -> Reservation
+        self._by_bay = {}       # bay -> sorted [(start, end, reservation_id)]
+        self._load = LoadTree()
+        # (end, reservation_id) min-heap; entries of cancelled or claimed bookings are skipped lazily
+        self._ends = []
+
+    def __len__(self):
+        return len(self.reservations)
+
+    @staticmethod
+    def window(start, end):
+        """Whole-second window covering [start, end)"""
+        return math.floor(start), math.ceil(end)
+
+    def free_bays(self, start, end):
+        """Bays not booked at any moment of [start, end) - O(log T)"""
+        start, end = self.window(start, end)
+        return max(self.capacity - self._load.peak(start, end), 0)
+
+    def active(self, now):
+        """Bookings (specific or not) whose window contains now - O(log T)"""
+        second = math.floor(now)
+        return self._load.peak(second, second + 1)
+
+    def bay_booking(self, bay, start, end):
+        """The booking of bay overlapping [start, end), or None - O(log m)"""
+        bookings = self._by_bay.get(bay)
+        if not bookings:
+            return None
+        # Bookings of one bay are disjoint, so only the last one starting before end can overlap
+        position = bisect_left(bookings, (end,))
+        if position and bookings[position - 1][1] > start:
+            return self.reservations[bookings[position - 1][2]]
+        return None
+
+    def is_reserved(self, bay, now):
+        """Whether bay is held by a booking at time now"""
+        bookings = self._by_bay.get(bay)
+        if not bookings:
+            return False
+        position = bisect_right(bookings, (now, math.inf))
+        return bool(position) and bookings[position - 1][1] > now
+
+    def add(self, reservation_id, start, end, bay=None):
+        """
+        Book [start, end), optionally for a specific bay
+
+        Raises:
+            ValueError: If the window is empty, the bay is out of range or
+                already booked, or the row is fully booked during the window
+        """
+        if not end > start:
+            raise ValueError('Reservation must end after it starts')
+        if bay is not None and not 0 <= bay < self.capacity:
+            raise ValueError(f'Slot {bay + 1} does not exist')
+        if bay is not None and self.bay_booking(bay, start, end) is not None:
+            raise ValueError(f'Slot {bay + 1} is already reserved during that window')
+        if self.free_bays(start, end) < 1:
+            raise ValueError('No slot is free for the whole window')
+        reservation = Reservation(reservation_id, bay, start, end)
+        self.reservations[reservation_id] = reservation
+        if bay is not None:
+            insort(self._by_bay.setdefault(bay, []), (start, end, reservation_id))
+        self._load.add(*self.window(start, end), 1)
+        heapq.heappush(self._ends, (end, reservation_id))
+        return reservation
+
+    def remove(self, reservation_id):
+        """Drop a booking (cancelled or claimed); returns it, or None if unknown"""
+        reservation = self.reservations.pop(reservation_id, None)
+        if reservation is None:
+            return None
+        if reservation.bay is not None:
+            bookings = self._by_bay[reservation.bay]
+            bookings.remove((reservation.start, reservation.end, reservation_id))
+            if not bookings:
+                del self._by_bay[reservation.bay]
+        self._load.add(*self.window(reservation.start, reservation.end), -1)
+        return reservation
+
+    def expire(self, now):
+        """Drop bookings whose window ended at or before now - O(k log m) for k expired"""
+        ends = self._ends
+        while ends and ends[0][0] <= now:
+            end, reservation_id = heapq.heappop(ends)
+            reservation = self.reservations.get(reservation_id)
+            if reservation is not None and reservation.end == end:
+                self.remove(reservation_id)
+        if len(ends) > 2 * len(self.reservations) + 64:
+            # Mostly cancelled/claimed entries left - rebuild from the live bookings
+            self._ends = [(reservation.end, reservation.reservation_id) for reservation in self.reservations.values()]
+            heapq.heapify(self._ends)
+
+    def bays_booked_from(self, size):
+        """Specific bays at or past size that still have bookings"""
+        return sorted(bay for bay in self._by_bay if bay >= size)
@@ -0,0 +1,105 @@
+"""
+Result Cache - Version-checked LRU cache for per-level query results
+Entries are stored with the level version they were computed from; a lookup
+with any other version is a miss, so park, remove and edit (which bump the
+version) invalidate exactly the levels they touch, with no explicit flushing
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """
+    Approximate bytes held by a result: its dicts, lists and tuples
+
+    Strings are not counted - results share them with the parked vehicles,
+    so caching a report does not duplicate them.
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            size += sys.getsizeof(item)
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            size += sys.getsizeof(item)
+            stack.extend(item)
+        elif not isinstance(item, str):
+            size += sys.getsizeof(item)
+    return size
+
+
+class ResultCache:
+    """
+    LRU cache of (key -> result) bounded by entry count and estimated bytes
+
+    Thread-safe on its own lock, so readers can use it without taking the
+    service's writer lock.  Cached results are shared between callers and
+    must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (version, result, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """Return the result cached for key at version, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, result):
+        """Store a result, evicting least recently used entries past the caps"""
+        if self.max_entries <= 0:
+            return
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (version, result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def level_bytes(self):
+        """Estimated bytes cached per level (keys are (kind, level, ...) tuples)"""
+        with self._lock:
+            totals = {}
+            for key, (_, _, size) in self._entries.items():
+                totals[key[1]] = totals.get(key[1], 0) + size
+            return totals
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters and current footprint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self._bytes,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,437 @@
+"""
+Sharded Parking Service - Multi-process deployment of ParkingService
+Partitions levels across worker processes, each owning its own ParkingService,
+behind a router that exposes the same API as ParkingService
+"""
+
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+
+from BayAllocator import MOTORCYCLES_PER_BAY
+from ColumnarExport import merge_columns, to_numpy
+from ParkingService import ParkingService
+from PlateIndex import normalize_plate
+
+# Message sent to a worker to run several calls in one round trip
+BATCH_METHOD = '__batch__'
+
+
+def _run_call(service, method, args, kwargs):
+    """Execute one ParkingService call inside a worker"""
+    try:
+        result = getattr(service, method)(*args, **kwargs)
+        # Lazy iterators (query_slots) cannot cross the process boundary
+        if hasattr(result, '__next__'):
+            result = list(result)
+        return True, result
+    except Exception as e:
+        return False, f'{type(e).__name__}: {e}'
+
+
+def shard_worker(conn):
+    """
+    Worker process loop - owns one ParkingService for its share of levels
+
+    Receives (method, args, kwargs) tuples and answers each with
+    (ok, result).  A method of None shuts the worker down.
+    """
+    service = ParkingService()
+    while True:
+        method, args, kwargs = conn.recv()
+        if method is None:
+            break
+        if method == BATCH_METHOD:
+            conn.send((True, [_run_call(service, *call) for call in args[0]]))
+        else:
+            conn.send(_run_call(service, method, args, kwargs))
+    conn.close()
+
+
+class ShardedParkingService:
+    """
+    Router over several ParkingService worker processes
+
+    Level-scoped calls (create, park, remove, status) go to the shard that
+    owns the level; site-wide calls (plate lookup, search, occupancy,
+    compound queries) are scattered to every shard and gathered.  Each
+    worker has its own interpreter and GIL, so independent levels are
+    served in parallel - use execute_many to keep all workers busy.
+
+    The router is thread-safe: each shard's pipe is held by one request at
+    a time, from send to reply. Snapshots and change-feed subscriptions
+    live inside the worker processes and are not offered.
+    """
+
+    def __init__(self, num_workers=None, level_shards=None):
+        """
+        Args:
+            num_workers (int): Number of worker processes, defaults to CPU count
+            level_shards (dict): Optional {level: shard number} placement;
+                unlisted levels are placed by hash(level) % num_workers
+        """
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.level_shards = dict(level_shards or {})
+        self._connections = []
+        self._processes = []
+        # One per pipe, held across each send/recv pair so replies cannot be read by the wrong caller
+        self._locks = [threading.Lock() for _ in range(self.num_workers)]
+        for _ in range(self.num_workers):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=shard_worker, args=(child_conn,), daemon=True)
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+
+    # =============================================================================
+    # ROUTING HELPERS
+    # =============================================================================
+
+    def shard_for(self, level):
+        """Return the shard number that owns the given level"""
+        shard = self.level_shards.get(level)
+        if shard is None:
+            shard = hash(level) % self.num_workers
+        return shard
+
+    @contextmanager
+    def _holding(self, shards):
+        """Hold the pipes of the given shards, locked in shard order so concurrent callers cannot deadlock"""
+        locks = [self._locks[shard] for shard in sorted(shards)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _call(self, shard, method, *args, **kwargs):
+        conn = self._connections[shard]
+        with self._locks[shard]:
+            conn.send((method, args, kwargs))
+            ok, result = conn.recv()
+        if not ok:
+            raise RuntimeError(f'Shard {shard} failed in {method}: {result}')
+        return result
+
+    def _scatter(self, method, *args, **kwargs):
+        """Send the same call to every shard, then gather the replies in shard order"""
+        return self._gather({shard: (method, args, kwargs) for shard in range(self.num_workers)})
+
+    def _gather(self, calls):
+        """
+        Send one call per shard before reading any reply, so the shards work in parallel
+
+        Args:
+            calls (dict): {shard: (method, args, kwargs)}
+
+        Returns:
+            list: Results in shard order
+        """
+        with self._holding(calls):
+            for shard, call in calls.items():
+                self._connections[shard].send(call)
+            replies = [(shard, self._connections[shard].recv()) for shard in sorted(calls)]
+        for shard, (ok, result) in replies:
+            if not ok:
+                raise RuntimeError(f'Shard {shard} failed in {calls[shard][0]}: {result}')
+        return [result for _, (ok, result) in replies]
+
+    def execute_many(self, calls):
+        """
+        Run many level-scoped calls with one round trip per shard
+
+        Calls are grouped by owning shard and sent to all shards before any
+        reply is read, so the workers execute their batches in parallel.
+        Calls for the same level keep their relative order.
+
+        Args:
+            calls (list): (method, level, *args) tuples, e.g.
+                ('park_vehicle', 1, vehicle_data)
+
+        Returns:
+            list: Results in the same order as calls
+        """
+        batches = [[] for _ in range(self.num_workers)]
+        positions = [[] for _ in range(self.num_workers)]
+        for position, (method, level, *args) in enumerate(calls):
+            shard = self.shard_for(level)
+            batches[shard].append((method, (level,) + tuple(args), {}))
+            positions[shard].append(position)
+
+        busy = [shard for shard in range(self.num_workers) if batches[shard]]
+        results = [None] * len(calls)
+        with self._holding(busy):
+            for shard in busy:
+                self._connections[shard].send((BATCH_METHOD, (batches[shard],), {}))
+            for shard in busy:
+                ok, replies = self._connections[shard].recv()
+                for position, (call_ok, result) in zip(positions[shard], replies):
+                    results[position] = result if call_ok else {'success': False, 'message': result}
+        return results
+
+    # =============================================================================
+    # LEVEL-SCOPED OPERATIONS (routed to the owning shard)
+    # =============================================================================
+
+    def create_parking_lot(self, level, regular_spaces, ev_spaces, motorcycles_per_bay=MOTORCYCLES_PER_BAY,
+                           regular_distances=None, ev_distances=None):
+        """Create a parking lot level on its owning shard"""
+        return self._call(self.shard_for(level), 'create_parking_lot', level, regular_spaces, ev_spaces,
+                          motorcycles_per_bay, regular_distances, ev_distances)
+
+    def resize_parking_lot(self, level, regular_spaces=None, ev_spaces=None, relocate=False):
+        """Grow or shrink a level on its owning shard"""
+        return self._call(self.shard_for(level), 'resize_parking_lot', level, regular_spaces, ev_spaces, relocate)
+
+    def update_bay_distances(self, level, distances, is_ev_slot=False):
+        """Re-weight slots on the shard owning the level"""
+        return self._call(self.shard_for(level), 'update_bay_distances', level, distances, is_ev_slot)
+
+    def reserve(self, level, start, end, is_ev_slot=False, slot_id=None):
+        """Reserve a slot on the shard owning the level"""
+        return self._call(self.shard_for(level), 'reserve', level, start, end, is_ev_slot, slot_id)
+
+    def cancel_reservation(self, level, reservation_id):
+        """Cancel a reservation on the shard owning the level"""
+        return self._call(self.shard_for(level), 'cancel_reservation', level, reservation_id)
+
+    def count_free_bays(self, level, start, end, is_ev_slot=False):
+        """Count unreserved slots for a window on the shard owning the level"""
+        return self._call(self.shard_for(level), 'count_free_bays', level, start, end, is_ev_slot)
+
+    def park_vehicle(self, level, vehicle_data):
+        """Park a vehicle on the shard owning the level (plates are only checked for uniqueness within that shard)"""
+        return self._call(self.shard_for(level), 'park_vehicle', level, vehicle_data)
+
+    def park_vehicles(self, level, vehicles):
+        """Park a batch of vehicles in one round trip to the shard owning the level"""
+        return self._call(self.shard_for(level), 'park_vehicles', level, vehicles)
+
+    def remove_vehicle(self, level, slot_id, is_ev_slot=False, regnum=None):
+        """Remove a vehicle on the shard owning the level"""
+        return self._call(self.shard_for(level), 'remove_vehicle', level, slot_id, is_ev_slot, regnum)
+
+    def edit_vehicle(self, level, slot_id, is_ev_slot=False, regnum=None, make=None, model=None, color=None,
+                     current_regnum=None):
+        """Change a parked vehicle's details on the shard owning the level"""
+        return self._call(self.shard_for(level), 'edit_vehicle', level, slot_id, is_ev_slot, regnum, make, model,
+                          color, current_regnum)
+
+    def update_charge(self, level, slot_id, charge, regnum=None):
+        """Record an EV's charge level on the shard owning the level"""
+        return self._call(self.shard_for(level), 'update_charge', level, slot_id, charge, regnum)
+
+    def get_status(self, level):
+        """Get parked vehicle status from the shard owning the level"""
+        return self._call(self.shard_for(level), 'get_status', level)
+
+    def get_charge_status(self, level):
+        """Get EV charge status from the shard owning the level"""
+        return self._call(self.shard_for(level), 'get_charge_status', level)
+
+    # =============================================================================
+    # SITE-WIDE OPERATIONS (scatter-gather across shards)
+    # =============================================================================
+
+    def apply_charges(self, updates):
+        """
+        Apply charge readings with one round trip per shard
+
+        Level-keyed readings go to the owning shard. Plate-keyed readings
+        (level None) go to every shard, since any of them may hold the
+        plate; the shards that do not hold it skip the reading, and those
+        skips are not counted.
+        """
+        batches = [[] for _ in range(self.num_workers)]
+        fanned_out = 0
+        for update in updates:
+            if update[0] is None:
+                fanned_out += 1
+                for batch in batches:
+                    batch.append(update)
+            else:
+                batches[self.shard_for(update[0])].append(update)
+        results = self._gather({shard: ('apply_charges', (batch,), {})
+                                for shard, batch in enumerate(batches) if batch})
+        totals = {'applied': 0, 'unchanged': 0, 'skipped': -fanned_out * (self.num_workers - 1)}
+        for result in results:
+            if not result['success']:
+                return result
+            for name in totals:
+                totals[name] += result[name]
+        totals['skipped'] = max(totals['skipped'], 0)
+        return dict(totals, success=True,
+                    message=(f"Applied {totals['applied']} charge readings ({totals['unchanged']} unchanged, "
+                             f"{totals['skipped']} skipped)"))
+
+    def find_vehicle(self, regnum):
+        """Locate a plate on every shard and merge the matches"""
+        matches = []
+        for result in self._scatter('find_vehicle', regnum):
+            matches.extend(result.get('matches', []))
+        if not matches:
+            return {'success': False, 'matches': [], 'message': f'Vehicle {regnum} not found'}
+        return {'success': True, 'matches': matches, 'message': f'Found {len(matches)} vehicle(s) for {regnum}'}
+
+    def search_plates(self, text, mode='prefix', limit=None):
+        """Search plates on every shard and merge the matches in plate order"""
+        matches = []
+        for result in self._scatter('search_plates', text, mode, limit):
+            if not result['success']:
+                return result
+            matches.extend(result['matches'])
+        matches.sort(key=lambda match: (match['regnum'], match['level'], match['slot_id']))
+        if limit is not None:
+            matches = matches[:limit]
+        return {
+            'success': True,
+            'matches': matches,
+            'message': f'{len(matches)} plate match(es) for {text!r} ({mode})'
+        }
+
+    def get_occupancy(self, level=None):
+        """Gather occupancy from every shard and sum the site totals"""
+        if level is not None:
+            return self._call(self.shard_for(level), 'get_occupancy', level)
+        levels = {}
+        totals = {'regular_capacity': 0, 'regular_occupied': 0, 'regular_bays_used': 0,
+                  'ev_capacity': 0, 'ev_occupied': 0, 'ev_bays_used': 0}
+        for result in self._scatter('get_occupancy'):
+            levels.update(result['levels'])
+            for key, value in result['totals'].items():
+                totals[key] += value
+        return {
+            'success': True,
+            'levels': dict(sorted(levels.items())),
+            'totals': totals,
+            'message': f'Occupancy retrieved for {len(levels)} level(s)'
+        }
+
+    def cache_stats(self):
+        """Result-cache counters summed over all shards"""
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'entries': 0, 'bytes': 0}
+        for result in self._scatter('cache_stats'):
+            for key in stats:
+                stats[key] += result[key]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['success'] = True
+        stats['message'] = (f"Result cache: {stats['hits']} hit(s), {stats['misses']} miss(es) "
+                            f"over {self.num_workers} shard(s)")
+        return stats
+
+    def memory_usage(self, levels=None):
+        """Per-level memory estimates merged from every shard; site figures and totals are summed"""
+        merged = {}
+        site = {'plate_index': 0, 'change_feed': 0}
+        total = 0
+        for result in self._scatter('memory_usage', levels=list(levels) if levels is not None else None):
+            if not result['success']:
+                return result
+            merged.update(result['levels'])
+            for key in site:
+                site[key] += result['site'][key]
+            total += result['total']
+        return {
+            'success': True,
+            'levels': dict(sorted(merged.items())),
+            'site': site,
+            'total': total,
+            'message': f'{total} bytes estimated over {self.num_workers} shard(s)'
+        }
+
+    def set_memory_budget(self, budget):
+        """Give every shard process the same memory budget; success only if all are within it"""
+        results = self._scatter('set_memory_budget', budget)
+        within = all(result['success'] for result in results)
+        return {
+            'success': within,
+            'shards': results,
+            'message': (f'Memory budget of {budget} bytes set on {self.num_workers} shard(s)' if within else
+                        f"{sum(not result['success'] for result in results)} shard(s) over the budget")
+        }
+
+    def audit_plates(self, levels=None):
+        """
+        Audit every shard for repeated plates and merge the reports
+
+        Plates are only kept unique within a shard, so a plate parked once
+        on each of two shards is not reported.
+        """
+        if isinstance(levels, int):
+            return self._call(self.shard_for(levels), 'audit_plates', levels)
+        duplicates = {}
+        vehicles = 0
+        for result in self._scatter('audit_plates', list(levels) if levels is not None else None):
+            if not result['success']:
+                return result
+            vehicles += result['vehicles']
+            for duplicate in result['duplicates']:
+                duplicates.setdefault(normalize_plate(duplicate['regnum']), []).extend(duplicate['locations'])
+        duplicates = [{'regnum': plate, 'locations': sorted(locations, key=lambda location: (
+                      location['level'], location['is_ev_slot'], location['slot_id']))}
+                      for plate, locations in sorted(duplicates.items())]
+        return {
+            'success': True,
+            'duplicates': duplicates,
+            'vehicles': vehicles,
+            'message': f'{len(duplicates)} duplicated plate(s) among {vehicles} parked vehicle(s)'
+        }
+
+    def export_columns(self, levels=None, as_numpy=True):
+        """Export columns from every shard and merge them in level order, with one set of dictionaries"""
+        if isinstance(levels, int):
+            parts = [self._call(self.shard_for(levels), 'export_columns', levels, as_numpy=False)]
+        else:
+            parts = self._scatter('export_columns', list(levels) if levels is not None else None, as_numpy=False)
+        encoded = merge_columns(parts)
+        return to_numpy(encoded) if as_numpy else encoded
+
+    def snapshot(self, levels=None):
+        """Not offered: snapshots share memory with a worker's live slots and cannot leave its process"""
+        raise NotImplementedError('ShardedParkingService cannot snapshot worker levels; '
+                                  'use export_columns or get_status instead')
+
+    def subscribe(self, callback=None, kinds=None, levels=None, buffer=1000, since=None):
+        """Not offered: each worker keeps its own change feed, and callbacks cannot cross processes"""
+        raise NotImplementedError('ShardedParkingService has no site-wide change feed; '
+                                  'subscribe to a single-process ParkingService instead')
+
+    def query_slots(self, color=None, make=None, model=None, vehicle_type=None, is_electric=None, levels=None):
+        """Run a compound slot query on every shard and yield the merged SlotRefs in level order"""
+        criteria = {'color': color, 'make': make, 'model': model,
+                    'vehicle_type': vehicle_type, 'is_electric': is_electric, 'levels': levels}
+        if isinstance(levels, int):
+            refs = self._call(self.shard_for(levels), 'query_slots', **criteria)
+        else:
+            if levels is not None:
+                criteria['levels'] = list(levels)
+            refs = [ref for shard_refs in self._scatter('query_slots', **criteria) for ref in shard_refs]
+            refs.sort(key=lambda ref: (ref.level, ref.is_ev_slot, ref.slot_id))
+        return iter(refs)
+
+    # =============================================================================
+    # LIFECYCLE
+    # =============================================================================
+
+    def close(self):
+        """Stop every worker process"""
+        for conn, process in zip(self._connections, self._processes):
+            try:
+                conn.send((None, (), {}))
+                conn.close()
+            except (OSError, EOFError):
+                pass
+            process.join(timeout=5)
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,247 @@
+"""
+Slot Index Layer - Bitmap indexes over parked vehicles
+Keeps one posting (slot set or chunked bitmap) per attribute value so compound
+queries are answered by intersecting postings instead of scanning slot lists
+"""
+
+from array import array
+from collections import namedtuple
+
+# Attributes maintained as bitmaps for every slot array
+INDEXED_ATTRIBUTES = ('color', 'make', 'model', 'type')
+
+# Bitmaps are split into chunks of this many slots, each stored as a Python int
+CHUNK_BITS = 4096
+
+# Reference to a single slot returned by compound queries
+SlotRef = namedtuple('SlotRef', ['level', 'slot_id', 'is_ev_slot'])
+
+
+def base_vehicle_type(vehicle_type):
+    """Strip the electric prefix so 'electric_motorcycle' indexes as 'motorcycle'"""
+    if isinstance(vehicle_type, str) and vehicle_type.startswith('electric_'):
+        return vehicle_type[len('electric_'):]
+    return vehicle_type
+
+
+def iter_set_bits(mask, offset=0):
+    """
+    Lazily yield the positions of all set bits in an integer bitmap
+
+    Works through the bitmap one 64-bit word at a time so large, sparse
+    results never pay for big-integer arithmetic per match.
+    """
+    if mask <= 0:
+        return
+    num_words = (mask.bit_length() + 63) // 64
+    words = array('Q', mask.to_bytes(num_words * 8, 'little'))
+    for word_index, word in enumerate(words):
+        base = offset + word_index * 64
+        while word:
+            low_bit = word & -word
+            yield base + low_bit.bit_length() - 1
+            word ^= low_bit
+
+
+def iter_chunked_bits(chunks):
+    """Yield the set positions of a chunked bitmap ({chunk: int}) in ascending order"""
+    for chunk in sorted(chunks):
+        yield from iter_set_bits(chunks[chunk], chunk * CHUNK_BITS)
+
+
+class SlotBitmapIndex:
+    """
+    Per-attribute postings for one slot array (regular or EV) of a level
+
+    A value starts out as a set of slot indexes and is promoted to a
+    chunked bitmap ({chunk: int}, CHUNK_BITS slots per Python int, only
+    non-empty chunks stored) once it occupies more than 1 in DENSE_RATIO
+    slots.  Rare, high-cardinality values such as models therefore cost
+    memory per parked vehicle, while common values such as colors get
+    compact bitmaps.  Park and remove touch one set entry or one chunk, and
+    queries only visit the candidates of the most selective criterion.
+    """
+
+    # A value becomes a bitmap once it holds more than capacity // DENSE_RATIO slots
+    DENSE_RATIO = 512
+    MIN_DENSE_SIZE = 64
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.dense_threshold = max(self.MIN_DENSE_SIZE, capacity // self.DENSE_RATIO)
+        # Format: {chunk: int}
+        self.occupied = {}
+        # Later bays of multi-bay vehicles, same format - occupied, but not where a vehicle starts
+        self.continued = {}
+        # Vehicles recorded (motorcycles sharing a bay count one each)
+        self.vehicles = 0
+        # Format: {attribute: {value: set of slot indexes or {chunk: int}}}
+        self.postings = {attribute: {} for attribute in INDEXED_ATTRIBUTES}
+
+    def add(self, slot_index, vehicle, first=True):
+        """
+        Record vehicle attributes for the given 0-based slot index
+
+        A vehicle covering several bays is added once per bay; only its
+        first bay (first=True) carries its attributes and counts it, the
+        others are only marked occupied, so queries and counts see it once.
+        """
+        chunk, bit = divmod(slot_index, CHUNK_BITS)
+        bit = 1 << bit
+        self.occupied[chunk] = self.occupied.get(chunk, 0) | bit
+        if not first:
+            self.continued[chunk] = self.continued.get(chunk, 0) | bit
+            return
+        self.vehicles += 1
+        for attribute, value in self._attribute_values(vehicle):
+            values = self.postings[attribute]
+            posting = values.get(value)
+            if posting is None:
+                values[value] = {slot_index}
+            elif isinstance(posting, set):
+                posting.add(slot_index)
+                if len(posting) > self.dense_threshold:
+                    values[value] = self._to_bitmap(posting)
+            else:
+                posting[chunk] = posting.get(chunk, 0) | bit
+
+    def remove(self, slot_index, vehicle, first=True, keep=()):
+        """
+        Clear vehicle attributes for the given 0-based slot index
+
+        Args:
+            first (bool): False for the later bays of a multi-bay vehicle, as passed to add
+            keep (tuple): Vehicles still sharing the bay - the bay stays occupied
+                and their attribute values stay set
+        """
+        chunk, bit = divmod(slot_index, CHUNK_BITS)
+        bit = 1 << bit
+        if not keep:
+            self._clear_bit(self.occupied, chunk, bit)
+        if not first:
+            self._clear_bit(self.continued, chunk, bit)
+            return
+        self.vehicles -= 1
+        kept = set(entry for other in keep for entry in self._attribute_values(other))
+        for attribute, value in self._attribute_values(vehicle):
+            values = self.postings[attribute]
+            posting = values.get(value)
+            if posting is None or (attribute, value) in kept:
+                continue
+            if isinstance(posting, set):
+                posting.discard(slot_index)
+            else:
+                self._clear_bit(posting, chunk, bit)
+            # Drop postings for values that no longer appear anywhere
+            if not posting:
+                del values[value]
+
+    def resize(self, capacity):
+        """Adjust capacity; postings are sparse, so no bitmap is reallocated"""
+        self.capacity = capacity
+        self.dense_threshold = max(self.MIN_DENSE_SIZE, capacity // self.DENSE_RATIO)
+
+    def occupied_from(self, start):
+        """Return the occupied 0-based slot indexes >= start, visiting only the chunks at or beyond it"""
+        first_chunk, offset = divmod(start, CHUNK_BITS)
+        indexes = []
+        for chunk in sorted(chunk for chunk in self.occupied if chunk >= first_chunk):
+            bits = self.occupied[chunk]
+            if chunk == first_chunk:
+                bits = (bits >> offset) << offset
+            indexes.extend(iter_set_bits(bits, chunk * CHUNK_BITS))
+        return indexes
+
+    def count_occupied(self):
+        """Return the number of occupied slots"""
+        return sum(bin(bits).count('1') for bits in self.occupied.values())
+
+    def count_vehicles(self):
+        """Return the number of vehicles parked (a truck or bus counts once)"""
+        return self.vehicles
+
+    def match(self, criteria):
+        """
+        Intersect the postings selected by criteria
+
+        Args:
+            criteria (dict): {attribute: value or collection of values};
+                a collection matches any of its values
+
+        Returns:
+            dict: Chunked bitmap {chunk: int} of matching 0-based slot indexes,
+                  a multi-bay vehicle matching at its first bay only
+        """
+        selections = []
+        for attribute, wanted in criteria.items():
+            values = wanted if isinstance(wanted, (list, tuple, set, frozenset)) else (wanted,)
+            if attribute == 'type':
+                values = [base_vehicle_type(value) for value in values]
+            selection = self._union(attribute, values)
+            if not selection:
+                return {}
+            selections.append(selection)
+        if not selections:
+            continued = self.continued
+            return {chunk: bits & ~continued.get(chunk, 0) for chunk, bits in self.occupied.items()
+                    if bits & ~continued.get(chunk, 0)}
+
+        sparse = sorted((selection for selection in selections if isinstance(selection, set)), key=len)
+        dense = sorted((selection for selection in selections if not isinstance(selection, set)), key=len)
+        result = {}
+        if sparse:
+            # Probe the smallest set's members against every other posting
+            others = sparse[1:]
+            for slot_index in sparse[0]:
+                chunk, offset = divmod(slot_index, CHUNK_BITS)
+                if all(slot_index in other for other in others) and \
+                        all((bitmap.get(chunk, 0) >> offset) & 1 for bitmap in dense):
+                    result[chunk] = result.get(chunk, 0) | (1 << offset)
+            return result
+
+        # Only chunks present in the most selective bitmap can survive
+        for chunk, bits in dense[0].items():
+            for bitmap in dense[1:]:
+                bits &= bitmap.get(chunk, 0)
+                if not bits:
+                    break
+            if bits:
+                result[chunk] = bits
+        return result
+
+    def _union(self, attribute, values):
+        postings = [self.postings[attribute][value] for value in values if value in self.postings[attribute]]
+        if len(postings) <= 1:
+            return postings[0] if postings else set()
+        if all(isinstance(posting, set) for posting in postings):
+            return set().union(*postings)
+        union = {}
+        for posting in postings:
+            if isinstance(posting, set):
+                posting = self._to_bitmap(posting)
+            for chunk, bits in posting.items():
+                union[chunk] = union.get(chunk, 0) | bits
+        return union
+
+    @staticmethod
+    def _to_bitmap(slot_indexes):
+        bitmap = {}
+        for slot_index in slot_indexes:
+            chunk, offset = divmod(slot_index, CHUNK_BITS)
+            bitmap[chunk] = bitmap.get(chunk, 0) | (1 << offset)
+        return bitmap
+
+    @staticmethod
+    def _clear_bit(bitmap, chunk, bit):
+        bits = bitmap.get(chunk, 0) & ~bit
+        if bits:
+            bitmap[chunk] = bits
+        else:
+            bitmap.pop(chunk, None)
+
+    def _attribute_values(self, vehicle):
+        for attribute in INDEXED_ATTRIBUTES:
+            value = vehicle.get(attribute)
+            if attribute == 'type':
+                value = base_vehicle_type(value)
+            yield attribute, value
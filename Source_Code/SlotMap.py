@@ -0,0 +1,305 @@
+"""
+Slot Map - Live canvas grid of a level's bays
+Listens to ParkingService change events and repaints only the cells that
+changed; only the rows inside the viewport have canvas items, so levels with
+thousands of bays zoom and scroll smoothly
+"""
+
+import threading
+import tkinter as tk
+
+from BayAllocator import SharedBay
+from ChangeFeed import LEVEL_CREATED, LEVEL_RESIZED, VEHICLE_REMOVED, CHARGE_UPDATED
+
+EMPTY_REGULAR = '#e4e4e4'
+EMPTY_EV = '#d6efd6'
+CAR = '#4a7bd0'
+MOTORCYCLE = '#8a63c7'
+LARGE_VEHICLE = '#d08a3a'
+OUTLINE = '#9a9a9a'
+
+
+def charge_colour(charge):
+    """Red at 0%, amber at 50%, green at 100%"""
+    charge = max(0, min(100, charge or 0))
+    if charge < 50:
+        red, green = 220, int(60 + 140 * charge / 50)
+    else:
+        red, green = int(220 - 180 * (charge - 50) / 50), 200
+    return '#%02x%02x%02x' % (red, green, 60)
+
+
+def vehicle_colour(occupant, is_ev_slot):
+    """Fill colour for an occupied cell (a vehicle or a SharedBay of motorcycles)"""
+    if isinstance(occupant, SharedBay):
+        occupant = occupant[0]
+    if is_ev_slot:
+        return charge_colour(occupant.get('charge'))
+    if 'motorcycle' in occupant['type']:
+        return MOTORCYCLE
+    return LARGE_VEHICLE if occupant.get('bays', 1) > 1 else CAR
+
+
+class SlotMapModel:
+    """
+    Tk-free state behind SlotMapWidget
+
+    on_event() may be called from any thread (it is a synchronous change-feed
+    subscriber); it only records the new colour of one cell and marks it
+    dirty.  The widget drains the dirty cells on the Tk thread.  Level
+    create/resize events ask for a full reload from a snapshot instead.
+    """
+
+    def __init__(self, level, columns=40):
+        self.level = level
+        self.columns = columns
+        self.regular_spaces = 0
+        self.ev_spaces = 0
+        self._cells = {}     # (is_ev_slot, slot_index) -> fill colour, occupied cells only
+        self._dirty = set()
+        self._replay = []    # cell changes seen while a reload is pending
+        self._generation = 0
+        self._reload = True
+        self._lock = threading.Lock()
+
+    def on_event(self, event):
+        if event.level != self.level:
+            return
+        details = event.details
+        with self._lock:
+            if event.kind in (LEVEL_CREATED, LEVEL_RESIZED):
+                self._generation += 1
+                self._reload = True
+                self._replay.clear()
+                return
+            is_ev_slot, first = details['is_ev_slot'], details['slot_id'] - 1
+            if event.kind == VEHICLE_REMOVED:
+                if details.get('remaining'):
+                    # Other motorcycles still share the bay - its colour stays
+                    return
+                colour = None
+            elif event.kind == CHARGE_UPDATED:
+                colour = charge_colour(details['charge'])
+            else:
+                colour = vehicle_colour(details['vehicle'], is_ev_slot)
+            for slot_index in range(first, first + details.get('bays', 1)):
+                key = (is_ev_slot, slot_index)
+                self._set(key, colour)
+                self._dirty.add(key)
+                if self._reload:
+                    self._replay.append((key, colour))
+
+    @property
+    def generation(self):
+        """Read before taking the snapshot that is passed to load()"""
+        return self._generation
+
+    @property
+    def needs_reload(self):
+        return self._reload
+
+    def load(self, snapshot, generation):
+        """
+        Rebuild every cell from a LevelSnapshot (or None if the level is gone)
+
+        Changes that arrived while the reload was pending are re-applied on
+        top; each one sets a cell outright, so repeating a change already in
+        the snapshot is harmless.
+        """
+        cells = {}
+        if snapshot is not None:
+            for is_ev_slot, slots in ((False, snapshot.regular_slots), (True, snapshot.ev_slots)):
+                for slot_index, vehicle in enumerate(slots):
+                    if vehicle is not None:
+                        cells[(is_ev_slot, slot_index)] = vehicle_colour(vehicle, is_ev_slot)
+        with self._lock:
+            self.regular_spaces = snapshot.regular_spaces if snapshot is not None else 0
+            self.ev_spaces = snapshot.ev_spaces if snapshot is not None else 0
+            self._cells = cells
+            for key, colour in self._replay:
+                self._set(key, colour)
+            self._replay.clear()
+            self._dirty.clear()
+            # A create/resize that raced with the snapshot needs another pass
+            self._reload = generation != self._generation
+
+    def take_dirty(self):
+        """Return [(key, fill colour)] for cells changed since the last call"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return [(key, self.colour(key)) for key in dirty]
+
+    def colour(self, key):
+        colour = self._cells.get(key)
+        if colour is None:
+            return EMPTY_EV if key[0] else EMPTY_REGULAR
+        return colour
+
+    def occupied(self):
+        return len(self._cells)
+
+    def regular_rows(self):
+        return -(-self.regular_spaces // self.columns)
+
+    def rows(self):
+        """Total grid rows: regular block, one label row, EV block"""
+        return self.regular_rows() + 1 + -(-self.ev_spaces // self.columns)
+
+    def position(self, key):
+        """(row, column) of a cell"""
+        is_ev_slot, slot_index = key
+        row, column = divmod(slot_index, self.columns)
+        if is_ev_slot:
+            row += self.regular_rows() + 1
+        return row, column
+
+    def cells_in_rows(self, first_row, last_row):
+        """Yield the keys of cells in rows first_row..last_row inclusive"""
+        regular_rows = self.regular_rows()
+        for is_ev_slot, size, row_offset in ((False, self.regular_spaces, 0),
+                                             (True, self.ev_spaces, regular_rows + 1)):
+            start = max(first_row - row_offset, 0) * self.columns
+            stop = min((last_row - row_offset + 1) * self.columns, size)
+            for slot_index in range(start, stop):
+                yield (is_ev_slot, slot_index)
+
+    def _set(self, key, colour):
+        if colour is None:
+            self._cells.pop(key, None)
+        else:
+            self._cells[key] = colour
+
+
+class SlotMapWidget(tk.Frame):
+    """
+    Scrollable, zoomable map of one level's slots
+
+    Ctrl+mouse wheel or the +/- buttons zoom; the wheel and scrollbars
+    scroll.  Changes are picked up every refresh_ms and applied with one
+    itemconfigure per changed, visible cell.
+    """
+
+    MIN_CELL = 4
+    MAX_CELL = 48
+
+    def __init__(self, master, service, level, columns=40, cell_size=14, refresh_ms=50):
+        tk.Frame.__init__(self, master)
+        self.service = service
+        self.model = SlotMapModel(level, columns)
+        self.cell_size = cell_size
+        self.refresh_ms = refresh_ms
+        self._items = {}  # key -> canvas rectangle id, visible cells only
+        self._drawn_rows = (0, -1)
+
+        toolbar = tk.Frame(self)
+        toolbar.pack(side=tk.TOP, fill=tk.X)
+        tk.Label(toolbar, text=f'Level {level}', font='Arial 10 bold').pack(side=tk.LEFT, padx=5)
+        tk.Button(toolbar, text='−', width=2, command=lambda: self.zoom(0.8)).pack(side=tk.RIGHT)
+        tk.Button(toolbar, text='+', width=2, command=lambda: self.zoom(1.25)).pack(side=tk.RIGHT)
+        self.summary = tk.Label(toolbar, text='', font='Arial 9')
+        self.summary.pack(side=tk.RIGHT, padx=10)
+
+        self.canvas = tk.Canvas(self, background='white', highlightthickness=0)
+        y_scroll = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.canvas.yview)
+        x_scroll = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        self.canvas.configure(yscrollcommand=lambda *args: self._on_scroll(y_scroll, args),
+                              xscrollcommand=x_scroll.set)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        x_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind('<Configure>', lambda event: self._draw_visible())
+        self.canvas.bind('<MouseWheel>', self._on_wheel)
+        self.canvas.bind('<Control-MouseWheel>', self._on_zoom_wheel)
+        self.canvas.bind('<Button-4>', lambda event: self.canvas.yview_scroll(-3, 'units'))
+        self.canvas.bind('<Button-5>', lambda event: self.canvas.yview_scroll(3, 'units'))
+        self.canvas.bind('<Control-Button-4>', lambda event: self.zoom(1.25))
+        self.canvas.bind('<Control-Button-5>', lambda event: self.zoom(0.8))
+
+        self._subscription = service.subscribe(self.model.on_event, levels=[level])
+        self.bind('<Destroy>', self._on_destroy)
+        self._tick()
+
+    def zoom(self, factor):
+        """Scale cells by factor, keeping the top-left row in view"""
+        size = int(round(self.cell_size * factor))
+        size = max(self.MIN_CELL, min(self.MAX_CELL, size))
+        if size == self.cell_size:
+            return
+        top = self.canvas.canvasy(0) / self.cell_size
+        self.cell_size = size
+        self._redraw_all()
+        rows = max(self.model.rows(), 1)
+        self.canvas.yview_moveto(top / rows)
+
+    # =============================================================================
+    # DRAWING INTERNALS
+    # =============================================================================
+
+    def _tick(self):
+        if self.model.needs_reload:
+            generation = self.model.generation
+            snapshot = self.service.snapshot(self.model.level).get(self.model.level)
+            self.model.load(snapshot, generation)
+            self._redraw_all()
+        else:
+            for key, colour in self.model.take_dirty():
+                item = self._items.get(key)
+                if item is not None:
+                    self.canvas.itemconfigure(item, fill=colour)
+            self._update_summary()
+        self._after_id = self.after(self.refresh_ms, self._tick)
+
+    def _redraw_all(self):
+        self.canvas.delete('all')
+        self._items = {}
+        self._drawn_rows = (0, -1)
+        model = self.model
+        size = self.cell_size
+        self.canvas.configure(scrollregion=(0, 0, model.columns * size, model.rows() * size))
+        if model.ev_spaces:
+            self.canvas.create_text(2, model.regular_rows() * size + size // 2, anchor='w',
+                                    text='EV', font=('Arial', max(size - 4, 6)))
+        self._draw_visible()
+        self._update_summary()
+
+    def _draw_visible(self):
+        """Create items for rows entering the viewport and drop those that left"""
+        size = self.cell_size
+        first = max(int(self.canvas.canvasy(0) // size), 0)
+        last = min(int(self.canvas.canvasy(self.canvas.winfo_height()) // size), self.model.rows() - 1)
+        if (first, last) == self._drawn_rows:
+            return
+        model = self.model
+        for key in list(self._items):
+            row = model.position(key)[0]
+            if row < first or row > last:
+                self.canvas.delete(self._items.pop(key))
+        for key in model.cells_in_rows(first, last):
+            if key in self._items:
+                continue
+            row, column = model.position(key)
+            x, y = column * size, row * size
+            self._items[key] = self.canvas.create_rectangle(x + 1, y + 1, x + size - 1, y + size - 1,
+                                                            fill=model.colour(key), outline=OUTLINE)
+        self._drawn_rows = (first, last)
+
+    def _update_summary(self):
+        model = self.model
+        total = model.regular_spaces + model.ev_spaces
+        self.summary.configure(text=f'{model.occupied()}/{total} bays occupied')
+
+    def _on_scroll(self, scrollbar, args):
+        scrollbar.set(*args)
+        self._draw_visible()
+
+    def _on_wheel(self, event):
+        self.canvas.yview_scroll(-1 if event.delta > 0 else 1, 'units')
+
+    def _on_zoom_wheel(self, event):
+        self.zoom(1.25 if event.delta > 0 else 0.8)
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self._subscription.close()
+            self.after_cancel(self._after_id)
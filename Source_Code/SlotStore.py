@@ -0,0 +1,131 @@
+"""
+Slot Store Layer - Copy-on-write slot arrays
+Stores a level's slots in fixed-size pages so a point-in-time snapshot costs
+one page-table copy and writers only copy the pages they touch afterwards
+"""
+
+from collections import namedtuple
+
+# Frozen view of one level, as returned by ParkingService.snapshot()
+LevelSnapshot = namedtuple('LevelSnapshot', ['level', 'version', 'regular_spaces', 'ev_spaces',
+                                             'regular_slots', 'ev_slots'])
+
+
+class SlotView:
+    """
+    Read-only, point-in-time view of a SlotArray
+
+    Holds references to the pages as they were when the snapshot was taken;
+    the owning array copies a page before writing to it, so the view never
+    changes underneath a reader.
+    """
+
+    def __init__(self, pages, length, page_size):
+        self._pages = pages
+        self._length = length
+        self._page_size = page_size
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('slot index out of range')
+        return self._pages[index // self._page_size][index % self._page_size]
+
+    def __iter__(self):
+        remaining = self._length
+        for page in self._pages:
+            if remaining <= 0:
+                break
+            if remaining >= len(page):
+                yield from page
+            else:
+                yield from page[:remaining]
+            remaining -= len(page)
+
+
+class SlotArray(SlotView):
+    """
+    Mutable paged slot list with copy-on-write snapshots
+
+    Behaves like the plain list it replaces (len, indexing, iteration) for
+    the rest of ParkingService.  snapshot() bumps the array's epoch; the
+    first write to a page older than the current epoch copies that page
+    (PAGE_SIZE references) so existing views keep the old contents.
+    Slot values must be replaced rather than mutated in place for the
+    snapshot guarantee to hold.
+    """
+
+    PAGE_SIZE = 256
+
+    def __init__(self, length, fill=None):
+        page_size = self.PAGE_SIZE
+        pages = [[fill] * min(page_size, length - start) for start in range(0, length, page_size)]
+        SlotView.__init__(self, pages, length, page_size)
+        self._epoch = 0
+        self._page_epochs = [0] * len(pages)
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('slot index out of range')
+        page_number = index // self._page_size
+        if self._page_epochs[page_number] != self._epoch:
+            # Page may be shared with a snapshot - copy before the first write
+            self._pages[page_number] = list(self._pages[page_number])
+            self._page_epochs[page_number] = self._epoch
+        self._pages[page_number][index % self._page_size] = value
+
+    def snapshot(self):
+        """Return a frozen SlotView of the current contents in O(pages)"""
+        self._epoch += 1
+        return SlotView(list(self._pages), self._length, self._page_size)
+
+    def resize(self, length, fill=None):
+        """
+        Grow or shrink the array in place in O(|delta|) page work
+
+        New slots are filled with `fill`; truncated slots are dropped.
+        Existing snapshots keep their own length and pages.
+        """
+        page_size = self._page_size
+        if length < self._length:
+            keep_pages = (length + page_size - 1) // page_size
+            del self._pages[keep_pages:]
+            del self._page_epochs[keep_pages:]
+            tail = length - (keep_pages - 1) * page_size if keep_pages else 0
+            if keep_pages and tail < len(self._pages[-1]):
+                # Fresh list, so snapshots sharing the old page are unaffected
+                self._pages[-1] = self._pages[-1][:tail]
+                self._page_epochs[-1] = self._epoch
+        else:
+            missing = length - self._length
+            if self._pages and len(self._pages[-1]) < page_size and missing:
+                extra = min(missing, page_size - len(self._pages[-1]))
+                self._pages[-1] = self._pages[-1] + [fill] * extra
+                self._page_epochs[-1] = self._epoch
+                missing -= extra
+            while missing > 0:
+                extra = min(missing, page_size)
+                self._pages.append([fill] * extra)
+                self._page_epochs.append(self._epoch)
+                missing -= extra
+        self._length = length
+
+    def find_free(self, start=0, empty=None):
+        """Return the first index >= start holding `empty`, or -1 (page searches run in C)"""
+        page_size = self._page_size
+        page_number, offset = divmod(max(start, 0), page_size)
+        while page_number < len(self._pages):
+            page = self._pages[page_number]
+            try:
+                index = page_number * page_size + page.index(empty, offset)
+                return index if index < self._length else -1
+            except ValueError:
+                page_number += 1
+                offset = 0
+        return -1
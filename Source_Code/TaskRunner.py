@@ -0,0 +1,198 @@
+"""
+Task Runner - Runs ParkingService work off the Tk main thread
+A single worker thread executes queued jobs; results, progress and errors come
+back through a queue that the Tk main loop polls with root.after
+"""
+
+import queue
+import threading
+
+
+class TaskCancelled(Exception):
+    """Raised inside a job when its CancelToken has been cancelled"""
+
+
+class CancelToken:
+    """Cooperative cancellation flag checked by long-running jobs"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+class TaskHandle:
+    """Handle returned by submit() - lets the GUI cancel a queued or running job"""
+
+    def __init__(self, name):
+        self.name = name
+        self.token = CancelToken()
+        self.done = False
+
+    def cancel(self):
+        self.token.cancel()
+
+
+class BackgroundTaskRunner:
+    """
+    Worker-thread executor for GUI handlers
+
+    Jobs run one at a time, in submission order, on a single daemon thread,
+    so the service and ParkingLot's mirror arrays are only ever touched by
+    one thread.  Every callback (on_done, on_error, on_progress, on_cancel)
+    and every call_soon() function runs on the Tk main thread.
+    """
+
+    def __init__(self, root, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._current = None
+        self._ui_thread = threading.current_thread()
+        self._worker = threading.Thread(target=self._run, name='parking-task-runner', daemon=True)
+        self._worker.start()
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, work, on_done=None, on_error=None, on_progress=None, on_cancel=None, name='task'):
+        """
+        Queue work(token, report_progress) to run on the worker thread
+
+        report_progress(done, total) may be called as often as convenient;
+        only the latest value per poll reaches on_progress(name, done, total).
+
+        Returns:
+            TaskHandle: Used to cancel the job
+        """
+        handle = TaskHandle(name)
+        self._jobs.put((handle, work, on_done, on_error, on_progress, on_cancel))
+        return handle
+
+    def cancel_current(self):
+        """Cancel the running job and everything still queued"""
+        if self._current is not None:
+            self._current.cancel()
+        while True:
+            try:
+                handle, *rest = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            handle.cancel()
+            self._results.put(('cancelled', handle, rest[4], None))
+
+    @property
+    def busy(self):
+        return self._current is not None or not self._jobs.empty()
+
+    def on_ui_thread(self):
+        return threading.current_thread() is self._ui_thread
+
+    def call_soon(self, function, *args):
+        """Run function(*args) on the Tk main thread at the next poll"""
+        self._results.put(('call', None, function, args))
+
+    # =============================================================================
+    # WORKER AND POLLING INTERNALS
+    # =============================================================================
+
+    def _run(self):
+        while True:
+            handle, work, on_done, on_error, on_progress, on_cancel = self._jobs.get()
+            if handle.token.cancelled:
+                continue
+            self._current = handle
+
+            def report_progress(done, total, handle=handle, on_progress=on_progress):
+                handle.token.raise_if_cancelled()
+                if on_progress is not None:
+                    self._results.put(('progress', handle, on_progress, (done, total)))
+
+            try:
+                result = work(handle.token, report_progress)
+                self._results.put(('done', handle, on_done, result))
+            except TaskCancelled:
+                self._results.put(('cancelled', handle, on_cancel, None))
+            except Exception as e:
+                self._results.put(('error', handle, on_error, e))
+            finally:
+                self._current = None
+
+    def _poll(self):
+        latest_progress = {}
+        try:
+            while True:
+                kind, handle, callback, payload = self._results.get_nowait()
+                if kind == 'call':
+                    callback(*payload)
+                    continue
+                if kind == 'progress':
+                    # Coalesce progress so a chatty job cannot flood the main loop
+                    latest_progress[handle] = (callback, payload)
+                    continue
+                latest_progress.pop(handle, None)
+                handle.done = True
+                if kind == 'done' and callback is not None:
+                    callback(payload)
+                elif kind == 'error' and callback is not None:
+                    callback(payload)
+                elif kind == 'cancelled' and callback is not None:
+                    callback(handle.name)
+        except queue.Empty:
+            pass
+        finally:
+            for handle, (callback, (done, total)) in latest_progress.items():
+                if not handle.done:
+                    callback(handle.name, done, total)
+            self.root.after(self.poll_ms, self._poll)
+
+
+class InlineTaskRunner:
+    """
+    Synchronous stand-in used when no Tk root is available (scripts, tests)
+
+    Offers the same interface as BackgroundTaskRunner but runs every job
+    and callback immediately on the calling thread.
+    """
+
+    busy = False
+
+    def submit(self, work, on_done=None, on_error=None, on_progress=None, on_cancel=None, name='task'):
+        handle = TaskHandle(name)
+
+        def report_progress(done, total):
+            handle.token.raise_if_cancelled()
+            if on_progress is not None:
+                on_progress(name, done, total)
+
+        try:
+            result = work(handle.token, report_progress)
+        except TaskCancelled:
+            if on_cancel is not None:
+                on_cancel(name)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(e)
+        else:
+            if on_done is not None:
+                on_done(result)
+        handle.done = True
+        return handle
+
+    def cancel_current(self):
+        pass
+
+    def on_ui_thread(self):
+        return True
+
+    def call_soon(self, function, *args):
+        function(*args)
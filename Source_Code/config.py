@@ -21,13 +21,14 @@ reg1_value = None
 slot_value = None
 ev_motor_value = None
 motor_remove_value = None
+progress_value = None
 tfield = None
 
 def initialize_tk_widgets(root):
     """Initialize all Tkinter variables after root window is created"""
     global command_value, num_value, ev_value, make_value, model_value, color_value
     global reg_value, level_value, ev_car_value, ev_car2_value, slot1_value, slot2_value
-    global reg1_value, slot_value, ev_motor_value, motor_remove_value, tfield
+    global reg1_value, slot_value, ev_motor_value, motor_remove_value, progress_value, tfield
     
     # Initialize StringVars
     command_value = tk.StringVar()
@@ -42,6 +43,7 @@ def initialize_tk_widgets(root):
     slot2_value = tk.StringVar()
     reg1_value = tk.StringVar()
     slot_value = tk.StringVar()
+    progress_value = tk.StringVar()  # Background task progress text
     
     # Initialize IntVars
     ev_car_value = tk.IntVar()
@@ -73,6 +75,7 @@ def get_tk_variables():
         'slot_value': slot_value,
         'ev_motor_value': ev_motor_value,
         'motor_remove_value': motor_remove_value,
+        'progress_value': progress_value,
         'tfield': tfield
     }
 
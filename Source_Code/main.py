@@ -5,6 +5,8 @@ Main Entry Point for Parking Lot Manager
 import tkinter as tk
 from ParkingLot import ParkingLot
 from config import initialize_tk_widgets, get_tk_variables
+from TaskRunner import BackgroundTaskRunner
+from OutputConsole import ConsoleSink
 
 def main():
     # =========================================================================
@@ -79,6 +81,13 @@ def main():
     # IMPORTANT: Replace the tfield in tk_vars with our new scrollable one
     tk_vars['tfield'] = tfield
     
+    # Run service work on a worker thread so large lots never freeze the window
+    tk_vars['task_runner'] = BackgroundTaskRunner(root)
+    
+    # Buffer console output and flush it once per frame, keeping at most 2000 lines
+    console = ConsoleSink(tfield, root, max_lines=2000)
+    tk_vars['console'] = console
+    
     # Initialize parking lot instance with Tkinter variables
     parkinglot = ParkingLot(tk_vars)
 
@@ -118,6 +127,11 @@ def main():
                               font="Arial 11", bg='lightyellow', fg='black', activebackground="yellow", padx=10, pady=5)
     clearInputsBtn.grid(row=4, column=1, padx=4, pady=4)
 
+    # Resize current level button (keeps parked vehicles)
+    resizeLotBtn = tk.Button(root, command=parkinglot.resizeLot, text="Resize Level", 
+                            font="Arial 11", bg='lightgreen', fg='black', activebackground="green", padx=10, pady=5)
+    resizeLotBtn.grid(row=4, column=2, padx=4, pady=4)
+
     # =========================================================================
     # CAR MANAGEMENT SECTION - PARK VEHICLE
     # =========================================================================
@@ -217,6 +231,10 @@ def main():
                          font="Arial 10", bg='PaleGreen1', fg='black', activebackground="PaleGreen3", padx=5, pady=3)
     statusBtn.grid(column=0, row=16, padx=4, pady=4)
 
+    slotMapBtn = tk.Button(root, command=parkinglot.showSlotMap, text="🗺️ Slot Map", 
+                          font="Arial 10", bg='PaleGreen1', fg='black', activebackground="PaleGreen3", padx=5, pady=3)
+    slotMapBtn.grid(column=1, row=16, padx=4, pady=4)
+
     # =========================================================================
     # OUTPUT CONSOLE LABELS AND BUTTONS
     # =========================================================================
@@ -230,6 +248,14 @@ def main():
                                font="Arial 9", bg='lightgray', fg='black', activebackground="gray", padx=5, pady=2)
     clearConsoleBtn.grid(column=1, row=17, padx=5, pady=(10,0), sticky='w')
 
+    # Progress of the running background operation and a button to cancel it
+    progressLabel = tk.Label(root, textvariable=tk_vars['progress_value'], font='Arial 9', fg='darkblue')
+    progressLabel.grid(column=2, row=17, padx=5, pady=(10,0), sticky='w')
+
+    cancelTaskBtn = tk.Button(root, command=parkinglot.cancelTask, text="🛑 Cancel", 
+                             font="Arial 9", bg='lightgray', fg='black', activebackground="gray", padx=5, pady=2)
+    cancelTaskBtn.grid(column=3, row=17, padx=5, pady=(10,0), sticky='w')
+
     # =========================================================================
     # WINDOW CONFIGURATION AND FINAL SETUP
     # =========================================================================
@@ -240,9 +266,8 @@ def main():
         root.grid_columnconfigure(col, weight=1)  # All columns get some expansion
     
     # Add initial welcome message to the ACTUAL text widget we're using
-    tfield.insert(tk.END, "🚗 Welcome to Parking Lot Manager!\n")
-    tfield.insert(tk.END, "👉 Start by creating a parking lot with the 'Create Lot' button above.\n\n")
-    tfield.see(tk.END)  # Auto-scroll to bottom to show latest messages
+    console.write("🚗 Welcome to Parking Lot Manager!\n")
+    console.write("👉 Start by creating a parking lot with the 'Create Lot' button above.\n\n")
     
     # Ensure window is brought to front and focused
     root.lift()
@@ -0,0 +1,9 @@
+"""
+Test configuration - make the flat Source_Code modules importable
+"""
+
+import os
+import sys
+
+# Add Source_Code to the path the same way ParkingLot.py reaches models/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
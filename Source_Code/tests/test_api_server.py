@@ -0,0 +1,73 @@
+"""
+Tests for the HTTP/JSON API server
+"""
+
+import threading
+
+import pytest
+
+import ApiServer
+from ApiServer import ApiClient, ParkingApiServer, benchmark
+
+
+@pytest.fixture
+def client():
+    server = ParkingApiServer(('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    api = ApiClient('127.0.0.1', server.server_address[1])
+    yield api
+    api.close()
+    server.shutdown()
+    server.server_close()
+
+
+def vehicle(regnum, ev=0):
+    return {'regnum': regnum, 'make': 'Ford', 'model': 'Focus', 'color': 'red', 'ev': ev, 'motor': 0}
+
+
+def test_park_lookup_remove_on_one_connection(client):
+    assert client.request('POST', '/levels', {'level': 1, 'regular_spaces': 2, 'ev_spaces': 1})[0] == 200
+    status, result = client.request('POST', '/levels/1/vehicles', vehicle('AB 123'))
+    assert status == 200 and result['slot_id'] == 1
+    status, result = client.request('GET', '/vehicles/AB%20123')
+    assert status == 200 and result['matches'][0]['slot_id'] == 1
+    assert client.request('GET', '/plates?q=AB1&mode=prefix')[1]['matches'][0]['level'] == 1
+    assert client.request('DELETE', '/levels/1/slots/1')[0] == 200
+    status, result = client.request('DELETE', '/levels/1/slots/1')
+    assert status == 422 and not result['success']
+    assert client.request('GET', '/occupancy?level=1')[1]['totals']['regular_occupied'] == 0
+
+
+def test_batch_endpoints_and_streamed_status(client, monkeypatch):
+    monkeypatch.setattr(ApiServer, 'STREAM_CHUNK_BYTES', 64)  # force several chunks
+    client.request('POST', '/levels', {'level': 1, 'regular_spaces': 50, 'ev_spaces': 5})
+    status, result = client.request('POST', '/levels/1/vehicles/batch', [vehicle(f'C{i}') for i in range(40)])
+    assert status == 200 and all(item['success'] for item in result['results'])
+
+    status, responses = client.request('POST', '/batch', [
+        {'method': 'POST', 'path': '/levels/1/vehicles', 'body': vehicle('E1', ev=1)},
+        {'method': 'GET', 'path': '/levels/1/status'},
+        {'method': 'GET', 'path': '/nowhere'},
+    ])
+    assert [response['status'] for response in responses] == [200, 200, 404]
+    assert len(responses[1]['body']['regular_vehicles']) == 40
+
+    status, result = client.request('GET', '/levels/1/status')
+    assert status == 200
+    assert [v['slot_id'] for v in result['regular_vehicles']] == list(range(1, 41))
+    assert result['ev_vehicles'][0]['regnum'] == 'E1'
+    assert client.request('GET', '/levels/9/status')[0] == 422
+
+
+def test_request_errors(client):
+    assert client.request('GET', '/levels')[0] == 405
+    assert client.request('POST', '/levels', {'level': 'x'})[0] == 400
+    assert client.request('GET', '/plates')[0] == 400
+
+
+def test_benchmark_reports_throughput(client):
+    host, port = client.connection.host, client.connection.port
+    report = benchmark(host, port, requests=60, clients=2)
+    assert report['errors'] == 0 and report['requests'] >= 60
+    assert report['latency_ms']['p50'] <= report['latency_ms']['p99'] <= report['latency_ms']['max']
@@ -0,0 +1,57 @@
+"""
+Tests for size-aware bay allocation
+"""
+
+import random
+
+from BayAllocator import FreeRunTree, SharedBay, iter_vehicles
+from ParkingService import ParkingService
+
+
+def vehicle(regnum, kind='car', ev=0):
+    return {'regnum': regnum, 'make': 'Make', 'model': 'Model', 'color': 'red', 'ev': ev, 'kind': kind}
+
+
+def test_find_run_matches_brute_force():
+    rng = random.Random(7)
+    tree = FreeRunTree(37)
+    free = [True] * 37
+    for _ in range(400):
+        bay = rng.randrange(37)
+        free[bay] = rng.random() < 0.6
+        tree.set(bay, free[bay])
+        length = rng.randint(1, 5)
+        expected = next((i for i in range(37 - length + 1) if all(free[i:i + length])), -1)
+        assert tree.find_run(length) == expected
+    assert tree.free_count() == sum(free)
+
+
+def test_motorcycles_share_a_bay_best_fit():
+    service = ParkingService()
+    service.create_parking_lot(1, 3, 0, motorcycles_per_bay=2)
+    results = [service.park_vehicle(1, vehicle(f'M{i}', 'motorcycle')) for i in range(3)]
+    assert [result['slot_id'] for result in results] == [1, 1, 2]
+    slots = service.levels[1]['regular_slots']
+    assert isinstance(slots[0], SharedBay) and len(slots[0]) == 2
+
+    # Removing one motorcycle leaves its bay-mate in place and reopens one place
+    assert service.remove_vehicle(1, 1, regnum='M0')['success']
+    assert [v['regnum'] for _, v in iter_vehicles(slots)] == ['M1', 'M2']
+    assert service.park_vehicle(1, vehicle('M3', 'motorcycle'))['slot_id'] == 1
+
+
+def test_bus_takes_first_run_of_free_bays():
+    service = ParkingService()
+    service.create_parking_lot(1, 6, 0)
+    for regnum in ('C1', 'C2', 'C3'):
+        service.park_vehicle(1, vehicle(regnum))
+    service.remove_vehicle(1, 2)
+    # Bay 2 alone is too short; the bus needs bays 4-6
+    assert service.park_vehicle(1, vehicle('BUS', 'bus'))['slot_id'] == 4
+    assert not service.park_vehicle(1, vehicle('T1', 'truck'))['success']
+    assert service.park_vehicle(1, vehicle('C4'))['slot_id'] == 2
+
+    assert service.remove_vehicle(1, 5)['success']  # any covered bay removes the whole bus
+    assert list(service.levels[1]['regular_slots'])[3:6] == [None, None, None]
+    assert service.park_vehicle(1, vehicle('T2', 'truck'))['slot_id'] == 4
+    assert [v['regnum'] for _, v in iter_vehicles(service.levels[1]['regular_slots'])] == ['C1', 'C4', 'C3', 'T2']
@@ -0,0 +1,54 @@
+"""
+Tests for the Monte Carlo capacity simulator
+"""
+
+from BayAllocator import MOTORCYCLES_PER_BAY
+from CapacitySimulator import (ArrivalModel, Layout, Policy, Scenario, run_simulation, scenario_grid,
+                               simulate)
+
+BUSY = ArrivalModel('busy', 'poisson', 40.0, 2.0, 0.4, 0.0)
+STRICT = Policy('strict', False, MOTORCYCLES_PER_BAY)
+OVERFLOW = Policy('ev_overflow', True, MOTORCYCLES_PER_BAY)
+
+
+def test_grid_covers_every_combination():
+    layouts = [Layout('a', 1, 10, 2), Layout('b', 2, 10, 2)]
+    grid = scenario_grid(layouts, [BUSY], [STRICT, OVERFLOW])
+    assert len(grid) == 4
+    assert {(s.layout.name, s.policy.name) for s in grid} == {('a', 'strict'), ('a', 'ev_overflow'),
+                                                              ('b', 'strict'), ('b', 'ev_overflow')}
+
+
+def test_runs_are_reproducible_from_the_seed():
+    scenario = Scenario(Layout('small', 1, 30, 5), BUSY, STRICT)
+    first = simulate((scenario, 0, 7, 1))
+    second = simulate((scenario, 0, 7, 1))
+    other = simulate((scenario, 1, 7, 1))
+    strip = lambda run: {k: v for k, v in run.items() if k != 'elapsed'}
+    assert strip(first) == strip(second)
+    assert strip(first) != strip(other)
+    assert first['arrivals'] > 0 and 0 < first['peak_occupancy'] <= 1
+
+
+def test_more_ev_bays_turn_fewer_drivers_away():
+    few = Scenario(Layout('few_ev', 1, 60, 2), BUSY, STRICT)
+    many = Scenario(Layout('many_ev', 1, 50, 12), BUSY, STRICT)
+    result = run_simulation([few, many], replications=2, days=1, workers=1)
+    summary = {row['scenario']: row for row in result['summary']}
+    assert summary['many_ev/busy/strict']['turn_away_rate'] < summary['few_ev/busy/strict']['turn_away_rate']
+
+
+def test_ev_overflow_reduces_turn_aways():
+    layout = Layout('small', 1, 60, 2)
+    result = run_simulation([Scenario(layout, BUSY, STRICT), Scenario(layout, BUSY, OVERFLOW)],
+                            replications=2, days=1, workers=1)
+    strict, overflow = result['summary']
+    assert overflow['turn_away_rate'] < strict['turn_away_rate']
+
+
+def test_process_pool_matches_single_process():
+    scenarios = [Scenario(Layout('small', 1, 20, 4), BUSY, STRICT), Scenario(Layout('small', 1, 20, 4), BUSY, OVERFLOW)]
+    pooled = run_simulation(scenarios, replications=2, days=0.5, seed=3, workers=2)
+    inline = run_simulation(scenarios, replications=2, days=0.5, seed=3, workers=1)
+    assert pooled['workers'] == 2
+    assert pooled['summary'] == inline['summary']
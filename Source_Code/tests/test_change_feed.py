@@ -0,0 +1,104 @@
+"""
+Tests for the ParkingService change feed
+"""
+
+import threading
+
+import pytest
+
+from ChangeFeed import ChangeFeed, ReplayGapError, VEHICLE_PARKED, VEHICLE_REMOVED
+from ParkingService import ParkingService
+
+
+def park(service, level, regnum, ev=0):
+    return service.park_vehicle(level, {'regnum': regnum, 'make': 'Ford', 'model': 'Focus',
+                                        'color': 'red', 'ev': ev, 'motor': 0})
+
+
+def test_events_are_sequenced_and_typed():
+    service = ParkingService()
+    subscription = service.subscribe()
+    service.create_parking_lot(1, 2, 1)
+    park(service, 1, 'AB1')
+    service.remove_vehicle(1, 1)
+    park(service, 1, 'AB1')
+    # A failed park publishes nothing
+    assert not park(service, 9, 'XX1')['success']
+    events = subscription.drain()
+    assert [event.sequence for event in events] == [1, 2, 3, 4]
+    assert [event.kind for event in events] == ['level_created', VEHICLE_PARKED, VEHICLE_REMOVED, VEHICLE_PARKED]
+    assert events[1].details['vehicle']['regnum'] == 'AB1'
+    assert subscription.last_sequence == 4
+
+
+def test_filters_by_kind_and_level():
+    service = ParkingService()
+    service.create_parking_lot(1, 2, 0)
+    service.create_parking_lot(2, 2, 0)
+    seen = []
+    service.subscribe(seen.append, kinds=[VEHICLE_PARKED], levels=[2])
+    park(service, 1, 'AB1')
+    park(service, 2, 'AB2')
+    service.remove_vehicle(2, 1)
+    assert [(event.kind, event.level) for event in seen] == [(VEHICLE_PARKED, 2)]
+
+
+def test_bounded_queue_drops_oldest_and_counts():
+    feed = ChangeFeed()
+    subscription = feed.subscribe(buffer=3)
+    for i in range(5):
+        feed.publish(VEHICLE_PARKED, 1, slot_id=i + 1)
+    assert subscription.dropped == 2
+    assert [event.sequence for event in subscription.drain()] == [3, 4, 5]
+
+
+def test_replay_from_sequence_and_gap_detection():
+    feed = ChangeFeed(history=4)
+    for i in range(6):
+        feed.publish(VEHICLE_PARKED, 1, slot_id=i + 1)
+    assert [event.sequence for event in feed.replay(3)] == [4, 5, 6]
+    with pytest.raises(ReplayGapError):
+        feed.replay(1)
+    assert feed.replay(6) == []
+
+    caught_up = []
+    feed.subscribe(caught_up.append, since=4)
+    feed.publish(VEHICLE_REMOVED, 1, slot_id=1)
+    assert [event.sequence for event in caught_up] == [5, 6, 7]
+
+
+def test_queued_get_wakes_consumer_thread():
+    feed = ChangeFeed()
+    subscription = feed.subscribe()
+    received = []
+    consumer = threading.Thread(target=lambda: received.append(subscription.get(timeout=2)))
+    consumer.start()
+    feed.publish(VEHICLE_PARKED, 1, slot_id=1)
+    consumer.join(3)
+    assert received[0].sequence == 1
+    subscription.close()
+    assert subscription.get(timeout=0.01) is None
+
+
+def test_raising_subscriber_does_not_fail_the_change(caplog):
+    service = ParkingService()
+    service.create_parking_lot(1, 2, 0)
+    versions = []
+
+    def faulty(event):
+        versions.append(service.levels[1]['version'])
+        raise RuntimeError('subscriber bug')
+
+    subscription = service.subscribe(faulty, kinds=[VEHICLE_PARKED])
+    later = service.subscribe()
+    before = service.levels[1]['version']
+    result = park(service, 1, 'AB1')
+    assert result['success'] and result['slot_id'] == 1
+    # Delivered after the change was complete and the version bumped
+    assert versions == [before + 1]
+    assert subscription.errors == 1
+    assert 'subscriber bug' in caplog.text
+    # Other subscribers still get the event, and the plate is parked exactly once
+    assert [event.kind for event in later.drain()] == [VEHICLE_PARKED]
+    assert service.find_vehicle('AB1')['success']
+    assert park(service, 1, 'AB1').get('duplicate') == {'level': 1, 'slot_id': 1, 'is_ev_slot': False}
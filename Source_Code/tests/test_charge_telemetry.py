@@ -0,0 +1,106 @@
+"""
+Tests for coalesced EV charge telemetry and ParkingService.apply_charges
+"""
+
+from ChargeTelemetry import ChargeTelemetry, benchmark
+from ChangeFeed import CHARGE_UPDATED
+from ParkingService import ParkingService
+
+
+def vehicle(regnum, ev=1, motor=0):
+    return {'regnum': regnum, 'make': 'Nissan', 'model': 'Leaf', 'color': 'white', 'ev': ev, 'motor': motor}
+
+
+def charges(service, level=1):
+    return {item['regnum']: item['charge'] for item in service.get_charge_status(level)['charge_status']}
+
+
+def build_service():
+    service = ParkingService()
+    service.create_parking_lot(1, 5, 4)
+    service.park_vehicle(1, vehicle('EV1'))
+    service.park_vehicle(1, vehicle('EV2'))
+    service.park_vehicle(1, vehicle('CAR1', ev=0))
+    return service
+
+
+def test_apply_charges_by_plate_and_bay():
+    service = build_service()
+    version = service.levels[1]['version']
+    result = service.apply_charges([(None, None, 'ev-1', 40), (1, 2, None, 55), (None, None, 'CAR1', 10),
+                                    (None, None, 'NOPE', 10), (1, 4, None, 10), (1, 1, None, 101)])
+    assert result['success']
+    assert (result['applied'], result['skipped']) == (2, 4)
+    assert charges(service) == {'EV1': 40, 'EV2': 55}
+    # One version bump for the whole batch
+    assert service.levels[1]['version'] == version + 1
+
+
+def test_unchanged_readings_do_not_bump_the_level():
+    service = build_service()
+    service.apply_charges([(1, 1, None, 30)])
+    version = service.levels[1]['version']
+    result = service.apply_charges([(1, 1, None, 30), (None, None, 'EV1', 30)])
+    assert (result['applied'], result['unchanged']) == (0, 2)
+    assert service.levels[1]['version'] == version
+
+
+def test_readings_coalesce_to_the_latest_per_vehicle():
+    service = build_service()
+    events = service.subscribe(kinds=[CHARGE_UPDATED])
+    telemetry = ChargeTelemetry(service)
+    for charge in range(10, 60):
+        telemetry.report_plate('EV1', charge)
+    telemetry.report_bay(1, 2, 20)
+    telemetry.report_plate('EV2', 70)   # later than the bay reading, so it wins
+    assert not telemetry.report_plate('EV1', 150)
+    assert len(telemetry) == 3
+
+    result = telemetry.flush()
+    assert result['applied'] == 3
+    assert charges(service) == {'EV1': 59, 'EV2': 70}
+    assert len(events.drain()) == 3
+    stats = telemetry.stats()
+    assert (stats['received'], stats['rejected'], stats['coalesced'], stats['pending']) == (53, 1, 49, 0)
+
+
+def test_report_many_and_batching():
+    service = ParkingService()
+    service.create_parking_lot(1, 0, 50)
+    for i in range(50):
+        service.park_vehicle(1, vehicle(f'E{i}'))
+    telemetry = ChargeTelemetry(service, batch_size=7)
+    readings = [(f'E{i}', i + 1) for i in range(50)] + [(1, i + 1, 99) for i in range(0, 50, 2)]
+    assert telemetry.report_many(readings) == 75
+    assert telemetry.flush()['applied'] == 75
+    stored = charges(service)
+    assert all(stored[f'E{i}'] == (99 if i % 2 == 0 else i + 1) for i in range(50))
+
+
+def test_shared_motorcycle_bay_needs_a_plate():
+    service = ParkingService()
+    service.create_parking_lot(1, 0, 1, motorcycles_per_bay=2)
+    service.park_vehicle(1, vehicle('M1', motor=1))
+    service.park_vehicle(1, vehicle('M2', motor=1))
+    telemetry = ChargeTelemetry(service)
+    telemetry.report_bay(1, 1, 30)
+    telemetry.report_plate('M2', 45)
+    telemetry.report_bay(1, 1, 60, regnum='M1')
+    result = telemetry.flush()
+    assert (result['applied'], result['skipped']) == (2, 1)
+    assert charges(service) == {'M1': 60, 'M2': 45}
+
+
+def test_background_flusher_applies_on_stop():
+    service = build_service()
+    with ChargeTelemetry(service, flush_interval=0.01) as telemetry:
+        telemetry.report_plate('EV2', 88)
+    assert charges(service)['EV2'] == 88
+    assert telemetry.stats()['pending'] == 0
+
+
+def test_benchmark_keeps_park_and_remove_running():
+    report = benchmark(rate=20000, seconds=0.2, vehicles=200, flush_interval=0.05)
+    assert report['updates'] == 4000
+    assert report['applied'] > 0
+    assert report['park_remove_ms']['p50'] < 50
@@ -0,0 +1,54 @@
+"""
+Tests for the columnar export
+"""
+
+import pytest
+
+from ColumnarExport import NO_CHARGE, TYPE_CODES, load_npz, save_npz
+from ParkingService import ParkingService
+
+
+def build_service():
+    service = ParkingService()
+    service.create_parking_lot(1, 3, 2)
+    service.create_parking_lot(2, 2, 0)
+    for level, regnum, make, color, ev, motor in ((1, 'A1', 'Ford', 'red', 0, 0), (1, 'E1', 'Tesla', 'red', 1, 0),
+                                                  (2, 'B1', 'Honda', 'blue', 0, 1), (1, 'A2', 'Ford', 'blue', 0, 0)):
+        service.park_vehicle(level, {'regnum': regnum, 'make': make, 'model': 'M', 'color': color,
+                                     'ev': ev, 'motor': motor})
+    service.update_charge(1, 1, 64)
+    return service
+
+
+def test_columns_are_typed_and_dictionary_encoded():
+    exported = build_service().export_columns(as_numpy=False)
+    columns, dictionaries = exported['columns'], exported['dictionaries']
+    assert list(columns['level']) == [1, 1, 1, 2]
+    assert list(columns['slot_id']) == [1, 2, 1, 1]
+    assert list(columns['is_ev_slot']) == [0, 0, 1, 0]
+    assert list(columns['type_code']) == [TYPE_CODES['car'], TYPE_CODES['car'],
+                                          TYPE_CODES['electric_car'], TYPE_CODES['motorcycle']]
+    assert list(columns['charge']) == [NO_CHARGE, NO_CHARGE, 64, NO_CHARGE]
+    assert [dictionaries['make'][code] for code in columns['make']] == ['Ford', 'Ford', 'Tesla', 'Honda']
+    assert dictionaries['color'] == ['red', 'blue']
+    assert exported == build_service().export_columns(levels=[1, 2], as_numpy=False)
+
+
+def test_numpy_arrays_and_npz_round_trip(tmp_path):
+    numpy = pytest.importorskip('numpy')
+    exported = build_service().export_columns()
+    assert exported['columns']['slot_id'].dtype == numpy.int32
+    assert exported['columns']['charge'].tolist() == [-1, -1, 64, -1]
+    path = str(tmp_path / 'lot.npz')
+    save_npz(path, exported)
+    loaded = load_npz(path)
+    for name, column in exported['columns'].items():
+        assert numpy.array_equal(loaded['columns'][name], column)
+    assert loaded['dictionaries']['make'].tolist() == ['Ford', 'Tesla', 'Honda']
+
+
+def test_fractional_charge_is_exported():
+    service = build_service()
+    service.update_charge(1, 1, 55.5)
+    exported = service.export_columns(as_numpy=False)
+    assert list(exported['columns']['charge']) == [NO_CHARGE, NO_CHARGE, 55.5, NO_CHARGE]
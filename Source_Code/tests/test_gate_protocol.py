@@ -0,0 +1,61 @@
+"""
+Tests for the binary gate protocol
+"""
+
+import threading
+
+import pytest
+
+from GateProtocol import (BAD_REQUEST, DUPLICATE, FAILED, OK, GateClient, GateServer, benchmark, decode_response,
+                          encode_lookup, encode_occupancy, encode_park, encode_remove, handle_frame)
+from ParkingService import ParkingService
+
+
+@pytest.fixture
+def server():
+    gate = GateServer(('127.0.0.1', 0))
+    gate.service.create_parking_lot(1, 3, 1)
+    threading.Thread(target=gate.serve_forever, daemon=True).start()
+    yield gate
+    gate.shutdown()
+    gate.server_close()
+
+
+def test_frames_round_trip_through_the_service():
+    service = ParkingService()
+    service.create_parking_lot(1, 2, 1)
+
+    def call(frame):
+        return decode_response(handle_frame(service, frame[4:])[4:])
+
+    assert call(encode_park(7, 1, 'AB123', 'Ford', 'Focus', 'red', ev=True)) == (1, 7, OK, (1, 1, True, ''))
+    opcode, request_id, status, result = call(encode_park(8, 1, 'ab-123', 'Ford', 'Focus', 'red'))
+    assert status == DUPLICATE and result[:3] == (1, 1, True) and 'already parked' in result[3]
+    assert call(encode_lookup(9, 'AB123'))[2:] == (OK, [(1, 1, True)])
+    assert call(encode_occupancy(10, 1))[2:] == (OK, (2, 0, 1, 1))
+    assert call(encode_remove(11, 1, 1, ev=True))[2:] == (OK, '')
+    assert call(encode_remove(12, 1, 1, ev=True))[2] == FAILED
+    assert call(encode_lookup(13, 'AB123'))[2:] == (FAILED, [])
+    # Truncated payload and unknown opcode
+    assert call(encode_park(14, 1, 'X', 'Y', 'Z', 'W')[:-3])[2] == BAD_REQUEST
+    assert call(b'\0\0\0\0\x09\0\0\0\x0f')[1:3] == (15, BAD_REQUEST)
+
+
+def test_pipelined_requests_are_answered_in_order(server):
+    client = GateClient(*server.server_address[:2])
+    try:
+        plates = [f'P{i}' for i in range(4)]
+        client.send(*(encode_park(i, 1, plate, 'Make', 'Model', 'blue', kind='motorcycle')
+                      for i, plate in enumerate(plates)))
+        replies = [client.receive() for _ in plates]
+        assert [reply[1] for reply in replies] == [0, 1, 2, 3]
+        # Three motorcycles share the first bay, the fourth opens the second
+        assert [reply[3][1] for reply in replies] == [1, 1, 1, 2]
+        assert client.call(encode_occupancy)[3] == (3, 2, 1, 0)
+    finally:
+        client.close()
+
+
+def test_benchmark_runs_cleanly(server):
+    report = benchmark(server, requests=60, pipeline=4, level=2)
+    assert report['errors'] == 0 and report['requests'] >= 60
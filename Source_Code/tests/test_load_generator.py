@@ -0,0 +1,39 @@
+"""
+Tests for the synthetic gate traffic generator
+"""
+
+from LoadGenerator import ArrivalProfile, generate_trace, load_trace, replay, save_trace
+from ParkingService import ParkingService
+
+
+def test_same_seed_gives_same_trace():
+    first = generate_trace(levels=2, regular_spaces=20, ev_spaces=5, hours=6, seed=7)
+    second = generate_trace(levels=2, regular_spaces=20, ev_spaces=5, hours=6, seed=7)
+    assert first == second
+    assert first != generate_trace(levels=2, regular_spaces=20, ev_spaces=5, hours=6, seed=8)
+    assert [event.op for event in first[:2]] == ['create', 'create']
+    assert [event.time for event in first] == sorted(event.time for event in first)
+
+
+def test_rush_hour_profile_peaks():
+    profile = ArrivalProfile.rush_hour(10, peak_rate=50)
+    assert profile.rate_at(8) > 45
+    assert profile.rate_at(3) < 11
+    assert profile.max_rate() >= profile.rate_at(17.5)
+
+
+def test_recorded_trace_replays_identically(tmp_path):
+    events = generate_trace(levels=1, regular_spaces=10, ev_spaces=2, hours=12,
+                            profile=ArrivalProfile.poisson(20), seed=3)
+    path = tmp_path / 'trace.jsonl'
+    save_trace(events, str(path))
+    assert load_trace(str(path)) == events
+
+    first, second = ParkingService(), ParkingService()
+    report = replay(events, first)
+    replay(load_trace(str(path)), second)
+    assert first.get_status(1) == second.get_status(1)
+    assert report['turned_away'] > 0
+    assert report['skipped'] <= report['turned_away']
+    assert report['ops'] == len(events) - report['skipped']
+    assert set(report['latency_ms']['park']) == {'count', 'p50', 'p90', 'p99', 'max'}
@@ -0,0 +1,98 @@
+"""
+Tests for streaming lot import/export and the batched park path
+"""
+
+import json
+
+from LotTransfer import export_lot, import_lot
+from ParkingService import ParkingService
+
+
+def vehicle(regnum, ev=0, **extra):
+    data = {'regnum': regnum, 'make': 'Ford', 'model': 'Focus', 'color': 'red', 'ev': ev, 'motor': 0}
+    data.update(extra)
+    return data
+
+
+def test_park_vehicles_batches_and_reports_per_item():
+    service = ParkingService()
+    service.create_parking_lot(1, 3, 1)
+    results = service.park_vehicles(1, [vehicle('A1'), vehicle('A2', slot_id=3), vehicle('A3', slot_id=3),
+                                        vehicle('E1', ev=1, charge=70), vehicle('E2', ev=1), {'regnum': 'X'},
+                                        vehicle('A4'), vehicle('A5')])
+    assert [result.get('slot_id') for result in results] == [1, 3, None, 1, None, None, 2, None]
+    assert 'not available' in results[2]['message']
+    assert service.get_charge_status(1)['charge_status'][0]['charge'] == 70
+    assert service.find_vehicle('A2')['matches'][0]['slot_id'] == 3
+    assert not service.park_vehicles(9, [vehicle('Z1')])[0]['success']
+
+
+def test_round_trip_csv_and_jsonl(tmp_path):
+    source = ParkingService()
+    source.create_parking_lot(1, 4, 2)
+    source.create_parking_lot(2, 2, 0)
+    source.park_vehicles(1, [vehicle('A1'), vehicle('A2', slot_id=4), vehicle('E1', ev=1, charge=35)])
+    source.park_vehicle(2, vehicle('B1', motor=1))
+
+    for name in ('lot.csv', 'lot.jsonl'):
+        path = str(tmp_path / name)
+        assert export_lot(source, path) == 6
+        target = ParkingService()
+        report = import_lot(target, path)
+        assert (report['levels'], report['parked'], report['failed']) == (2, 4, 0)
+        for level in (1, 2):
+            for key in ('regular_vehicles', 'ev_vehicles'):
+                assert target.get_status(level)[key] == source.get_status(level)[key]
+        assert target.get_charge_status(1)['charge_status'][0]['charge'] == 35
+
+
+def test_bad_rows_are_reported_without_aborting(tmp_path):
+    path = tmp_path / 'lot.jsonl'
+    rows = [
+        {'record': 'level', 'level': 1, 'regular_spaces': 2, 'ev_spaces': 0},
+        {'record': 'vehicle', 'level': 1, 'regnum': 'A1', 'make': 'Ford', 'model': 'Focus', 'color': 'red'},
+        {'record': 'vehicle', 'level': 1, 'regnum': 'A2', 'make': 'Ford'},
+        {'record': 'vehicle', 'level': 'one', 'regnum': 'A3', 'make': 'Ford', 'model': 'Ka', 'color': 'red'},
+        {'record': 'vehicle', 'level': 5, 'regnum': 'A4', 'make': 'Ford', 'model': 'Ka', 'color': 'red'},
+        {'record': 'garage', 'level': 1},
+    ]
+    lines = [json.dumps(row) for row in rows]
+    lines.insert(3, '{not json')
+    lines.append(json.dumps({'record': 'vehicle', 'level': 1, 'regnum': 'A5', 'make': 'Ford',
+                             'model': 'Ka', 'color': 'blue'}))
+    path.write_text('\n'.join(lines) + '\n')
+
+    report = import_lot(ParkingService(), str(path), batch_size=1)
+    assert report['rows'] == 8
+    assert report['parked'] == 2
+    assert [line for line, _ in report['errors']] == [3, 4, 5, 6, 7]
+    assert 'missing model, color' in report['errors'][0][1]
+    assert 'does not exist' in report['errors'][3][1]
+
+
+def test_out_of_range_charge_is_rejected_per_item():
+    service = ParkingService()
+    service.create_parking_lot(1, 0, 2)
+    results = service.park_vehicles(1, [vehicle('E1', ev=1, charge=500), vehicle('E2', ev=1, charge=-1),
+                                        vehicle('E3', ev=1, charge=40)])
+    assert [result['success'] for result in results] == [False, False, True]
+    assert results[0]['message'] == 'Invalid charge level: 500'
+    assert results[2]['slot_id'] == 1
+    assert not service.find_vehicle('E1')['success']
+
+
+def test_rejected_level_row_fails_its_vehicle_rows(tmp_path):
+    path = tmp_path / 'lot.jsonl'
+    rows = [
+        {'record': 'level', 'level': 1, 'regular_spaces': 2, 'ev_spaces': 0},
+        {'record': 'level', 'level': 2, 'regular_spaces': 1000000, 'ev_spaces': 0},
+        {'record': 'vehicle', 'level': 2, 'regnum': 'B1', 'make': 'Ford', 'model': 'Ka', 'color': 'red'},
+        {'record': 'vehicle', 'level': 1, 'regnum': 'A1', 'make': 'Ford', 'model': 'Ka', 'color': 'red'},
+    ]
+    path.write_text('\n'.join(json.dumps(row) for row in rows) + '\n')
+    service = ParkingService()
+    service.set_memory_budget(service.memory_usage()['total'] + 200000)
+
+    report = import_lot(service, str(path))
+    assert (report['levels'], report['parked'], report['failed']) == (1, 1, 2)
+    assert report['errors'] == [(2, 'Could not create level 2'), (3, 'Level 2 was not created')]
@@ -0,0 +1,140 @@
+"""
+Tests for per-level memory accounting and the memory budget
+"""
+
+import sys
+import tracemalloc
+
+from MemoryAccounting import sampled_size, slot_storage_size, vehicle_records_size
+from ParkingService import ParkingService
+from SlotStore import SlotArray
+
+
+def vehicle(regnum, ev=0, motor=0):
+    return {'regnum': regnum, 'make': 'Ford', 'model': 'Focus', 'color': 'red', 'ev': ev, 'motor': motor}
+
+
+def filled_service(count=300, **kwargs):
+    service = ParkingService(**kwargs)
+    service.create_parking_lot(1, 400, 50)
+    service.create_parking_lot(2, 400, 50)
+    for i in range(count):
+        service.park_vehicle(1, vehicle(f'AB{i:05d}', motor=i % 4 == 0))
+    return service
+
+
+def test_small_containers_are_measured_exactly():
+    items = [1000, 2000.5, {'key': (3000,)}]
+    expected = (sys.getsizeof(items) + sys.getsizeof(1000) + sys.getsizeof(2000.5) + sys.getsizeof(items[2]) +
+                sys.getsizeof('key') + sys.getsizeof(items[2]['key']) + sys.getsizeof(3000))
+    assert sampled_size(items) == expected
+    # Strings held in sequences belong to someone else
+    assert sampled_size(['plate']) == sys.getsizeof(['plate'])
+
+
+def test_sampled_sizes_scale_with_content():
+    small = {i: str(i) * 10 for i in range(100)}
+    large = {i: str(i) * 10 for i in range(10000)}
+    assert 50 < sampled_size(large) / sampled_size(small) < 200
+
+
+def test_slot_and_vehicle_sizes():
+    slots = SlotArray(1000)
+    empty = slot_storage_size(slots)
+    assert vehicle_records_size(slots) == (0, None)
+    for i in range(1000):
+        slots[i] = vehicle(f'AB{i:05d}')
+    size, per_record = vehicle_records_size(slots)
+    assert abs(size - per_record * 1000) < 1
+    assert slot_storage_size(slots) == empty
+
+
+def test_usage_is_reported_per_level_and_structure():
+    service = filled_service()
+    service.get_status(1)
+    usage = service.memory_usage()
+    assert usage['success']
+    first, second = usage['levels'][1], usage['levels'][2]
+    assert first['vehicles'] > 0 and second['vehicles'] == 0
+    assert first['caches'] > 0 and second['caches'] == 0
+    assert first['slots'] > 0 and first['indexes'] > 0
+    assert first['total'] == sum(first[key] for key in ('slots', 'vehicles', 'indexes', 'caches'))
+    assert usage['site']['plate_index'] > 0
+    assert usage['total'] == first['total'] + second['total'] + sum(usage['site'].values())
+    assert list(service.memory_usage(levels=[2])['levels']) == [2]
+
+
+def test_estimate_tracks_tracemalloc():
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        service = filled_service(count=800, cache_entries=0)
+        traced = tracemalloc.get_traced_memory()[0] - before
+        usage = service.memory_usage()
+        assert usage['traced'] is not None
+    finally:
+        tracemalloc.stop()
+    assert 0.5 < usage['total'] / traced < 2
+
+
+def test_budget_refuses_levels_that_would_not_fit():
+    service = filled_service()
+    used = service.enforce_memory_budget()['used']
+    service.memory_budget = used + 100 * service._bytes_per_slot()
+    assert service.create_parking_lot(3, 80, 0)
+    assert not service.create_parking_lot(4, 500, 0)
+    assert 4 not in service.levels
+    result = service.resize_parking_lot(3, regular_spaces=1000)
+    assert not result['success'] and 'memory budget' in result['message']
+    assert service.levels[3]['regular_spaces'] == 80
+
+
+def test_caches_are_shed_before_refusing():
+    service = filled_service()
+    for level in (1, 2):
+        service.get_status(level)
+        service.get_charge_status(level)
+    cached = service.cache_stats()['bytes']
+    assert cached > 0
+    without_cache = service.enforce_memory_budget()['used'] - cached
+    # Fits only once the cache is gone
+    service.memory_budget = without_cache + cached // 2 + 10 * service._bytes_per_slot()
+    assert service.create_parking_lot(3, 10, 0)
+    assert service.cache_stats()['entries'] == 0
+
+
+def test_set_memory_budget_sheds_and_caps_the_cache():
+    service = filled_service()
+    service.get_status(1)
+    used = service.enforce_memory_budget()['used']
+    result = service.set_memory_budget(used - 1)
+    assert result['shed'] > 0
+    assert service.cache.max_bytes <= max(service.memory_budget - result['used'], 0)
+    lifted = service.set_memory_budget(None)
+    assert lifted['success'] and lifted['shed'] == 0
+    assert service.cache.max_bytes == 32 * 1024 * 1024
+
+
+def test_budget_derives_the_cache_cap():
+    service = ParkingService(cache_bytes=10 ** 9, memory_budget=2 * 10 ** 6)
+    assert service.cache.max_bytes < 2 * 10 ** 6
+    service.create_parking_lot(1, 400, 0)
+    assert service.cache.max_bytes <= 2 * 10 ** 6 - 400 * service._bytes_per_slot()
+    service.set_memory_budget(None)
+    assert service.cache.max_bytes == 10 ** 9
+
+
+def test_admission_does_not_walk_the_lot(monkeypatch):
+    service = filled_service()
+    service.set_memory_budget(10 ** 9)
+
+    def walk(*args, **kwargs):
+        raise AssertionError('full measurement on the write path')
+
+    monkeypatch.setattr(service, '_measure', walk)
+    monkeypatch.setattr('ParkingService.vehicle_records_size', walk)
+    assert service.create_parking_lot(3, 100, 0)
+    assert service.resize_parking_lot(3, regular_spaces=200)['success']
+    estimate = service.enforce_memory_budget()['used']
+    monkeypatch.undo()
+    assert 0.75 < estimate / service.memory_usage()['total'] < 1.25
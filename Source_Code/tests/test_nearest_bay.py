@@ -0,0 +1,53 @@
+"""
+Tests for distance-weighted nearest-bay allocation
+"""
+
+from BayAllocator import BayAllocator
+from ParkingService import ParkingService
+
+
+def vehicle(regnum, kind='car'):
+    return {'regnum': regnum, 'make': 'Make', 'model': 'Model', 'color': 'red', 'ev': 0, 'kind': kind}
+
+
+def test_nearest_free_bay_is_used_and_reused():
+    service = ParkingService()
+    # The lift is beside slot 4
+    assert service.create_parking_lot(1, 5, 0, regular_distances=[30, 20, 10, 0, 10])
+    slot_ids = [service.park_vehicle(1, vehicle(f'C{i}'))['slot_id'] for i in range(3)]
+    assert slot_ids == [4, 3, 5]
+    service.remove_vehicle(1, 4)
+    assert service.park_vehicle(1, vehicle('C3'))['slot_id'] == 4
+
+
+def test_distances_update_without_rebuild():
+    service = ParkingService()
+    service.create_parking_lot(1, 4, 0)
+    assert service.park_vehicle(1, vehicle('C0'))['slot_id'] == 1
+    # First update switches the level to nearest-first; others keep their slot number as weight
+    assert service.update_bay_distances(1, {4: -1})['success']
+    assert service.park_vehicle(1, vehicle('C1'))['slot_id'] == 4
+    assert service.update_bay_distances(1, {2: 50, 3: 5})['success']
+    assert service.park_vehicle(1, vehicle('C2'))['slot_id'] == 3
+    assert not service.update_bay_distances(1, {9: 0})['success']
+    assert not service.create_parking_lot(2, 3, 0, regular_distances=[1, 2])
+
+
+def test_runs_start_at_nearest_fitting_bay_and_resize_keeps_order():
+    allocator = BayAllocator(6, distances=[5, 4, 3, 2, 1, 0])
+    assert allocator.allocate(1) == 5
+    assert allocator.allocate(3) == 2      # bay 4 and 3 cannot start a run of three
+    assert allocator.allocate(2) == 0
+    assert allocator.allocate(1) == -1
+    allocator.release(3, 1)
+    allocator.resize(8)                   # new bays rank behind the existing ones
+    assert [allocator.allocate(1) for _ in range(3)] == [3, 6, 7]
+
+
+def test_shrink_relocates_to_lowest_free_bay():
+    service = ParkingService()
+    service.create_parking_lot(1, 4, 0, regular_distances=[3, 2, 1, 0])
+    service.park_vehicle(1, vehicle('C0'))
+    result = service.resize_parking_lot(1, regular_spaces=2, relocate=True)
+    assert result['success'] and result['moved'][0]['to_slot'] == 1
+    assert service.park_vehicle(1, vehicle('C1'))['slot_id'] == 2
@@ -0,0 +1,94 @@
+"""
+Tests for the batched, bounded output console
+"""
+
+from OutputConsole import ConsoleSink
+
+
+class FakeRoot:
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def frame(self):
+        callbacks, self.pending = self.pending, []
+        for callback in callbacks:
+            callback()
+
+
+class RecordingText:
+    """Mimics the tk.Text calls ConsoleSink makes, counting inserts"""
+
+    def __init__(self):
+        self.lines = []
+        self.inserts = 0
+
+    def insert(self, index, text):
+        self.inserts += 1
+        self.lines.extend(text.splitlines())
+
+    def delete(self, start, end):
+        if end == 'end':
+            self.lines = []
+        else:
+            del self.lines[:int(end.split('.')[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+def test_writes_are_coalesced_into_one_insert_per_frame():
+    root = FakeRoot()
+    text = RecordingText()
+    console = ConsoleSink(text, root)
+    for i in range(50):
+        console.write(f'message {i}\n')
+    assert text.inserts == 0
+    root.frame()
+    assert text.inserts == 1
+    assert text.lines[-1] == 'message 49'
+    root.frame()
+    assert text.inserts == 1
+
+
+def test_scrollback_is_trimmed_to_max_lines():
+    text = RecordingText()
+    console = ConsoleSink(text, max_lines=10)
+    for i in range(25):
+        console.write(f'line {i}\n')
+    assert len(text.lines) == 10
+    assert text.lines[0] == 'line 15'
+    assert console.line_count == 10
+
+
+def test_burst_larger_than_buffer_keeps_newest_and_notes_drop():
+    root = FakeRoot()
+    text = RecordingText()
+    console = ConsoleSink(text, root, max_lines=5)
+    for i in range(8):
+        console.write(f'line {i}\n')
+    root.frame()
+    assert text.lines[-1] == 'line 7'
+    assert len(text.lines) == 5
+    assert 'line 2' not in text.lines
+
+
+def test_replace_clears_old_content():
+    root = FakeRoot()
+    text = RecordingText()
+    console = ConsoleSink(text, root)
+    console.write('old\n')
+    root.frame()
+    console.replace('report\n')
+    root.frame()
+    assert text.lines == ['report']
+
+
+def test_long_report_keeps_its_head_and_marks_the_rest():
+    text = RecordingText()
+    console = ConsoleSink(text, max_lines=5)
+    console.replace(''.join(f'line {i}\n' for i in range(12)))
+    assert text.lines == ['line 0', 'line 1', 'line 2', 'line 3', '… 8 more lines']
+    assert console.line_count == 5
@@ -0,0 +1,85 @@
+"""
+Tests for partial and fuzzy plate search on ParkingService
+"""
+
+import pytest
+
+from ParkingService import ParkingService
+from PlateIndex import PlateIndex
+
+
+def park(service, level, regnum, ev=0):
+    return service.park_vehicle(level, {'regnum': regnum, 'make': 'Toyota', 'model': 'Corolla',
+                                        'color': 'red', 'ev': ev, 'motor': 0})
+
+
+@pytest.fixture
+def service():
+    service = ParkingService()
+    service.create_parking_lot(1, 5, 5)
+    service.create_parking_lot(2, 5, 5)
+    for regnum in ('AB123', 'AB124', 'XY999'):
+        park(service, 1, regnum)
+    park(service, 2, 'EV-777', ev=1)
+    return service
+
+
+def regnums(result):
+    assert result['success'], result['message']
+    return sorted(match['regnum'] for match in result['matches'])
+
+
+def test_exact_lookup_ignores_case_and_dashes(service):
+    result = service.find_vehicle('ev777')
+    assert result['success']
+    assert result['matches'] == [{'regnum': 'EV-777', 'level': 2, 'slot_id': 1, 'is_ev_slot': True}]
+
+
+def test_prefix_suffix_and_substring(service):
+    assert regnums(service.search_plates('AB', 'prefix')) == ['AB123', 'AB124']
+    assert regnums(service.search_plates('4', 'suffix')) == ['AB124']
+    assert regnums(service.search_plates('B12', 'substring')) == ['AB123', 'AB124']
+    assert regnums(service.search_plates('99', 'substring')) == ['XY999']
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('AB12', ['AB123', 'AB124']),       # one character missing
+    ('AB1234', ['AB123', 'AB124']),     # one extra character
+    ('A8123', ['AB123']),               # one misread character
+    ('XY99', ['XY999']),
+    ('AB', []),
+    ('Z', []),
+])
+def test_fuzzy_matches_within_one_edit(service, text, expected):
+    assert regnums(service.search_plates(text, 'fuzzy')) == expected
+
+
+def test_short_queries_do_not_crash():
+    index = PlateIndex()
+    for slot_id, regnum in enumerate(('AB', 'ABC', 'AX', 'Z'), 1):
+        index.add(regnum, 1, slot_id, False)
+    assert sorted(m.regnum for m in index.fuzzy('AB')) == ['AB', 'ABC', 'AX']
+    assert sorted(m.regnum for m in index.fuzzy('ABD')) == ['AB', 'ABC']
+    assert [m.regnum for m in index.suffix('Z')] == ['Z']
+
+
+def test_limit_returns_smallest_plates(service):
+    assert regnums(service.search_plates('', 'prefix')) == []
+    assert regnums(service.search_plates('A', 'substring', limit=1)) == ['AB123']
+
+
+def test_remove_updates_index(service):
+    service.remove_vehicle(1, 1)
+    assert not service.find_vehicle('AB123')['success']
+    assert regnums(service.search_plates('AB', 'prefix')) == ['AB124']
+
+
+def test_recreating_level_drops_its_plates(service):
+    service.create_parking_lot(1, 5, 5)
+    assert not service.find_vehicle('AB123')['success']
+    park(service, 1, 'AB123')
+    assert len(service.find_vehicle('AB123')['matches']) == 1
+    service.remove_vehicle(1, 1)
+    assert not service.find_vehicle('AB123')['success']
+    # Other levels are untouched
+    assert service.find_vehicle('EV777')['success']
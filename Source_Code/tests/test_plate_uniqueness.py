@@ -0,0 +1,48 @@
+"""
+Tests for site-wide plate uniqueness and the duplicate audit
+"""
+
+from ParkingService import ParkingService
+
+
+def vehicle(regnum, ev=0):
+    return {'regnum': regnum, 'make': 'Ford', 'model': 'Focus', 'color': 'red', 'ev': ev, 'motor': 0}
+
+
+def test_duplicate_plate_is_refused_on_any_level():
+    service = ParkingService()
+    service.create_parking_lot(1, 2, 1)
+    service.create_parking_lot(2, 2, 0)
+    assert service.park_vehicle(1, vehicle('AB-123', ev=1))['success']
+
+    result = service.park_vehicle(2, vehicle('ab 123'))
+    assert not result['success']
+    assert result['duplicate'] == {'level': 1, 'slot_id': 1, 'is_ev_slot': True}
+    assert result['message'] == 'Vehicle ab 123 is already parked at level 1 EV slot 1'
+
+    batch = service.park_vehicles(2, [vehicle('CD1'), vehicle('CD1')])
+    assert batch[0]['success'] and batch[1]['duplicate']['level'] == 2
+
+    # Renaming onto a parked plate is refused too; once it leaves, the plate is free again
+    assert 'duplicate' in service.edit_vehicle(2, 1, regnum='AB123')
+    service.remove_vehicle(1, 1, is_ev_slot=True)
+    assert service.park_vehicle(2, vehicle('AB123'))['success']
+
+
+def test_audit_reports_historical_duplicates():
+    service = ParkingService()
+    service.create_parking_lot(1, 3, 0)
+    service.create_parking_lot(2, 2, 0)
+    service.park_vehicle(1, vehicle('X1'))
+    service.park_vehicle(1, vehicle('Y1'))
+    assert service.audit_plates()['duplicates'] == []
+
+    # Simulate data written before uniqueness was enforced
+    slots = service.levels[2]['regular_slots']
+    slots[0] = dict(service.levels[1]['regular_slots'][0], regnum='x-1')
+
+    audit = service.audit_plates()
+    assert audit['vehicles'] == 3
+    assert audit['duplicates'] == [{'regnum': 'X1', 'locations': [
+        {'level': 1, 'slot_id': 1, 'is_ev_slot': False}, {'level': 2, 'slot_id': 1, 'is_ev_slot': False}]}]
+    assert service.audit_plates(levels=2)['duplicates'] == []
@@ -0,0 +1,118 @@
+"""
+Tests for time-window reservations
+"""
+
+import random
+
+from ParkingService import ParkingService
+from Reservations import LoadTree
+
+HOUR = 3600
+
+
+def vehicle(regnum, ev=0, **extra):
+    return dict({'regnum': regnum, 'make': 'Make', 'model': 'Model', 'color': 'red', 'ev': ev, 'motor': 0}, **extra)
+
+
+def build_service(regular=3, ev=2):
+    service = ParkingService()
+    service.clock = lambda: 10 * HOUR
+    service.create_parking_lot(1, regular, ev)
+    return service
+
+
+def test_load_tree_peak_matches_brute_force():
+    rng = random.Random(3)
+    tree, load, booked = LoadTree(span=64), [0] * 64, []
+    for _ in range(300):
+        if booked and rng.random() < 0.3:
+            start, end = booked.pop(rng.randrange(len(booked)))
+            delta = -1
+        else:
+            start = rng.randrange(63)
+            end = rng.randrange(start + 1, 65)
+            booked.append((start, end))
+            delta = 1
+        tree.add(start, end, delta)
+        for second in range(start, end):
+            load[second] += delta
+        low = rng.randrange(63)
+        high = rng.randrange(low + 1, 65)
+        assert tree.peak(low, high) == max(load[low:high])
+
+
+def test_free_bay_count_per_window():
+    service = build_service()
+    assert service.reserve(1, 14 * HOUR, 18 * HOUR, is_ev_slot=True)['success']
+    assert service.reserve(1, 16 * HOUR, 20 * HOUR, is_ev_slot=True, slot_id=2)['success']
+    assert service.count_free_bays(1, 14 * HOUR, 18 * HOUR, is_ev_slot=True)['free'] == 0
+    assert service.count_free_bays(1, 12 * HOUR, 15 * HOUR, is_ev_slot=True)['free'] == 1
+    assert service.count_free_bays(1, 14 * HOUR, 18 * HOUR)['free'] == 3
+
+    # Fully booked from 16:00 to 18:00, and slot 2 is already held
+    assert not service.reserve(1, 17 * HOUR, 19 * HOUR, is_ev_slot=True)['success']
+    assert not service.reserve(1, 19 * HOUR, 21 * HOUR, is_ev_slot=True, slot_id=2)['success']
+    assert service.reserve(1, 18 * HOUR, 19 * HOUR, is_ev_slot=True, slot_id=1)['success']
+
+
+def test_walk_ins_skip_reserved_bays_and_keep_pooled_room():
+    service = build_service()
+    held = service.reserve(1, 9 * HOUR, 11 * HOUR, slot_id=1)['reservation_id']
+    pooled = service.reserve(1, 9 * HOUR, 11 * HOUR)['reservation_id']
+    # A booking that has not started yet holds nothing
+    service.reserve(1, 12 * HOUR, 13 * HOUR, slot_id=2)
+
+    assert service.park_vehicle(1, vehicle('W1'))['slot_id'] == 2
+    assert not service.park_vehicle(1, vehicle('W2'))['success']  # slot 3 is owed to the pooled booking
+
+    assert service.park_vehicle(1, vehicle('P1', reservation=pooled))['slot_id'] == 3
+    assert service.park_vehicle(1, vehicle('H1', reservation=held))['slot_id'] == 1
+    assert not service.park_vehicle(1, vehicle('H2', reservation=held))['success']  # already claimed
+
+
+def test_cancel_releases_the_hold():
+    service = build_service()
+    reservation_id = service.reserve(1, 9 * HOUR, 11 * HOUR, slot_id=1)['reservation_id']
+    assert service.park_vehicle(1, vehicle('W1'))['slot_id'] == 2
+    assert service.cancel_reservation(1, reservation_id)['success']
+    assert not service.cancel_reservation(1, reservation_id)['success']
+    assert service.park_vehicle(1, vehicle('W2'))['slot_id'] == 1
+    assert not service.resize_parking_lot(1, regular_spaces=1)['success']
+
+
+def test_expired_bookings_stop_blocking_a_shrink():
+    service = build_service(regular=5)
+    service.reserve(1, 10 * HOUR, 11 * HOUR, slot_id=5)
+    book = service.levels[1]['regular_reservations']
+    assert not service.resize_parking_lot(1, regular_spaces=3)['success']
+    service.clock = lambda: 11 * HOUR
+    assert service.resize_parking_lot(1, regular_spaces=3)['success']
+    assert len(book) == 0
+
+
+def test_claims_only_inside_the_window():
+    service = build_service()
+    early = service.reserve(1, 12 * HOUR, 13 * HOUR, slot_id=1)['reservation_id']
+    late = service.reserve(1, 9 * HOUR, 10 * HOUR + 60, slot_id=2)['reservation_id']
+    result = service.park_vehicle(1, vehicle('E1', reservation=early))
+    assert not result['success'] and 'not started' in result['message']
+
+    service.clock = lambda: 11 * HOUR
+    result = service.park_vehicle(1, vehicle('L1', reservation=late))
+    assert not result['success'] and 'expired' in result['message']
+    # Only the booking that has not started is left
+    assert list(service.levels[1]['regular_reservations'].reservations) == [early]
+
+
+def test_expire_skips_cancelled_entries():
+    service = build_service()
+    book = service.levels[1]['regular_reservations']
+    for _ in range(100):
+        reservation_id = service.reserve(1, 20 * HOUR, 21 * HOUR)['reservation_id']
+        service.cancel_reservation(1, reservation_id)
+    kept = service.reserve(1, 20 * HOUR, 22 * HOUR)['reservation_id']
+    book.expire(21 * HOUR)
+    assert list(book.reservations) == [kept]
+    assert len(book._ends) <= 2 * len(book) + 64
+    book.expire(22 * HOUR)
+    assert len(book) == 0 and book.free_bays(20 * HOUR, 22 * HOUR) == 3
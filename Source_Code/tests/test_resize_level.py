@@ -0,0 +1,50 @@
+"""
+Tests for online resize of a parking level
+"""
+
+from ParkingService import ParkingService
+
+
+def vehicle(regnum, ev=0):
+    return {'regnum': regnum, 'make': 'Toyota', 'model': 'Corolla', 'color': 'red', 'ev': ev, 'motor': 0}
+
+
+def make_service():
+    service = ParkingService()
+    service.create_parking_lot(1, 4, 2)
+    for regnum in ('A1', 'A2', 'A3'):
+        service.park_vehicle(1, vehicle(regnum))
+    service.park_vehicle(1, vehicle('E1', ev=1))
+    return service
+
+
+def test_grow_keeps_vehicles_and_indexes():
+    service = make_service()
+    result = service.resize_parking_lot(1, regular_spaces=6, ev_spaces=52)
+    assert result['success'] and result['moved'] == []
+    assert service.get_occupancy(1)['levels'][1] == {'regular_capacity': 6, 'regular_occupied': 3,
+                                                     'regular_bays_used': 3, 'ev_capacity': 52,
+                                                     'ev_occupied': 1, 'ev_bays_used': 1}
+    assert [v['regnum'] for v in service.get_status(1)['regular_vehicles']] == ['A1', 'A2', 'A3']
+    assert service.find_vehicle('E1')['matches'][0]['slot_id'] == 1
+    assert service.park_vehicle(1, vehicle('E2', ev=1))['slot_id'] == 2
+
+
+def test_shrink_refuses_to_cut_off_occupied_slots():
+    service = make_service()
+    result = service.resize_parking_lot(1, regular_spaces=2)
+    assert not result['success']
+    assert len(service.get_status(1)['regular_vehicles']) == 3
+    assert service.resize_parking_lot(1, regular_spaces=3)['success']
+    assert not service.park_vehicle(1, vehicle('A4'))['success']
+
+
+def test_shrink_with_relocation_moves_vehicles_down():
+    service = make_service()
+    service.remove_vehicle(1, 1)
+    result = service.resize_parking_lot(1, regular_spaces=2, relocate=True)
+    assert result['success']
+    assert result['moved'] == [{'regnum': 'A3', 'is_ev_slot': False, 'from_slot': 3, 'to_slot': 1}]
+    assert service.find_vehicle('A3')['matches'][0]['slot_id'] == 1
+    assert [ref.slot_id for ref in service.query_slots(color='red', is_electric=False)] == [1, 2]
+    assert not service.resize_parking_lot(1, regular_spaces=1, relocate=True)['success']
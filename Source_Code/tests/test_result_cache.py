@@ -0,0 +1,67 @@
+"""
+Tests for the versioned query-result cache
+"""
+
+from ParkingService import ParkingService
+from ResultCache import ResultCache
+
+
+def vehicle(regnum, color='red', ev=0):
+    return {'regnum': regnum, 'make': 'Ford', 'model': 'Focus', 'color': color, 'ev': ev, 'motor': 0}
+
+
+def build_service():
+    service = ParkingService()
+    service.create_parking_lot(1, 10, 2)
+    service.create_parking_lot(2, 10, 0)
+    service.park_vehicle(1, vehicle('A1'))
+    service.park_vehicle(1, vehicle('E1', ev=1))
+    service.park_vehicle(2, vehicle('B1', color='blue'))
+    return service
+
+
+def test_repeated_reads_hit_until_the_level_changes():
+    service = build_service()
+    first = service.get_status(1)
+    assert service.get_status(1) is first
+    assert service.cache_stats()['hits'] == 1
+
+    # A change on level 2 leaves level 1's entry valid
+    service.park_vehicle(2, vehicle('B2'))
+    assert service.get_status(1) is first
+
+    service.update_charge(1, 1, 80)
+    assert service.get_charge_status(1)['charge_status'][0]['charge'] == 80
+    status = service.get_status(1)
+    assert status is not first and status['ev_vehicles'][0]['charge'] == 80
+
+    service.edit_vehicle(1, 1, regnum='A1', color='green')
+    assert service.get_status(1)['regular_vehicles'][0]['color'] == 'green'
+    stats = service.cache_stats()
+    assert stats['hits'] == 2 and stats['misses'] == 4
+
+
+def test_query_results_are_cached_per_level():
+    service = build_service()
+    assert [ref.level for ref in service.query_slots(color='red')] == [1, 1]
+    assert [ref.level for ref in service.query_slots(color='red')] == [1, 1]
+    hits = service.cache_stats()['hits']
+    assert hits == 2
+    service.park_vehicle(2, vehicle('B3', color='red'))
+    assert [ref.slot_id for ref in service.query_slots(color='red', levels=2)] == [2]
+    assert service.cache_stats()['hits'] == hits
+
+
+def test_lru_eviction_and_byte_cap():
+    cache = ResultCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, 0, [key])
+    assert cache.get('a', 0) is None and cache.get('c', 0) == ['c']
+    assert cache.get('c', 1) is None  # wrong version
+    assert cache.stats()['evictions'] == 1
+
+    small = ResultCache(max_bytes=1000)
+    small.put('big', 0, list(range(1000)))
+    assert len(small) == 0
+    small.put('x', 0, [1])
+    assert small.stats()['bytes'] <= 1000 and small.get('x', 0) == [1]
@@ -0,0 +1,128 @@
+"""
+Tests for the multi-process ShardedParkingService router
+"""
+
+import threading
+
+import pytest
+
+from ParkingService import ParkingService
+from ShardedParkingService import ShardedParkingService
+
+
+def vehicle(regnum, color='red', ev=0):
+    return {'regnum': regnum, 'make': 'Toyota', 'model': 'Corolla', 'color': color, 'ev': ev, 'motor': 0}
+
+
+@pytest.fixture(scope='module')
+def sharded():
+    service = ShardedParkingService(num_workers=2)
+    for level in range(1, 5):
+        service.create_parking_lot(level, 3, 2)
+        service.park_vehicle(level, vehicle(f'AB{level}00'))
+        service.park_vehicle(level, vehicle(f'EV{level}00', color='blue', ev=1))
+    yield service
+    service.close()
+
+
+def test_levels_are_spread_across_shards(sharded):
+    assert {sharded.shard_for(level) for level in range(1, 5)} == {0, 1}
+
+
+def test_level_operations_are_routed(sharded):
+    status = sharded.get_status(3)
+    assert status['success']
+    assert [v['regnum'] for v in status['regular_vehicles']] == ['AB300']
+    assert not sharded.get_status(9)['success']
+
+
+def test_site_wide_queries_are_gathered(sharded):
+    occupancy = sharded.get_occupancy()
+    assert occupancy['totals'] == {'regular_capacity': 12, 'regular_occupied': 4, 'regular_bays_used': 4,
+                                   'ev_capacity': 8, 'ev_occupied': 4, 'ev_bays_used': 4}
+    assert sorted(occupancy['levels']) == [1, 2, 3, 4]
+
+    assert sharded.find_vehicle('ev200')['matches'][0]['level'] == 2
+    prefix = sharded.search_plates('AB', 'prefix', limit=3)
+    assert [m['regnum'] for m in prefix['matches']] == ['AB100', 'AB200', 'AB300']
+
+    refs = list(sharded.query_slots(color='blue', levels=range(2, 5)))
+    assert [(ref.level, ref.slot_id, ref.is_ev_slot) for ref in refs] == [(2, 1, True), (3, 1, True), (4, 1, True)]
+
+
+def test_execute_many_matches_single_process_results(sharded):
+    calls = [('park_vehicle', level, vehicle(f'BX{level}{i}')) for i in range(2) for level in range(1, 5)]
+    calls.append(('park_vehicle', 1, vehicle('FULL')))
+    results = sharded.execute_many(calls)
+
+    reference = ParkingService()
+    for level in range(1, 5):
+        reference.create_parking_lot(level, 3, 2)
+        reference.park_vehicle(level, vehicle(f'AB{level}00'))
+    assert results == [reference.park_vehicle(level, data) for method, level, data in calls]
+    assert results[-1]['success'] is False
+
+
+def test_memory_usage_is_merged(sharded):
+    usage = sharded.memory_usage()
+    assert usage['success']
+    assert sorted(usage['levels']) == [1, 2, 3, 4]
+    assert usage['total'] >= sum(level['total'] for level in usage['levels'].values())
+    assert sharded.set_memory_budget(None)['success']
+
+
+def test_concurrent_callers_get_their_own_replies():
+    with ShardedParkingService(num_workers=2) as service:
+        for level in range(1, 5):
+            service.create_parking_lot(level, 50, 0)
+        errors = []
+
+        def worker(level):
+            for i in range(25):
+                parked = service.park_vehicle(level, vehicle(f'T{level}{i:02d}'))
+                status = service.get_status(level)
+                found = service.find_vehicle(f'T{level}{i:02d}')
+                if (parked.get('slot_id') != i + 1 or len(status['regular_vehicles']) != i + 1 or
+                        found['matches'][0]['level'] != level):
+                    errors.append((level, i))
+                service.get_occupancy()
+
+        threads = [threading.Thread(target=worker, args=(level,)) for level in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert service.get_occupancy()['totals']['regular_occupied'] == 100
+
+
+def test_later_service_methods_are_forwarded():
+    with ShardedParkingService(num_workers=2, level_shards={1: 0, 2: 1}) as service:
+        service.create_parking_lot(1, 2, 2)
+        service.create_parking_lot(2, 2, 2)
+        service.park_vehicle(1, vehicle('AA1'))
+        service.park_vehicle(1, vehicle('EV1', ev=1))
+        service.park_vehicle(2, vehicle('EV2', color='blue', ev=1))
+
+        assert service.edit_vehicle(1, 1, color='green')['success']
+        assert service.get_status(1)['regular_vehicles'][0]['color'] == 'green'
+        assert service.update_charge(1, 1, 40)['success']
+        applied = service.apply_charges([(None, None, 'EV2', 75), (1, 1, None, 40), (None, None, 'NOPE', 10)])
+        assert (applied['applied'], applied['unchanged'], applied['skipped']) == (1, 1, 1)
+        assert service.get_charge_status(2)['charge_status'][0]['charge'] == 75
+        assert service.resize_parking_lot(2, regular_spaces=5)['success']
+        assert service.get_occupancy(2)['levels'][2]['regular_capacity'] == 5
+
+        audit = service.audit_plates()
+        assert (audit['vehicles'], audit['duplicates']) == (3, [])
+
+        exported = service.export_columns(as_numpy=False)
+        columns, dictionaries = exported['columns'], exported['dictionaries']
+        assert list(columns['level']) == [1, 1, 2]
+        assert [dictionaries['color'][code] for code in columns['color']] == ['green', 'red', 'blue']
+        assert list(columns['charge']) == [-1, 40, 75]
+
+        with pytest.raises(NotImplementedError):
+            service.snapshot()
+        with pytest.raises(NotImplementedError):
+            service.subscribe(lambda event: None)
@@ -0,0 +1,91 @@
+"""
+Tests for service change events and the slot map state they drive
+"""
+
+from ParkingService import ParkingService
+from SlotMap import SlotMapModel, CAR, EMPTY_REGULAR, EMPTY_EV, charge_colour
+
+
+def park(service, level, regnum, ev=0, motor=0):
+    return service.park_vehicle(level, {'regnum': regnum, 'make': 'Toyota', 'model': 'Prius',
+                                        'color': 'red', 'ev': ev, 'motor': motor})
+
+
+def test_service_emits_change_events():
+    service = ParkingService()
+    events = []
+    service.subscribe(lambda event: events.append((event.kind, event.level, event.details.get('slot_id'))))
+    service.create_parking_lot(1, 3, 2)
+    park(service, 1, 'AB1')
+    park(service, 1, 'EV1', ev=1)
+    service.edit_vehicle(1, 1, False, color='blue')
+    service.update_charge(1, 1, 80)
+    service.remove_vehicle(1, 1)
+    assert [event for event, _, _ in events] == ['level_created', 'parked', 'parked', 'edited',
+                                                 'charge_updated', 'removed']
+    assert events[-1] == ('removed', 1, 1)
+
+
+def test_edit_and_charge_keep_indexes_and_snapshots_consistent():
+    service = ParkingService()
+    service.create_parking_lot(1, 2, 1)
+    park(service, 1, 'AB1')
+    park(service, 1, 'EV1', ev=1)
+    before = service.snapshot(1)[1]
+    assert service.edit_vehicle(1, 1, False, regnum='ZZ9', color='blue')['success']
+    assert service.update_charge(1, 1, 55)['success']
+    assert not service.update_charge(1, 1, 150)['success']
+    assert not service.edit_vehicle(1, 2, False, color='blue')['success']
+
+    assert [ref.slot_id for ref in service.query_slots(color='blue')] == [1]
+    assert list(service.query_slots(color='red', levels=[1])) == [(1, 1, True)]
+    assert service.find_vehicle('ZZ9')['success'] and not service.find_vehicle('AB1')['success']
+    assert before.regular_slots[0]['regnum'] == 'AB1'
+    assert before.ev_slots[0]['charge'] == 0
+    assert service.get_charge_status(1)['charge_status'][0]['charge'] == 55
+
+
+def test_model_tracks_only_changed_cells():
+    service = ParkingService()
+    model = SlotMapModel(1, columns=4)
+    service.subscribe(model.on_event)
+    service.create_parking_lot(1, 6, 2)
+    park(service, 1, 'AB1')
+    assert model.needs_reload
+    model.load(service.snapshot(1)[1], model.generation)
+    assert not model.needs_reload
+    assert model.colour((False, 0)) == CAR
+    assert model.take_dirty() == []
+
+    park(service, 1, 'EV1', ev=1)
+    service.update_charge(1, 1, 100)
+    service.remove_vehicle(1, 1)
+    assert sorted(model.take_dirty()) == [((False, 0), EMPTY_REGULAR), ((True, 0), charge_colour(100))]
+    assert model.occupied() == 1
+    service.create_parking_lot(2, 1, 1)
+    assert model.take_dirty() == [] and not model.needs_reload
+
+
+def test_model_layout_and_visible_rows():
+    model = SlotMapModel(1, columns=4)
+    service = ParkingService()
+    service.create_parking_lot(1, 6, 3)
+    model.load(service.snapshot(1)[1], model.generation)
+    # Regular rows 0-1, label row 2, EV row 3
+    assert model.rows() == 4
+    assert model.position((False, 5)) == (1, 1)
+    assert model.position((True, 2)) == (3, 2)
+    assert list(model.cells_in_rows(1, 3)) == [(False, 4), (False, 5), (True, 0), (True, 1), (True, 2)]
+    assert model.colour((True, 1)) == EMPTY_EV
+
+
+def test_reload_reapplies_changes_that_raced_with_the_snapshot():
+    service = ParkingService()
+    model = SlotMapModel(1, columns=4)
+    service.subscribe(model.on_event)
+    service.create_parking_lot(1, 4, 0)
+    generation = model.generation
+    stale = service.snapshot(1)[1]
+    park(service, 1, 'AB1')
+    model.load(stale, generation)
+    assert model.colour((False, 0)) == CAR
@@ -0,0 +1,91 @@
+"""
+Tests for compound slot queries on ParkingService
+"""
+
+import pytest
+
+from ParkingService import ParkingService
+from SlotIndex import CHUNK_BITS, SlotRef
+
+
+def park(service, level, regnum, make, color, ev=0, motor=0):
+    return service.park_vehicle(level, {'regnum': regnum, 'make': make, 'model': 'Base',
+                                        'color': color, 'ev': ev, 'motor': motor})
+
+
+@pytest.fixture
+def service():
+    service = ParkingService()
+    for level in range(1, 6):
+        # One motorcycle per bay keeps the slot numbers below predictable
+        service.create_parking_lot(level, 4, 4, motorcycles_per_bay=1)
+        park(service, level, f'R{level}', 'Toyota', 'red', ev=1, motor=1)
+        park(service, level, f'B{level}', 'Toyota', 'blue', ev=1, motor=1)
+        park(service, level, f'C{level}', 'Toyota', 'red', ev=0, motor=1)
+        park(service, level, f'F{level}', 'Ford', 'red', ev=1, motor=0)
+    return service
+
+
+def test_compound_query_across_level_range(service):
+    result = service.query_slots(color='red', make='Toyota', vehicle_type='motorcycle',
+                                 is_electric=True, levels=range(2, 5))
+    assert list(result) == [SlotRef(2, 1, True), SlotRef(3, 1, True), SlotRef(4, 1, True)]
+
+
+def test_collections_match_any_value(service):
+    refs = list(service.query_slots(color=['red', 'blue'], make='Toyota', levels=1))
+    assert refs == [SlotRef(1, 1, False), SlotRef(1, 1, True), SlotRef(1, 2, True)]
+
+
+def test_no_criteria_returns_every_occupied_slot(service):
+    assert len(list(service.query_slots())) == 20
+    assert list(service.query_slots(color='green')) == []
+
+
+def test_removed_vehicles_drop_out(service):
+    service.remove_vehicle(1, 1, True)
+    refs = list(service.query_slots(color='red', is_electric=True, levels=1))
+    assert refs == [SlotRef(1, 3, True)]
+
+
+def test_none_inside_collection_is_skipped(service):
+    assert list(service.query_slots(vehicle_type=[None])) == []
+    assert len(list(service.query_slots(vehicle_type=[None, 'car'], levels=1))) == 1
+
+
+def test_invalid_criteria_are_rejected(service):
+    with pytest.raises(ValueError):
+        service.query_slots(vehicle_type=5)
+
+
+def test_large_level_spans_chunks():
+    service = ParkingService()
+    service.create_parking_lot(1, CHUNK_BITS * 2 + 10, 0)
+    for i in range(CHUNK_BITS * 2 + 10):
+        park(service, 1, f'P{i}', 'Toyota', 'red' if i % 1000 == 0 else 'blue')
+    slots = [ref.slot_id for ref in service.query_slots(color='red')]
+    assert slots == [i + 1 for i in range(0, CHUNK_BITS * 2 + 10, 1000)]
+
+
+def test_multi_bay_vehicles_match_and_count_once():
+    service = ParkingService()
+    service.create_parking_lot(1, 8, 0)
+    for regnum, kind, color in (('BUS1', 'bus', 'red'), ('TRK1', 'truck', 'red'), ('M1', 'motorcycle', 'red'),
+                                ('M2', 'motorcycle', 'blue')):
+        service.park_vehicle(1, {'regnum': regnum, 'make': 'Volvo', 'model': 'Base', 'color': color,
+                                 'ev': 0, 'kind': kind})
+    assert list(service.query_slots(color='red')) == [SlotRef(1, 1, False), SlotRef(1, 4, False),
+                                                       SlotRef(1, 6, False)]
+    assert [ref.slot_id for ref in service.query_slots()] == [1, 4, 6]
+    counts = service.get_occupancy(1)['levels'][1]
+    assert (counts['regular_occupied'], counts['regular_bays_used']) == (4, 6)
+
+    # The blue motorcycle leaving must not clear the red one's postings in their shared bay
+    service.remove_vehicle(1, 6, regnum='M2')
+    assert SlotRef(1, 6, False) in list(service.query_slots(color='red'))
+    assert list(service.query_slots(color='blue')) == []
+    service.edit_vehicle(1, 2, color='green')
+    assert list(service.query_slots(color='green')) == [SlotRef(1, 1, False)]
+    service.remove_vehicle(1, 5)
+    counts = service.get_occupancy(1)['levels'][1]
+    assert (counts['regular_occupied'], counts['regular_bays_used']) == (2, 4)
@@ -0,0 +1,71 @@
+"""
+Tests for snapshot-isolated reads on ParkingService
+"""
+
+import threading
+
+from ParkingService import ParkingService
+from SlotStore import SlotArray
+
+
+def vehicle(regnum, ev=0):
+    return {'regnum': regnum, 'make': 'Toyota', 'model': 'Corolla', 'color': 'red', 'ev': ev, 'motor': 0}
+
+
+def test_slot_array_copy_on_write():
+    slots = SlotArray(600)
+    slots[0] = 'a'
+    view = slots.snapshot()
+    slots[0] = 'b'
+    slots[599] = 'c'
+    assert view[0] == 'a' and view[599] is None
+    assert slots[0] == 'b' and list(slots)[599] == 'c'
+    assert len(list(view)) == 600
+    assert slots.find_free() == 1
+    assert slots.find_free(start=599) == -1
+
+
+def test_snapshot_is_a_point_in_time_view():
+    service = ParkingService()
+    service.create_parking_lot(1, 3, 2)
+    service.create_parking_lot(2, 3, 2)
+    service.park_vehicle(1, vehicle('AB100'))
+    service.park_vehicle(2, vehicle('EV200', ev=1))
+
+    snapshot = service.snapshot()
+    before = (service.get_status(1, snapshot), service.get_status(2, snapshot))
+    service.park_vehicle(1, vehicle('AB101'))
+    service.remove_vehicle(2, 1, True)
+
+    assert (service.get_status(1, snapshot), service.get_status(2, snapshot)) == before
+    assert len(service.get_status(1)['regular_vehicles']) == 2
+    assert service.get_charge_status(2)['charge_status'] == []
+    assert service.get_charge_status(2, snapshot)['charge_status'][0]['regnum'] == 'EV200'
+    assert snapshot[1].version < service.snapshot(1)[1].version
+
+
+def test_writers_run_while_report_reads_snapshot():
+    service = ParkingService()
+    service.create_parking_lot(1, 2000, 0)
+    for i in range(1000):
+        service.park_vehicle(1, vehicle(f'P{i}'))
+    snapshot = service.snapshot(1)
+    stop = threading.Event()
+
+    def gate_traffic():
+        i = 0
+        while not stop.is_set():
+            result = service.park_vehicle(1, vehicle(f'N{i}'))
+            if result['success']:
+                service.remove_vehicle(1, result['slot_id'] - 500)
+            i += 1
+
+    writer = threading.Thread(target=gate_traffic)
+    writer.start()
+    try:
+        reports = [service.get_status(1, snapshot)['regular_vehicles'] for _ in range(5)]
+    finally:
+        stop.set()
+        writer.join()
+    assert all(report == reports[0] for report in reports)
+    assert [v['regnum'] for v in reports[0]] == [f'P{i}' for i in range(1000)]
@@ -0,0 +1,144 @@
+"""
+Tests for running GUI work off the Tk main thread
+"""
+
+import threading
+import time
+
+from ParkingLot import ParkingLot
+from TaskRunner import BackgroundTaskRunner
+
+
+class FakeRoot:
+    """Stands in for tk.Tk: after() callbacks are run by pump()"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def pump(self, until, timeout=5.0):
+        deadline = time.time() + timeout
+        while not until() and time.time() < deadline:
+            callbacks, self.pending = self.pending, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.005)
+        assert until()
+
+
+class FakeText:
+    def __init__(self):
+        self.content = ''
+
+    def insert(self, index, text):
+        self.content += text
+
+    def delete(self, start, end):
+        self.content = ''
+
+    def see(self, index):
+        pass
+
+
+class FakeVar:
+    def __init__(self, value=''):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def test_job_runs_off_main_thread_and_reports_on_poll():
+    root = FakeRoot()
+    runner = BackgroundTaskRunner(root, poll_ms=1)
+    seen = {}
+
+    def work(token, progress):
+        seen['thread'] = threading.current_thread()
+        for i in range(5):
+            progress(i, 5)
+        # Give the main loop a chance to poll before the job finishes
+        time.sleep(0.05)
+        return 42
+
+    runner.submit(work, on_done=lambda result: seen.setdefault('result', (result, threading.current_thread())),
+                  on_progress=lambda name, done, total: seen.setdefault('progress', []).append(done))
+    root.pump(lambda: 'result' in seen)
+    assert seen['thread'] is not threading.current_thread()
+    assert seen['result'] == (42, threading.current_thread())
+    assert seen['progress']
+
+
+def test_cancel_stops_long_job():
+    root = FakeRoot()
+    runner = BackgroundTaskRunner(root, poll_ms=1)
+    started = threading.Event()
+    outcome = []
+
+    def endless(token, progress):
+        started.set()
+        while True:
+            progress(0, 1)
+            time.sleep(0.001)
+
+    runner.submit(endless, on_done=outcome.append, on_cancel=lambda name: outcome.append('cancelled'), name='report')
+    started.wait(2)
+    runner.cancel_current()
+    root.pump(lambda: outcome == ['cancelled'])
+    assert not runner.busy
+
+
+def test_parking_lot_handlers_use_background_runner():
+    root = FakeRoot()
+    tfield = FakeText()
+    tk_vars = {name: FakeVar() for name in ('level_value', 'num_value', 'ev_value', 'reg_value', 'make_value',
+                                            'model_value', 'color_value', 'slot2_value', 'progress_value')}
+    tk_vars.update({'ev_car_value': FakeVar(0), 'ev_motor_value': FakeVar(0)})
+    tk_vars.update({'tfield': tfield, 'task_runner': BackgroundTaskRunner(root, poll_ms=1)})
+    lot = ParkingLot(tk_vars)
+
+    for name, value in (('level_value', '1'), ('num_value', '3'), ('ev_value', '1'),
+                        ('reg_value', 'AB123'), ('make_value', 'Toyota'), ('model_value', 'Corolla'),
+                        ('color_value', 'red'), ('slot2_value', 'red')):
+        tk_vars[name].set(value)
+    lot.makeLot()
+    lot.parkCar()
+    lot.slotNumByColor()
+    root.pump(lambda: 'Identified slots (EV)' in tfield.content)
+    assert 'Allocated slot: 1' in tfield.content
+    assert 'Identified slots: 1\n' in tfield.content
+
+    lot.status()
+    root.pump(lambda: tfield.content.startswith('🅿️'))
+    assert 'AB123' in tfield.content
+    assert tk_vars['progress_value'].get() == ''
+
+
+def test_park_failures_show_the_service_message():
+    root = FakeRoot()
+    tfield = FakeText()
+    tk_vars = {name: FakeVar() for name in ('level_value', 'num_value', 'ev_value', 'reg_value', 'make_value',
+                                            'model_value', 'color_value', 'progress_value')}
+    tk_vars.update({'ev_car_value': FakeVar(0), 'ev_motor_value': FakeVar(0)})
+    tk_vars.update({'tfield': tfield, 'task_runner': BackgroundTaskRunner(root, poll_ms=1)})
+    lot = ParkingLot(tk_vars)
+    for name, value in (('level_value', '1'), ('num_value', '3'), ('ev_value', '0'), ('reg_value', 'AB123'),
+                        ('make_value', 'Toyota'), ('model_value', 'Corolla'), ('color_value', 'red')):
+        tk_vars[name].set(value)
+    lot.makeLot()
+    lot.parkCar()
+    lot.parkCar()
+    root.pump(lambda: tfield.content.count('\n') >= 3)
+    assert 'Allocated slot: 1' in tfield.content
+    assert 'already parked' in tfield.content
+    assert 'parking lot is full' not in tfield.content
+
+    assert not lot.edit(1, 'ZZ999', 'Ford', 'Ka', 'blue', 0)
+    assert lot.slots[1] == -1
+    assert lot.edit(0, 'AB123', 'Toyota', 'Corolla', 'green', 0)
+    assert lot.slots[0].color == 'green'